@@ -0,0 +1,115 @@
+"""
+Startup benchmark of the ecogvis console entry point.
+
+Reports the import time of `ecogvis.ecogvis` (the module of the `ecogvis`
+console script), broken down by module as with `python -X importtime`, and
+the time from launching a new interpreter to an empty main window on screen.
+
+Usage
+-----
+With ecogvis installed (pip install -e .)::
+
+    python benchmarks/import_time.py --repeats 5 --top 20
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ENTRY_MODULE = 'ecogvis.ecogvis'
+
+EMPTY_WINDOW = """
+import sys
+from PyQt5 import QtCore
+from PyQt5.QtWidgets import QApplication
+QtCore.QCoreApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts)
+app = QApplication(sys.argv)
+from ecogvis.ecogvis import Application
+window = Application(source_path='', session='benchmark')
+app.processEvents()
+print('shown', flush=True)
+"""
+
+
+def run_env():
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    return env
+
+
+def import_times(module=ENTRY_MODULE):
+    """
+    Imports `module` in a new interpreter with -X importtime.
+
+    Returns
+    -------
+    dict of {module name: (self us, cumulative us)}
+    """
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                         env=run_env(), stderr=subprocess.PIPE, stdout=subprocess.DEVNULL,
+                         universal_newlines=True, check=True)
+    times = {}
+    for line in out.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def time_to_window():
+    """Seconds from launching a new interpreter to the empty main window."""
+    t0 = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-c', EMPTY_WINDOW], env=run_env(),
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            universal_newlines=True)
+    for line in proc.stdout:
+        if line.strip() == 'shown':
+            elapsed = time.perf_counter() - t0
+            break
+    else:
+        raise RuntimeError('The main window was not shown')
+    proc.kill()
+    proc.wait()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup benchmark of ecogVIS.')
+    parser.add_argument('--repeats', type=int, default=5,
+                        help='Number of runs of each measurement.')
+    parser.add_argument('--top', type=int, default=15,
+                        help='Number of slowest imports to list.')
+    parser.add_argument('--json', default=None,
+                        help='Also writes the results to this JSON file.')
+    args = parser.parse_args()
+
+    runs = [import_times() for _ in range(args.repeats)]
+    names = set.intersection(*[set(r) for r in runs])
+    median = {name: (float(np.median([r[name][0] for r in runs])),
+                     float(np.median([r[name][1] for r in runs]))) for name in names}
+    total_ms = median[ENTRY_MODULE][1] / 1e3
+    windows = [time_to_window() for _ in range(args.repeats)]
+
+    print('import {}: {:.0f} ms (median of {})'.format(ENTRY_MODULE, total_ms, args.repeats))
+    print('launch to empty main window: p50 {:.0f} ms, max {:.0f} ms'.format(
+        1e3 * np.median(windows), 1e3 * np.max(windows)))
+    print('  {:<60}{:>12}{:>12}'.format('module', 'self ms', 'cumul. ms'))
+    slowest = sorted(median.items(), key=lambda item: -item[1][1])[:args.top]
+    for name, (self_us, cumulative_us) in slowest:
+        print('  {:<60}{:>12.1f}{:>12.1f}'.format(name, self_us / 1e3, cumulative_us / 1e3))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'import_ms': total_ms,
+                       'window_ms': [1e3 * w for w in windows],
+                       'modules': {name: {'self_ms': s / 1e3, 'cumulative_ms': c / 1e3}
+                                   for name, (s, c) in median.items()}}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
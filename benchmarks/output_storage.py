@@ -0,0 +1,141 @@
+"""
+Benchmark of the storage options of the processed signals.
+
+Writes a synthetic LFP (nSamples, nChannels) and spectral decomposition
+(nSamples, nChannels, nBands) with every chunking and compression option
+of ecogvis.signal_processing.storage, and reports the file size, the write
+time, the read latency of viewer windows (a few seconds of 64 and of all
+channels, from a freshly opened file) and the time to read every channel
+as the processing loops do.
+
+Usage
+-----
+With ecogvis installed (pip install -e .)::
+
+    python benchmarks/output_storage.py --channels 256 --duration 600
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import h5py
+import numpy as np
+from scipy.signal import lfilter
+
+from ecogvis.signal_processing.column_reader import ColumnBatchReader
+from ecogvis.signal_processing.storage import STORAGE_OPTIONS, output_data_io
+
+
+def make_signals(n_channels, duration, rate, n_bands):
+    """Brown-ish noise in volts, like LFP, and positive band amplitudes."""
+    rng = np.random.RandomState(0)
+    n_samples = int(duration * rate)
+    noise = rng.randn(n_samples, n_channels).astype('float32')
+    lfp = (lfilter([1.], [1., -0.95], noise, axis=0) * 1e-6).astype('float32')
+    bands = np.abs(lfp[:, :, None] * rng.rand(n_bands).astype('float32')) * 1e3
+    return lfp, bands
+
+
+def storage_options():
+    options = {'hdmf default (contiguous)': None}
+    for name, storage in STORAGE_OPTIONS.items():
+        options[name + ', 1 MB chunks'] = dict(storage)
+    for chunk_bytes in [2**18, 2**22]:
+        options['lzf, {:g} MB chunks'.format(chunk_bytes / 2**20)] = dict(
+            STORAGE_OPTIONS['lzf'], chunk_bytes=chunk_bytes)
+    return options
+
+
+def write(path, data, storage):
+    settings = {} if storage is None else output_data_io(data, storage).io_settings
+    t0 = time.perf_counter()
+    with h5py.File(path, 'w') as f:
+        f.create_dataset('data', data=data, **settings)
+    return time.perf_counter() - t0, settings.get('chunks')
+
+
+def window_latency(path, rate, window, n_channels, n_trials=30):
+    """Read times [ms] of random windows, each from a freshly opened file."""
+    rng = np.random.RandomState(1)
+    times = []
+    for _ in range(n_trials):
+        with h5py.File(path, 'r') as f:
+            data = f['data']
+            n = int(window * rate)
+            start = rng.randint(0, data.shape[0] - n)
+            t0 = time.perf_counter()
+            data[start:start + n, :n_channels]
+            times.append(1e3 * (time.perf_counter() - t0))
+    return float(np.percentile(times, 50)), float(np.percentile(times, 95))
+
+
+def channels_read_time(path):
+    """Seconds to read every channel as the processing loops do."""
+    with h5py.File(path, 'r') as f:
+        data = f['data']
+        if data.ndim > 2:
+            return float('nan')
+        t0 = time.perf_counter()
+        for _ in ColumnBatchReader(data):
+            pass
+        return time.perf_counter() - t0
+
+
+def benchmark(folder, label, data, rate, window):
+    results = {}
+    print('{} {} {:.0f} MB'.format(label, data.shape, data.nbytes / 1e6))
+    print('  {:<28}{:>14}{:>9}{:>9}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+        'storage', 'chunks', 'MB', 'ratio', 'write s', '64ch p50', '64ch p95', 'all p50',
+        'chans s'))
+    for name, storage in storage_options().items():
+        path = os.path.join(folder, 'storage.h5')
+        write_s, chunks = write(path, data, storage)
+        size = os.path.getsize(path)
+        r = {'chunks': chunks, 'mb': size / 1e6, 'ratio': data.nbytes / size,
+             'write_s': write_s}
+        r['p50_64'], r['p95_64'] = window_latency(path, rate, window, 64)
+        r['p50_all'], _ = window_latency(path, rate, window, data.shape[1])
+        r['channels_s'] = channels_read_time(path)
+        os.remove(path)
+        results[name] = r
+        print('  {:<28}{:>14}{:>9.1f}{:>9.2f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.2f}'.format(
+            name, str(chunks[:2]) if chunks else '-', r['mb'], r['ratio'], r['write_s'],
+            r['p50_64'], r['p95_64'], r['p50_all'], r['channels_s']))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark of processed signal storage.')
+    parser.add_argument('--channels', type=int, default=256,
+                        help='Number of channels.')
+    parser.add_argument('--duration', type=float, default=300.,
+                        help='Duration of the synthetic signals, in seconds.')
+    parser.add_argument('--rate', type=float, default=400.,
+                        help='Sampling rate of the processed signals, in Hz.')
+    parser.add_argument('--bands', type=int, default=8,
+                        help='Number of bands of the spectral decomposition.')
+    parser.add_argument('--window', type=float, default=2.,
+                        help='Duration of the viewer windows, in seconds.')
+    parser.add_argument('--dir', default=None,
+                        help='Directory for the files (default: temporary).')
+    parser.add_argument('--json', default=None,
+                        help='Also writes the results to this JSON file.')
+    args = parser.parse_args()
+
+    lfp, bands = make_signals(args.channels, args.duration, args.rate, args.bands)
+    all_results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.dir or tmp
+        all_results['LFP'] = benchmark(folder, 'LFP', lfp, args.rate, args.window)
+        all_results['DecompositionSeries'] = benchmark(
+            folder, 'DecompositionSeries', bands, args.rate, args.window)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,158 @@
+"""
+Validation of the float32 processing path against the float64 one.
+
+Writes a synthetic raw recording, runs preprocessing, spectral decomposition
+and high gamma estimation with precision='float64' and 'float32', each in
+its own process, and reports the run times, the peak memory of each process
+and the maximum deviation of the float32 outputs from the float64 ones,
+relative to the largest float64 value.
+
+Usage
+-----
+With ecogvis installed (pip install -e .)::
+
+    python benchmarks/precision.py --channels 256 --duration 600
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+OUTPUTS = {
+    'preprocessed': lambda nwb: nwb.processing['ecephys']['LFP']['preprocessed'],
+    'DecompositionSeries': lambda nwb: nwb.processing['ecephys']['DecompositionSeries'],
+    'high_gamma': lambda nwb: nwb.processing['ecephys']['high_gamma'],
+}
+
+
+def make_raw_nwb(path, n_channels, duration, rate):
+    """Writes brown-ish noise with line noise and a 7 Hz rhythm, in volts."""
+    from dateutil.tz import tzlocal
+    from scipy.signal import lfilter
+    from pynwb import NWBFile, NWBHDF5IO
+    from pynwb.ecephys import ElectricalSeries
+
+    nwb = NWBFile('synthetic', 'precision', datetime.now(tzlocal()))
+    device = nwb.create_device(name='device')
+    group = nwb.create_electrode_group('grid', description='', location='ctx', device=device)
+    for i in range(n_channels):
+        nwb.add_electrode(id=i, x=float(i % 16), y=float(i // 16), z=0., imp=np.nan,
+                          location='ctx', filtering='none', group=group)
+    region = nwb.create_electrode_table_region(list(range(n_channels)), 'all electrodes')
+    rng = np.random.RandomState(0)
+    t = np.arange(int(duration * rate)) / rate
+    X = lfilter([1.], [1., -0.95], rng.randn(len(t), n_channels), axis=0)
+    X += 20 * np.sin(2 * np.pi * 60 * t)[:, None] + 10 * np.sin(2 * np.pi * 7 * t)[:, None]
+    X = (X * 1e-6).astype('float32')
+    nwb.add_acquisition(ElectricalSeries(name='ElectricalSeries', data=X, electrodes=region,
+                                         rate=rate))
+    with NWBHDF5IO(str(path), 'w') as io:
+        io.write(nwb)
+
+
+def run(path, precision, downsample):
+    """Runs the processing steps on a file, in this process."""
+    from ecogvis.signal_processing import bands
+    from ecogvis.signal_processing.processing_data import (
+        preprocess_raw_data, spectral_decomposition, high_gamma_estimation)
+
+    config = {'referencing': ('CAR', 16), 'Notch': 60, 'Downsample': downsample}
+    bands_vals = np.vstack((bands.chang_lab['cfs'], bands.chang_lab['sds']))
+    times = {}
+    t0 = time.perf_counter()
+    preprocess_raw_data(path, config, precision=precision)
+    times['preprocessed'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    spectral_decomposition(path, bands_vals[:, ::4], precision=precision)
+    times['DecompositionSeries'] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    high_gamma_estimation(path, bands_vals[:, 29:], precision=precision)
+    times['high_gamma'] = time.perf_counter() - t0
+    times['peak_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    return times
+
+
+def compare(path64, path32):
+    from pynwb import NWBHDF5IO
+
+    deviations = {}
+    with NWBHDF5IO(path64, 'r') as io64, NWBHDF5IO(path32, 'r') as io32:
+        nwb64, nwb32 = io64.read(), io32.read()
+        for name, get in OUTPUTS.items():
+            Y64 = get(nwb64).data[:].astype('float64')
+            Y32 = get(nwb32).data[:].astype('float64')
+            scale = np.abs(Y64).max()
+            deviations[name] = {'max_rel': float(np.abs(Y32 - Y64).max() / scale),
+                                'dtype': str(get(nwb32).data.dtype)}
+    return deviations
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Accuracy of float32 processing.')
+    parser.add_argument('--channels', type=int, default=64,
+                        help='Number of channels.')
+    parser.add_argument('--duration', type=float, default=120.,
+                        help='Duration of the synthetic recording, in seconds.')
+    parser.add_argument('--rate', type=float, default=3000.,
+                        help='Sampling rate of the raw signals, in Hz.')
+    parser.add_argument('--downsample', type=float, default=400.,
+                        help='Sampling rate of the preprocessed signals, in Hz.')
+    parser.add_argument('--tolerance', type=float, default=1e-4,
+                        help='Maximum relative deviation accepted.')
+    parser.add_argument('--json', default=None,
+                        help='Also writes the results to this JSON file.')
+    parser.add_argument('--run', nargs=2, metavar=('PATH', 'PRECISION'),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        times = run(args.run[0], args.run[1], args.downsample)
+        print(json.dumps(times))
+        return
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        raw = os.path.join(tmp, 'raw.nwb')
+        make_raw_nwb(raw, args.channels, args.duration, args.rate)
+        paths = {}
+        for precision in ['float64', 'float32']:
+            paths[precision] = os.path.join(tmp, precision + '.nwb')
+            shutil.copy(raw, paths[precision])
+            out = subprocess.run(
+                [sys.executable, __file__, '--run', paths[precision], precision,
+                 '--downsample', str(args.downsample)],
+                check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+            results[precision] = json.loads(out.strip().splitlines()[-1])
+        results['deviation'] = compare(paths['float64'], paths['float32'])
+
+    print('{} channels, {:.0f} s at {:.0f} Hz, downsampled to {:.0f} Hz'.format(
+        args.channels, args.duration, args.rate, args.downsample))
+    print('  {:<22}{:>12}{:>12}{:>14}{:>10}'.format(
+        'output', 'float64 s', 'float32 s', 'max rel dev', 'dtype'))
+    for name in OUTPUTS:
+        dev = results['deviation'][name]
+        print('  {:<22}{:>12.2f}{:>12.2f}{:>14.2e}{:>10}'.format(
+            name, results['float64'][name], results['float32'][name], dev['max_rel'],
+            dev['dtype']))
+    print('  peak memory: {:.0f} MB (float64), {:.0f} MB (float32)'.format(
+        results['float64']['peak_rss_mb'], results['float32']['peak_rss_mb']))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    worst = max(dev['max_rel'] for dev in results['deviation'].values())
+    if worst > args.tolerance:
+        print('Deviation above tolerance ({:.1e})'.format(args.tolerance))
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+"""
+Headless benchmark of the viewer frame times.
+
+Creates synthetic NWB files, opens them in the ecogVIS main window under the
+offscreen Qt platform and drives scripted scroll, zoom and channel-page
+sequences, and bursts of scroll requests as sent by a held arrow key. Reports
+the median (p50) and 95th percentile (p95) of the frame times, both wall clock
+(including painting) and split in io/compute/render, and the number of redraw
+requests merged into a pending frame.
+
+Usage
+-----
+With ecogvis installed (pip install -e .)::
+
+    python benchmarks/viewer_latency.py --channels 64 256 --duration 600
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+def make_synthetic_nwb(path, n_channels=64, duration=60., rate=3000., audio_rate=16000.):
+    """
+    Writes an NWB file with a gzip compressed ElectricalSeries of noise, a
+    speaker stimulus and a few invalid intervals.
+    """
+    from dateutil.tz import tzlocal
+    from hdmf.backends.hdf5 import H5DataIO
+    from pynwb import NWBFile, NWBHDF5IO, TimeSeries
+    from pynwb.ecephys import ElectricalSeries
+
+    nwb = NWBFile('synthetic', 'benchmark', datetime.now(tzlocal()))
+    device = nwb.create_device(name='device')
+    group = nwb.create_electrode_group('grid', description='', location='ctx', device=device)
+    for i in range(n_channels):
+        nwb.add_electrode(id=i, x=float(i % 16), y=float(i // 16), z=0., imp=np.nan,
+                          location=['STG', 'MTG', 'precentral'][i % 3],
+                          filtering='none', group=group)
+    region = nwb.create_electrode_table_region(list(range(n_channels)), 'all electrodes')
+
+    rng = np.random.RandomState(0)
+    n_samples = int(duration * rate)
+    data = (rng.randn(n_samples, n_channels) * 1e-5).astype('float32')
+    nwb.add_acquisition(ElectricalSeries(name='ElectricalSeries',
+                                         data=H5DataIO(data, compression='gzip'),
+                                         electrodes=region, rate=rate))
+    n_audio = int(duration * audio_rate)
+    audio = np.sin(np.arange(n_audio) / audio_rate * 2 * np.pi * 440).astype('float32')
+    nwb.add_stimulus(TimeSeries(name='speaker1', data=H5DataIO(audio, compression='gzip'),
+                                unit='V', rate=audio_rate))
+    for start in np.arange(1., duration, duration / 10.):
+        nwb.add_invalid_time_interval(start_time=start, stop_time=start + 0.5)
+    with NWBHDF5IO(str(path), 'w') as io:
+        io.write(nwb)
+
+
+def scroll_sequence(window, n_steps):
+    model = window.model
+    for _ in range(n_steps):
+        yield lambda: model.time_scroll(1 / 3)
+    for _ in range(n_steps):
+        yield lambda: model.time_scroll(-1 / 3)
+
+
+def held_key_sequence(window, n_steps, repeats=5):
+    # Several auto-repeat key events arriving within one display frame
+    model = window.model
+
+    def burst(step):
+        for _ in range(repeats):
+            model.time_scroll(step)
+    for _ in range(n_steps):
+        yield lambda: burst(1 / 3)
+    for _ in range(n_steps):
+        yield lambda: burst(-1 / 3)
+
+
+def zoom_sequence(window, n_steps):
+    model = window.model
+    duration = model.nBins * model.tbin_signal
+    spans = np.geomspace(0.5, duration, n_steps)
+    for span in np.concatenate((spans, spans[::-1])):
+        def zoom(span=span):
+            window.qline2.setText('0.01')
+            window.qline3.setText(str(span))
+            model.updateCurXAxisPosition()
+        yield zoom
+
+
+def channel_page_sequence(window, n_steps):
+    model = window.model
+    for _ in range(n_steps):
+        yield lambda: model.channel_Scroll_Up('page')
+    for _ in range(n_steps):
+        yield lambda: model.channel_Scroll_Down('page')
+
+
+SCENARIOS = {
+    'scroll': scroll_sequence,
+    'held key': held_key_sequence,
+    'zoom': zoom_sequence,
+    'channel pages': channel_page_sequence,
+}
+
+
+def run_scenario(app, window, sequence):
+    """Runs the actions of a sequence, returns wall times and frame summary."""
+    model = window.model
+    n_frames = len(model.frame_timer.frames)
+    n_skipped = model.scheduler.skipped
+    wall = []
+    for action in sequence:
+        t0 = time.perf_counter()
+        action()
+        app.processEvents()
+        model.scheduler.flush()   # does not wait for the frame interval
+        app.processEvents()
+        wall.append(1e3 * (time.perf_counter() - t0))
+    frames = len(model.frame_timer.frames) - n_frames
+    result = model.frame_timer.summary(last=frames)
+    result['skipped'] = model.scheduler.skipped - n_skipped
+    result['wall_p50'] = float(np.percentile(wall, 50))
+    result['wall_p95'] = float(np.percentile(wall, 95))
+    return result
+
+
+def benchmark_file(app, path, n_steps):
+    from ecogvis.ecogvis import Application
+
+    t0 = time.perf_counter()
+    window = Application(source_path=str(path), session='benchmark')
+    app.processEvents()
+    results = {'open_ms': 1e3 * (time.perf_counter() - t0),
+               'first_frame_ms': window.model.open_ms}
+    # Measures steady state, after the decimation pyramids are built
+    window.combo4.setCurrentIndex(0)
+    window.choose_stim()
+    for thread in [window.model.pyramid_thread, window.model.stim_pyramid_thread]:
+        if thread is not None:
+            thread.wait()
+    app.processEvents()
+    window.qline0.setText('64')
+    window.qline1.setText('1')
+    window.model.nChannels_Displayed()
+    for name, scenario in SCENARIOS.items():
+        window.qline2.setText('0.01')
+        window.qline3.setText('2')
+        window.model.updateCurXAxisPosition()
+        app.processEvents()
+        results[name] = run_scenario(app, window, scenario(window, n_steps))
+    window.model.close_nwbfile()
+    window.hide()   # close() would ask for confirmation
+    return results
+
+
+def print_results(label, results):
+    print('{} - open {:.0f} ms, first frame after {:.0f} ms'.format(
+        label, results['open_ms'], results['first_frame_ms']))
+    print('  {:<14}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}{:>10}'.format(
+        'scenario', 'wall p50', 'wall p95', 'io p50', 'comp p50', 'rend p50', 'frame p95',
+        'skipped'))
+    for name in SCENARIOS:
+        r = results[name]
+        print('  {:<14}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10.1f}{:>10d}'.format(
+            name, r['wall_p50'], r['wall_p95'], r['io_p50'], r['compute_p50'],
+            r['render_p50'], r['total_p95'], r['skipped']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Headless benchmark of ecogVIS frame times.')
+    parser.add_argument('--channels', type=int, nargs='+', default=[64, 256],
+                        help='Number of channels of each synthetic file.')
+    parser.add_argument('--duration', type=float, default=300.,
+                        help='Duration of the synthetic recordings, in seconds.')
+    parser.add_argument('--rate', type=float, default=3000.,
+                        help='Sampling rate of the synthetic recordings, in Hz.')
+    parser.add_argument('--steps', type=int, default=20,
+                        help='Number of actions in each direction, per scenario.')
+    parser.add_argument('--dir', default=None,
+                        help='Directory for the synthetic files (default: temporary).')
+    parser.add_argument('--json', default=None,
+                        help='Also writes the results to this JSON file.')
+    args = parser.parse_args()
+
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+
+    all_results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = args.dir or tmp
+        for n_channels in args.channels:
+            path = os.path.join(folder, 'synthetic_{}ch.nwb'.format(n_channels))
+            if not os.path.exists(path):
+                print('Writing ' + path)
+                make_synthetic_nwb(path, n_channels=n_channels, duration=args.duration,
+                                   rate=args.rate)
+            label = '{} channels, {:.0f} s at {:.0f} Hz'.format(n_channels, args.duration,
+                                                                 args.rate)
+            all_results[label] = benchmark_file(app, path, args.steps)
+            print_results(label, all_results[label])
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
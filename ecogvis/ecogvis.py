@@ -20,24 +20,11 @@ from PyQt5.QtWidgets import (QWidget, QLabel, QLineEdit, QMessageBox, QHBoxLayou
                              QMainWindow, QAction, QStackedLayout)
 import pyqtgraph as pg
 
-from ecogvis.functions.subFunctions import TimeSeriesPlotter
-from ecogvis.functions.misc_dialogs import (CustomIntervalDialog, SelectChannelsDialog,
-                                            SpectralChoiceDialog, NoHighGammaDialog,
-                                            NoPreprocessedDialog, NoTrialsDialog,
-                                            ExitDialog, HighGammaDialog, LoadHTKDialog,
-                                            PeriodogramGridDialog, NoSpectrumDialog,
-                                            PreprocessingDialog, NoRawDialog,
-                                            NoAudioDialog, ExistIntervalsDialog,
-                                            ShowSurveyDialog,
-                                            ShowElectrodesDialog, ShowTranscriptionDialog)
-from ecogvis.functions.audio_event_detection import AudioEventDetection
-from ecogvis.functions.event_related_potential import ERPDialog
-from ecogvis.functions.save_to_nwb import SaveToNWBDialog
-from ecogvis.functions.nwb_copy_file import nwb_copy_file
-from ecogvis.functions.survey_data import add_survey_data
-from ecogvis.functions.transcription_data import add_transcription_data
-from ecogvis.functions.htk_to_nwb.chang2nwb import chang2nwb
+from ecogvis.functions.handle_pool import HandlePool
+from ecogvis.functions.memory_budget import MemoryBudget
 
+# The viewer (pynwb, scipy) and the dialogs (OpenGL, QtWebEngine, processing
+# functions) are imported on first use, so that an empty window opens fast.
 
 annotationAdd_ = False
 annotationDel_ = False
@@ -50,6 +37,24 @@ intervalsDict_ = {'invalid': {'type': 'invalid',
                               'color': 'red',
                               'counts': 0}}
 
+config_path_ = Path.home() / '.ecogvis.yml'
+default_memory_budget_ = 1024.   # MB
+
+
+def read_config(path=None):
+    """
+    Reads the settings file, by default ~/.ecogvis.yml, e.g.::
+
+        memory_budget: 2048   # MB, for all the caches of the viewer
+
+    Returns an empty dict if the file does not exist.
+    """
+    path = Path(path) if path is not None else config_path_
+    if not path.is_file():
+        return {}
+    with open(str(path)) as f:
+        return yaml.safe_load(f) or {}
+
 
 class Application(QMainWindow):
     """
@@ -59,10 +64,24 @@ class Application(QMainWindow):
     ----------
     source_path : str or path
         Path to the source of data, nwb file or htk directory.
+    metafile : str or path
+        Path to the metadata YAML file.
+    session : str
+        Session name. If None, the user is asked for it.
+    log_io : bool
+        If True, prints bytes read and decompressed for every redraw.
+    frame_log : str or path, optional
+        JSON-lines file where the timing of every redraw is appended.
+    show_timing : bool
+        If True, shows the timing of the last redraw over the signals panel.
+    memory_budget : float, optional
+        Memory for all the caches of the viewer, in MB. By default, the
+        'memory_budget' of the settings file, see `read_config`, or 1024 MB.
     """
     keyPressed = QtCore.pyqtSignal(QtCore.QEvent)
 
-    def __init__(self, source_path=None, metafile=None, session=None):
+    def __init__(self, source_path=None, metafile=None, session=None, log_io=False,
+                 frame_log=None, show_timing=False, memory_budget=None):
         super().__init__()
         # Enable anti-aliasing for prettier plots
         pg.setConfigOptions(antialias=True)
@@ -83,9 +102,18 @@ class Application(QMainWindow):
             with open(metafile) as f:
                 self.metadata = yaml.safe_load(f)
 
+        self.log_io = log_io
+        self.frame_log = frame_log
+        self.show_timing = show_timing
         self.error = None
         self.keyPressed.connect(self.on_key)
         self.active_mode = 'default'
+        # One memory ceiling for all the caches of the viewer
+        if memory_budget is None:
+            memory_budget = read_config().get('memory_budget', default_memory_budget_)
+        self.memory_budget = MemoryBudget(max_bytes=float(memory_budget) * 1e6)
+        # Read-only files of the neighbouring blocks, opened in the background
+        self.handle_pool = HandlePool(budget=self.memory_budget)
 
         self.init_gui()
         self.show()
@@ -104,18 +132,22 @@ class Application(QMainWindow):
 
         # Run the main plotting function
         if self.source_path.is_file():
+            from ecogvis.functions.subFunctions import TimeSeriesPlotter
             self.model = TimeSeriesPlotter(self)
 
     def closeEvent(self, event):
         """Before exiting, checks if there are any unsaved changes and inform the user."""
+        from ecogvis.functions.misc_dialogs import ExitDialog
         w = ExitDialog(self)
         if w.value == -1:  # just exit
             self.model.close_nwbfile()
+            self.handle_pool.close()
             event.accept()
         elif w.value == 1:  # save and exit
             self.AnnotationSave()
             self.IntervalSave()
             self.model.close_nwbfile()
+            self.handle_pool.close()
             event.accept()
         elif w.value == 0:  # ignore
             event.ignore()
@@ -223,6 +255,10 @@ class Application(QMainWindow):
         toolsMenu.addAction(self.action_vis_electrodes)
         self.action_vis_electrodes.triggered.connect(self.visualize_electrodes)
 
+        action_memory_usage = QAction('Memory Usage', self)
+        toolsMenu.addAction(action_memory_usage)
+        action_memory_usage.triggered.connect(self.memory_usage)
+
         helpMenu = mainMenu.addMenu('Help')
         action_about = QAction('About', self)
         helpMenu.addAction(action_about)
@@ -332,12 +368,19 @@ class Application(QMainWindow):
         qlabelStimuli = QLabel('Stimuli:')
         self.combo4 = QComboBox()
         self.combo4.activated.connect(self.choose_stim)
+        qlabelScaling = QLabel('Scaling:')
+        self.combo5 = QComboBox()
+        self.combo5.addItem('window std')
+        self.combo5.addItem('global std')
+        self.combo5.activated.connect(self.verticalScale)
 
         grid2 = QGridLayout()
         grid2.addWidget(qlabelSignal, 0, 0, 1, 1)
         grid2.addWidget(self.combo3, 0, 1, 1, 1)
         grid2.addWidget(qlabelStimuli, 1, 0, 1, 1)
         grid2.addWidget(self.combo4, 1, 1, 1, 1)
+        grid2.addWidget(qlabelScaling, 2, 0, 1, 1)
+        grid2.addWidget(self.combo5, 2, 1, 1, 1)
         grid2.setAlignment(QtCore.Qt.AlignTop)
         panel2.setLayout(grid2)
 
@@ -461,19 +504,44 @@ class Application(QMainWindow):
         self.hbox.addLayout(self.vbox1)    # add panels first
         self.hbox.addLayout(self.vbox2)    # add plots second
 
-    def change_block(self, move):
-        """Move between Block files for the same subject."""
+    def block_files(self):
+        """Block files of the current subject, sorted by block number."""
         fpath = os.path.split(os.path.abspath(self.source_path))[0]  # current directory
         fname = os.path.split(os.path.abspath(self.source_path))[1]  # current file
-        pre, _ = fname.split('_B')
+        if '_B' not in fname:
+            return [str(self.source_path)]
+        pre = fname.split('_B')[0]
         flist = glob.glob(fpath + '/' + pre + '_B*.nwb')
-        curr_ind = flist.index(self.source_path)
-        if curr_ind + move == len(flist):
-            new_file = flist[0]
-        else:
-            new_file = flist[curr_ind + move]
+
+        def block_number(f):
+            block = os.path.basename(f)[len(pre) + 2:-4]
+            return (0, int(block), f) if block.isdigit() else (1, 0, f)
+        return sorted(flist, key=block_number)
+
+    def change_block(self, move):
+        """Move between Block files for the same subject."""
+        flist = self.block_files()
+        curr_ind = flist.index(str(self.source_path))
+        new_file = flist[(curr_ind + move) % len(flist)]
         self.open_another_file(filename=new_file)
 
+    def prewarm_blocks(self):
+        """Opens the previous and next blocks of the subject in the background."""
+        flist = self.block_files()
+        if len(flist) < 2 or str(self.source_path) not in flist:
+            return
+        curr_ind = flist.index(str(self.source_path))
+        neighbours = {flist[(curr_ind - 1) % len(flist)], flist[(curr_ind + 1) % len(flist)]}
+        self.handle_pool.prewarm(sorted(neighbours))
+
+    def writable_file(self):
+        """
+        Re-opens the current file in read/write mode and closes the read-only
+        files of the other blocks, before anything is written to them.
+        """
+        self.handle_pool.clear()
+        self.model.make_writable()
+
     def open_file(self):
         """Opens initial file."""
         filename, _ = QFileDialog.getOpenFileName(None, 'Open file', '', "(*.nwb)")
@@ -481,11 +549,12 @@ class Application(QMainWindow):
 
     def open_another_file(self, filename=None):
         """Opens another NWB file."""
+        from ecogvis.functions.subFunctions import TimeSeriesPlotter
         if filename is None:  # Opens new file dialog
             filename, _ = QFileDialog.getOpenFileName(None, 'Open file', '', "(*.nwb)")
         if os.path.isfile(filename):
             if hasattr(self, 'model'):
-                self.model.io.close()
+                self.model.close_nwbfile()
             self.source_path = Path(filename)
             # Reset file specific variables on GUI
             self.combo3.setCurrentIndex(self.combo3.findText('raw'))
@@ -509,10 +578,13 @@ class Application(QMainWindow):
         Dialog for user selection of directory containing block of HTK files.
         Assembles a nwbfile object (in memory) from htk files.
         """
+        from ecogvis.functions.subFunctions import TimeSeriesPlotter
+        from ecogvis.functions.misc_dialogs import LoadHTKDialog
+        from ecogvis.functions.htk_to_nwb.chang2nwb import chang2nwb
         w = LoadHTKDialog(parent=self)
         if w.value == 1 and w.htk_config:
             if hasattr(self, 'model'):
-                self.model.io.close()
+                self.model.close_nwbfile()
             htk_source_path = Path(w.htk_config['ecephys_path'])
             self.metadata = w.htk_config['metadata']
             # Run conversion
@@ -546,6 +618,8 @@ class Application(QMainWindow):
         nwb file to the new file. This dictionary is passed to nwb_copy_file()
         function.
         """
+        from ecogvis.functions.save_to_nwb import SaveToNWBDialog
+        from ecogvis.functions.nwb_copy_file import nwb_copy_file
         save_dialog = SaveToNWBDialog(parent=self)
         if save_dialog.value:
             print('Copying content to new nwb file, please wait...')
@@ -620,12 +694,16 @@ class Application(QMainWindow):
 
     def spectral_decomposition(self):
         """Opens Spectral decomposition dialog."""
+        from ecogvis.functions.misc_dialogs import SpectralChoiceDialog
+        self.writable_file()
         w = SpectralChoiceDialog(self)
         if w.value == 1:       # If new data was created
             self.model.refresh_file()
 
     def event_related_potential(self):
         """Opens ERP window."""
+        from ecogvis.functions.misc_dialogs import NoHighGammaDialog, NoTrialsDialog
+        from ecogvis.functions.event_related_potential import ERPDialog
         open_dialog = True
         # if no intervals exist, raise a no intervals data message
         if len(self.model.nwb.intervals)==0:
@@ -642,10 +720,13 @@ class Application(QMainWindow):
 
     def audio_event_detection(self):
         """Opens Audio Event Detection window."""
+        from ecogvis.functions.misc_dialogs import NoAudioDialog, ExistIntervalsDialog
+        from ecogvis.functions.audio_event_detection import AudioEventDetection
         # Test if trials already exist
         if 'TimeIntervals_speaker' not in self.model.nwb.intervals:
             # Test if file contains audio signals
             if any(name in self.model.nwb.stimulus for name in ['speaker1', 'speaker2']):
+                self.writable_file()
                 AudioEventDetection(parent=self)
             else:
                 NoAudioDialog()
@@ -654,9 +735,11 @@ class Application(QMainWindow):
 
     def add_survey(self):
         """Add survey data from .mat file to current nwb file."""
+        from ecogvis.functions.survey_data import add_survey_data
         # Open file dialog
         path_file, _ = QFileDialog.getOpenFileName(None, 'Open file', '', "(*.mat)")
         if os.path.isfile(path_file):
+            self.writable_file()
             add_survey_data(nwbfile=self.model.nwb, path_survey_file=path_file)
             self.action_vis_survey.setEnabled(True)
             self.action_add_survey.setEnabled(False)
@@ -665,6 +748,7 @@ class Application(QMainWindow):
 
     def visualize_survey(self):
         """Visualize survey data in current nwb file."""
+        from ecogvis.functions.misc_dialogs import ShowSurveyDialog
         # Test if current nwb file contains Survey table
         if 'behavior' in self.model.nwb.processing:
             list_surveys = [v for v in self.model.nwb.processing['behavior'].data_interfaces.values()
@@ -674,8 +758,10 @@ class Application(QMainWindow):
 
     def add_transcription_timitsounds(self):
         """Add TimitSounds transcription data to current nwb file."""
+        from ecogvis.functions.transcription_data import add_transcription_data
         dir_path = QFileDialog.getExistingDirectory(self, 'Open TimitSounds dir', '', QtGui.QFileDialog.ShowDirsOnly)
         if os.path.isdir(dir_path):
+            self.writable_file()
             _ = add_transcription_data(
                 nwbfile=self.model.nwb,
                 path_transcription=dir_path,
@@ -689,8 +775,10 @@ class Application(QMainWindow):
 
     def add_transcription_mocha(self):
         """Add Mocha transcription data to current nwb file."""
+        from ecogvis.functions.transcription_data import add_transcription_data
         dir_path = QFileDialog.getExistingDirectory(self, 'Open Mocha dir', '', QtGui.QFileDialog.ShowDirsOnly)
         if os.path.isdir(dir_path):
+            self.writable_file()
             nwbfile = add_transcription_data(
                 nwbfile=self.model.nwb,
                 path_transcription=dir_path,
@@ -710,8 +798,10 @@ class Application(QMainWindow):
 
     def add_transcription_textgrid(self):
         """Add TextGrid transcription data to current nwb file."""
+        from ecogvis.functions.transcription_data import add_transcription_data
         filename, _ = QFileDialog.getOpenFileName(None, 'Open file', '', "(*.TextGrid)")
         if os.path.isfile(filename):
+            self.writable_file()
             add_transcription_data(
                 nwbfile=self.model.nwb,
                 path_transcription=filename,
@@ -725,6 +815,7 @@ class Application(QMainWindow):
 
     def visualize_transcription(self):
         """Visualize transcription behavioral data in current nwb file."""
+        from ecogvis.functions.misc_dialogs import ShowTranscriptionDialog
         # # Test if current nwb file contains Survey table
         # if 'behavior' in self.model.nwb.processing:
         #     list_surveys = [v for v in self.model.nwb.processing['behavior'].data_interfaces.values()
@@ -736,8 +827,14 @@ class Application(QMainWindow):
 
     def visualize_electrodes(self):
         """Visualize electrodes tables in current nwb file."""
+        from ecogvis.functions.misc_dialogs import ShowElectrodesDialog
         ShowElectrodesDialog(parent=self)
 
+    def memory_usage(self):
+        """Memory used by the caches of the viewer, with their hit rates."""
+        from ecogvis.functions.misc_dialogs import MemoryUsageDialog
+        MemoryUsageDialog(self.memory_budget)
+
     def about(self):
         """About dialog."""
         msg = QMessageBox()
@@ -813,6 +910,7 @@ class Application(QMainWindow):
     # Interval functions ------------------------------------------------------
     def IntervalType(self):
         """Add new interval type."""
+        from ecogvis.functions.misc_dialogs import CustomIntervalDialog
         global intervalType_
         global intervalsDict_
 
@@ -868,6 +966,7 @@ class Application(QMainWindow):
 
     def ChannelSelect(self):
         """Opens dialog to select channels from specific brain regions."""
+        from ecogvis.functions.misc_dialogs import SelectChannelsDialog
         self.active_mode = 'default'
         self.reset_buttons()
         # Dialog to choose channels from specific brain regions
@@ -875,10 +974,7 @@ class Application(QMainWindow):
             stringlist=self.model.all_regions,
             checked=self.model.regions_mask
         )
-        all_locs = self.model.electrodes_table['location'][self.model.electrical_series_channel_ids]
-        self.model.channels_mask = np.zeros(len(all_locs))
-        for loc in w.choices:
-            self.model.channels_mask += all_locs == np.array(loc)
+        self.model.channels_mask = self.model.channel_meta.in_regions(w.choices)
         # Indices of channels from chosen regions
         self.model.channels_mask_ind = np.where(self.model.channels_mask)[0]
         self.model.n_channels_total = len(self.model.channels_mask_ind)
@@ -890,17 +986,19 @@ class Application(QMainWindow):
         self.qline1.setText(str(self.model.firstCh))
         # Update signals plot
         self.model.selectedChannels = self.model.channels_mask_ind[self.model.firstCh - 1:self.model.lastCh]
-        self.model.refreshScreen()
+        self.model.refreshScreen(['signals'])
 
     def PeriodogramSelect(self):
         """Opens Periodogram grid window. Checks if PSD data is present on file
         and, if not, asks the user if it should be calculated."""
+        from ecogvis.functions.misc_dialogs import PeriodogramGridDialog, NoSpectrumDialog
         if self.combo3.currentText() == 'raw':
             try:  # tries to read fft and welch spectral data
                 psd_fft = self.model.nwb.modules['ecephys'].data_interfaces['Spectrum_fft_raw']
                 psd_welch = self.model.nwb.modules['ecephys'].data_interfaces['Spectrum_welch_raw']
                 PeriodogramGridDialog(self)
             except:
+                self.writable_file()
                 w = NoSpectrumDialog(self, 'raw')
                 if w.val == 1:  # PSD was calculated
                     self.model.refresh_file()  # re-opens the file, now with new data
@@ -914,6 +1012,7 @@ class Application(QMainWindow):
                 psd_welch = self.model.nwb.modules['ecephys'].data_interfaces['Spectrum_welch_preprocessed']
                 PeriodogramGridDialog(self)
             except:
+                self.writable_file()
                 w = NoSpectrumDialog(self, 'preprocessed')
                 if w.val == 1:  # PSD was calculated
                     self.model.refresh_file()  # re-opens the file, now with new data
@@ -924,6 +1023,8 @@ class Application(QMainWindow):
 
     def Preprocess(self):
         """Opens Preprocessing dialog."""
+        from ecogvis.functions.misc_dialogs import PreprocessingDialog
+        self.writable_file()
         w = PreprocessingDialog(self)
         if w.value == 1:       # If new data was created
             self.model.refresh_file()        # re-opens the file, now with new data
@@ -932,6 +1033,8 @@ class Application(QMainWindow):
 
     def CalcHighGamma(self):
         """Opens calculate High Gamma dialog."""
+        from ecogvis.functions.misc_dialogs import HighGammaDialog
+        self.writable_file()
         w = HighGammaDialog(self)
         if w.value == 1:       # If new data was created
             self.open_another_file(filename=w.new_fname)
@@ -943,19 +1046,17 @@ class Application(QMainWindow):
         - 'preprocessed': Preprocessed voltage traces, stored in nwb.processing['ecephys'].data_interfaces['LFP'].electrical_series['preprocessed']
         - 'high gamma': High Gamma estimation traces, stored in nwb.processing['ecephys'].data_interfaces['high_gamma']
         """
+        from ecogvis.functions.misc_dialogs import NoHighGammaDialog, NoPreprocessedDialog, NoRawDialog
         if self.combo3.currentText() == 'raw':
             lis = list(self.model.nwb.acquisition.keys())
             there_is_raw = False
             for i in lis:  # Check if there is ElectricalSeries in acquisition group
                 if type(self.model.nwb.acquisition[i]).__name__ == 'ElectricalSeries':
-                    self.model.source = self.model.nwb.acquisition[i]
+                    raw_source = self.model.nwb.acquisition[i]
                     there_is_raw = True
             if there_is_raw:
                 self.model.plot_panel = 'voltage_raw'
-                self.model.plotData = self.model.source.data
-                self.model.nBins = self.model.plotData.shape[0]     # total number of bins
-                self.model.fs_signal = self.model.source.rate     # sampling frequency [Hz]
-                self.model.tbin_signal = 1 / self.model.fs_signal  # time bin duration [seconds]
+                self.model.set_source(raw_source)
                 self.push5_0.setEnabled(True)
                 self.push6_0.setEnabled(True)
                 self.push7_0.setEnabled(False)
@@ -965,12 +1066,8 @@ class Application(QMainWindow):
                 NoRawDialog()
         elif self.combo3.currentText() == 'preprocessed':
             try:   # if preprocessed signals already exist on NWB file
-                self.model.source = self.model.nwb.processing['ecephys'].data_interfaces['LFP'].electrical_series['preprocessed']
-                self.model.plotData = self.model.source.data
+                self.model.set_source(self.model.nwb.processing['ecephys'].data_interfaces['LFP'].electrical_series['preprocessed'])
                 self.model.plot_panel = 'voltage_preprocessed'
-                self.model.nBins = self.model.source.data.shape[0]
-                self.model.fs_signal = self.model.source.rate
-                self.model.tbin_signal = 1 / self.model.fs_signal
                 self.push5_0.setEnabled(True)
                 self.push6_0.setEnabled(False)
                 self.push7_0.setEnabled(True)
@@ -980,12 +1077,8 @@ class Application(QMainWindow):
                 NoPreprocessedDialog()
         elif self.combo3.currentText() == 'high gamma':
             try:     # if high gamma already exists on NWB file
-                self.model.source = self.model.nwb.processing['ecephys'].data_interfaces['high_gamma']
-                self.model.plotData = self.model.source.data
+                self.model.set_source(self.model.nwb.processing['ecephys'].data_interfaces['high_gamma'])
                 self.model.plot_panel = 'spectral_power'
-                self.model.nBins = self.model.source.data.shape[0]
-                self.model.fs_signal = self.model.source.rate
-                self.model.tbin_signal = 1 / self.model.fs_signal
                 self.push5_0.setEnabled(False)
                 self.push6_0.setEnabled(False)
                 self.push7_0.setEnabled(False)
@@ -993,14 +1086,13 @@ class Application(QMainWindow):
                 self.combo3.setCurrentIndex(self.combo3.findText('preprocessed'))
                 self.voltage_time_series()
                 NoHighGammaDialog()
-        self.model.updateCurXAxisPosition()    # updates time points
-        self.model.refreshScreen()
+        self.model.updateCurXAxisPosition()    # updates time points and re-draws
 
     def choose_stim(self):
         """Choose stimulus."""
         stimName = self.combo4.currentText()
         if stimName != '':
-            self.model.refreshScreen()
+            self.model.refreshScreen(['stimulus'])
 
     # Plot control buttons ----------------------------------------------------
     def scroll_up(self):
@@ -1035,19 +1127,19 @@ class Application(QMainWindow):
 
     def verticalScale(self):
         """Updates vertical scale and refreshes plot."""
-        self.model.refreshScreen()
+        self.model.refreshScreen(['signals'])
 
     def verticalScaleIncrease(self):
         """Increases vertical scale by a factor of 2."""
         scaleFac = float(self.qline4.text())
         self.qline4.setText(str(scaleFac * 2))
-        self.model.refreshScreen()
+        self.model.refreshScreen(['signals'])
 
     def verticalScaleDecrease(self):
         """Decreases vertical scale by a factor of 2."""
         scaleFac = float(self.qline4.text())
         self.qline4.setText(str(scaleFac / 2))
-        self.model.refreshScreen()
+        self.model.refreshScreen(['signals'])
 
     def time_window_size(self):
         self.model.updateCurXAxisPosition()
@@ -1131,18 +1223,22 @@ class CustomViewBox(pg.ViewBox):
                         session = self.parent.current_session
                         intervalsDict_[intervalType_]['counts'] += 1
                         self.parent.model.IntervalAdd(interval, intervalType_, color, session)
-                        self.parent.model.refreshScreen()
 
 
 # If it is imported as a module
-def main(source_path='', metafile=None):
+def main(source_path='', metafile=None, log_io=False, frame_log=None, show_timing=False,
+         memory_budget=None):
     import sys
 
     # Sets up QT application
     app = QCoreApplication.instance()
     if app is None:
+        # QtWebEngineWidgets is imported with the dialogs, after the app exists
+        QCoreApplication.setAttribute(QtCore.Qt.AA_ShareOpenGLContexts)
         app = QApplication(sys.argv)  # instantiate a QtGui (holder for the app)
-    ex = Application(source_path=source_path, metafile=metafile)
+    ex = Application(source_path=source_path, metafile=metafile, log_io=log_io,
+                     frame_log=frame_log, show_timing=show_timing,
+                     memory_budget=memory_budget)
     sys.exit(app.exec_())
 
 
@@ -1164,6 +1260,33 @@ def parse_arguments():
         default=None,
         help="The path to the metadata YAML file."
     )
+    parser.add_argument(
+        "--log-io",
+        action='store_true',
+        help="Print bytes read and decompressed for every redraw."
+    )
+    parser.add_argument(
+        "--frame-log",
+        default=None,
+        help="JSON-lines file where the timing of every redraw is appended."
+    )
+    parser.add_argument(
+        "--show-timing",
+        action='store_true',
+        help="Show the timing of the last redraw over the signals panel."
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=float,
+        default=None,
+        help="Memory for all the caches of the viewer, in MB "
+             "(default: 'memory_budget' of the settings file, or 1024)."
+    )
+    parser.add_argument(
+        "--config",
+        default=None,
+        help="Settings YAML file (default: ~/.ecogvis.yml)."
+    )
 
     # Parse arguments
     args = parser.parse_args()
@@ -1174,14 +1297,21 @@ def parse_arguments():
     # Metadata file (.yml)
     metafile = args.metafile
 
-    return source_path, metafile
+    # Memory budget (MB), from the command line or the settings file
+    memory_budget = args.memory_budget
+    if memory_budget is None:
+        memory_budget = read_config(args.config).get('memory_budget')
+
+    return source_path, metafile, args.log_io, args.frame_log, args.show_timing, memory_budget
 
 
 def cmd_line_shortcut():
-    source_path, metafile = parse_arguments()
-    main(source_path=source_path, metafile=metafile)
+    source_path, metafile, log_io, frame_log, show_timing, memory_budget = parse_arguments()
+    main(source_path=source_path, metafile=metafile, log_io=log_io,
+         frame_log=frame_log, show_timing=show_timing, memory_budget=memory_budget)
 
 
 if __name__ == '__main__':
-    source_path, metafile = parse_arguments()
-    main(source_path=source_path, metafile=metafile)
+    source_path, metafile, log_io, frame_log, show_timing, memory_budget = parse_arguments()
+    main(source_path=source_path, metafile=metafile, log_io=log_io,
+         frame_log=frame_log, show_timing=show_timing, memory_budget=memory_budget)
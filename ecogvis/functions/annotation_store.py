@@ -0,0 +1,106 @@
+import numpy as np
+
+
+class AnnotationStore:
+    """
+    Annotations of the signals panel, kept as columns sorted by time, so that
+    the annotations of a window are found by binary search.
+
+    Attributes
+    ----------
+    ids : ndarray of int
+        Unique id of every annotation, kept across insertions and deletions.
+    x : ndarray of float
+        X position (time).
+    y_va : ndarray of float
+        Y coordinate transformed to variance_units (for plot control).
+    y_off : ndarray of float
+        Y offset, usually the bottom channel on plot when annotation is saved.
+    color : ndarray of str
+        Annotation color: 'yellow', 'red', 'green' or 'blue'.
+    text : ndarray of str
+        Annotation text.
+    session : ndarray of str
+        Session name.
+    """
+    columns = ('ids', 'x', 'y_va', 'y_off', 'color', 'text', 'session')
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype='int64')
+        self.x = np.zeros(0)
+        self.y_va = np.zeros(0)
+        self.y_off = np.zeros(0)
+        self.color = np.zeros(0, dtype=object)
+        self.text = np.zeros(0, dtype=object)
+        self.session = np.zeros(0, dtype=object)
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.x)
+
+    def add(self, x, y_va, y_off, color, text, session):
+        """Adds one annotation, returns its id."""
+        index = np.searchsorted(self.x, x, side='right')
+        values = (self._next_id, x, y_va, y_off, color, text, session)
+        for name, value in zip(self.columns, values):
+            setattr(self, name, np.insert(getattr(self, name), index, value))
+        self._next_id += 1
+        return self._next_id - 1
+
+    def extend(self, x, y_va, y_off, color, text, session):
+        """Adds many annotations at once, e.g. loaded from a file."""
+        n = len(x)
+        new = {
+            'ids': np.arange(self._next_id, self._next_id + n),
+            'x': np.asarray(x, dtype='float64'),
+            'y_va': np.asarray(y_va, dtype='float64'),
+            'y_off': np.asarray(y_off, dtype='float64'),
+            'color': np.asarray(color, dtype=object),
+            'text': np.asarray(text, dtype=object),
+            'session': np.asarray(session, dtype=object),
+        }
+        x_all = np.concatenate((self.x, new['x']))
+        order = np.argsort(x_all, kind='stable')
+        for name in self.columns:
+            setattr(self, name, np.concatenate((getattr(self, name), new[name]))[order])
+        self._next_id += n
+
+    def delete(self, index):
+        """Deletes the annotation at position `index`, returns its id."""
+        ann_id = int(self.ids[index])
+        for name in self.columns:
+            setattr(self, name, np.delete(getattr(self, name), index))
+        return ann_id
+
+    def window(self, x0, x1):
+        """Slice of the annotations with x0 <= x <= x1."""
+        return slice(int(np.searchsorted(self.x, x0, side='left')),
+                     int(np.searchsorted(self.x, x1, side='right')))
+
+    def nearest(self, x, y, y_scale, y_ref):
+        """
+        Position of the annotation closest to a point of the plot, or None if
+        there are no annotations.
+
+        Parameters
+        ----------
+        x, y : float
+            Point in plot coordinates.
+        y_scale : float
+            Plot units per variance unit.
+        y_ref : int
+            Bottom channel on plot.
+        """
+        if len(self.x) == 0:
+            return None
+        # The closest annotation in time bounds the search radius
+        i = np.searchsorted(self.x, x)
+        neighbours = np.arange(max(i - 1, 0), min(i + 1, len(self.x)))
+        radius = np.min(self._distances(neighbours, x, y, y_scale, y_ref))
+        candidates = np.arange(*self.window(x - radius, x + radius).indices(len(self.x)))
+        distances = self._distances(candidates, x, y, y_scale, y_ref)
+        return int(candidates[np.argmin(distances)])
+
+    def _distances(self, index, x, y, y_scale, y_ref):
+        y_ann = np.round((self.y_va[index] + self.y_off[index] - y_ref) * y_scale)
+        return np.sqrt((self.x[index] - x)**2 + (y_ann - y)**2)
@@ -0,0 +1,88 @@
+import numpy as np
+import pyqtgraph as pg
+
+
+def stack_segments(x, Y):
+    """
+    Concatenates several traces that share the same x values into a single
+    disconnected polyline.
+
+    Parameters
+    ----------
+    x : ndarray (nPoints,)
+        Shared x values.
+    Y : ndarray (nTraces, nPoints)
+        One trace per row.
+
+    Returns
+    -------
+    xs, ys : ndarray (nTraces * nPoints,)
+        Concatenated points.
+    connect : ndarray (nTraces * nPoints,) of int32
+        1 where a point connects to the next one, 0 at the end of each trace.
+    """
+    nTraces, nPoints = Y.shape
+    xs = np.tile(x, nTraces)
+    ys = np.ravel(Y)
+    connect = np.ones((nTraces, nPoints), dtype='int32')
+    connect[:, -1] = 0
+    return xs, ys, np.ravel(connect)
+
+
+class ChannelCurves:
+    """
+    Persistent curves of the signals panel, one per pen class, so that a redraw
+    only updates vertex arrays instead of creating one plot item per channel.
+
+    Pen classes are 'even' and 'odd' (alternating colours of good channels),
+    'bad' (channels marked as bad) and 'reference' (the baseline of every
+    channel).
+
+    Parameters
+    ----------
+    plot : pyqtgraph.PlotWidget
+        Signals panel.
+    """
+    pens = {
+        'reference': ('k', 1),
+        'even': ((0, 0, 200), 1.2),
+        'odd': ((0, 120, 0), 1.2),
+        'bad': ((220, 0, 0), 1.2),
+    }
+
+    def __init__(self, plot):
+        self.plot = plot
+        self.curves = {}
+        for name, (color, width) in self.pens.items():
+            curve = pg.PlotCurveItem(pen=pg.mkPen(color, width=width), antialias=False)
+            self.curves[name] = curve
+            plot.addItem(curve)
+
+    def set_data(self, x, Y, bad, offsets, x_range):
+        """
+        Updates all curves.
+
+        Parameters
+        ----------
+        x : ndarray (nPoints,)
+            Time of every point.
+        Y : ndarray (nChannels, nPoints)
+            Traces, already scaled and offset.
+        bad : ndarray (nChannels,) of bool
+            True for bad channels.
+        offsets : ndarray (nChannels,)
+            Baseline of every channel.
+        x_range : tuple
+            (start, end) of the reference lines.
+        """
+        parity = np.arange(Y.shape[0]) % 2 == 0
+        groups = {'even': ~bad & parity, 'odd': ~bad & ~parity, 'bad': bad}
+        for name, mask in groups.items():
+            if np.any(mask):
+                xs, ys, connect = stack_segments(x, Y[mask])
+                self.curves[name].setData(xs, ys, connect=connect)
+            else:
+                self.curves[name].setData([], [])
+        ref = np.repeat(np.reshape(offsets, (-1, 1)), 2, axis=1)
+        xs, ys, connect = stack_segments(np.asarray(x_range, dtype='float64'), ref)
+        self.curves['reference'].setData(xs, ys, connect=connect)
@@ -0,0 +1,191 @@
+import threading
+
+import numpy as np
+
+from ecogvis.functions.memory_budget import MemoryBudget, BudgetedCache
+
+
+class ChunkCache(BudgetedCache):
+    """
+    Cache of decoded dataset chunks, shared by all the series of an open
+    file. Without a memory budget shared with other caches, it gets its own.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total size of the cached chunks, without `budget`.
+    budget : MemoryBudget, optional
+        Memory budget shared with the other caches of the viewer.
+    name : str
+        Name shown in the diagnostics, e.g. the file name.
+    """
+    def __init__(self, max_bytes=256e6, budget=None, name='chunks'):
+        if budget is None:
+            budget = MemoryBudget(max_bytes)
+        super().__init__(budget, name)
+
+
+def _bounds(index, size):
+    """Bounding range of a 1D index and the index relative to that range."""
+    if isinstance(index, slice):
+        start, stop, step = index.indices(size)
+        stop = max(stop, start)
+        if step == 1:
+            return start, stop, slice(None)
+        return start, stop, slice(None, None, step)
+    if np.isscalar(index):
+        index = int(index) % size
+        return index, index + 1, 0
+    index = np.asarray(index)
+    if index.dtype == bool:
+        index = np.where(index)[0]
+    if len(index) == 0:
+        return 0, 0, slice(None)
+    start = int(index.min())
+    return start, int(index.max()) + 1, index - start
+
+
+class CachedDataset:
+    """
+    Read-only view of a (nSamples, nChannels) dataset that serves reads from
+    a ChunkCache, reading missing chunks from disk in contiguous runs.
+
+    Parameters
+    ----------
+    data : h5py.Dataset or ndarray
+        Source data.
+    cache : ChunkCache
+        Cache shared by all series of the file.
+    block_rows : int
+        Rows per cache block when the dataset is not chunked.
+    """
+    def __init__(self, data, cache, block_rows=4096):
+        self.data = data
+        self.cache = cache
+        self.shape = data.shape
+        self.dtype = data.dtype
+        self.ndim = len(data.shape)
+        self.chunks = getattr(data, 'chunks', None)
+        self.name = getattr(data, 'name', None)
+        filename = getattr(getattr(data, 'file', None), 'filename', '')
+        self.key = (filename, self.name or str(id(data)))
+        self.last_read_bytes = 0    # bytes read from disk by the last read
+        if self.chunks is not None:
+            self.block_shape = (self.chunks[0], self.chunks[1] if self.ndim > 1 else 1)
+        else:
+            self.block_shape = (block_rows, self.shape[1] if self.ndim > 1 else 1)
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __getitem__(self, item):
+        if not isinstance(item, tuple):
+            item = (item,)
+        rows = item[0]
+        cols = item[1] if len(item) > 1 else slice(None)
+        t0, t1, rows_rel = _bounds(rows, self.shape[0])
+        if self.ndim == 1:
+            return self.read(t0, t1, 0, 1)[:, 0][rows_rel]
+        c0, c1, cols_rel = _bounds(cols, self.shape[1])
+        block = self.read(t0, t1, c0, c1)
+        if isinstance(rows_rel, np.ndarray) and isinstance(cols_rel, np.ndarray):
+            return block[rows_rel][:, cols_rel]
+        return block[rows_rel, cols_rel]
+
+    def block_ranges(self, t0, t1, c0, c1):
+        """Block coordinates overlapping a hyperslab."""
+        rows, cols = self.block_shape
+        ti = range(t0 // rows, (t1 - 1) // rows + 1) if t1 > t0 else range(0)
+        ci = range(c0 // cols, (c1 - 1) // cols + 1) if c1 > c0 else range(0)
+        return ti, ci
+
+    def load(self, t0, t1, c0, c1, prefetch=False):
+        """
+        Loads the missing blocks overlapping a hyperslab into the cache and
+        returns all of them, keyed by block coordinates.
+        """
+        rows, cols = self.block_shape
+        ti_range, ci_range = self.block_ranges(t0, t1, c0, c1)
+        blocks = {}
+        read_bytes = 0
+        for ci in ci_range:
+            b_c0 = ci * cols
+            b_c1 = min(b_c0 + cols, self.shape[1] if self.ndim > 1 else 1)
+            missing = []
+            for ti in ti_range:
+                block = self.cache.get((self.key, (ti, ci)), count=not prefetch)
+                if block is None:
+                    missing.append(ti)
+                else:
+                    blocks[(ti, ci)] = block
+            # Read consecutive missing blocks with a single call
+            runs = np.split(missing, np.where(np.diff(missing) != 1)[0] + 1) if missing else []
+            for run in runs:
+                r0 = int(run[0]) * rows
+                r1 = min((int(run[-1]) + 1) * rows, self.shape[0])
+                if self.ndim > 1:
+                    arr = np.asarray(self.data[r0:r1, b_c0:b_c1])
+                else:
+                    arr = np.asarray(self.data[r0:r1]).reshape(-1, 1)
+                read_bytes += arr.nbytes
+                for ti in run:
+                    block = arr[(ti * rows - r0):((ti + 1) * rows - r0)].copy()
+                    self.cache.put((self.key, (int(ti), ci)), block)
+                    blocks[(int(ti), ci)] = block
+        if not prefetch:
+            self.last_read_bytes = read_bytes
+        return blocks
+
+    def read(self, t0, t1, c0, c1):
+        """Reads a hyperslab [t0:t1, c0:c1] as a 2D array."""
+        rows, cols = self.block_shape
+        out = np.empty((t1 - t0, c1 - c0), dtype=self.dtype)
+        for (ti, ci), block in self.load(t0, t1, c0, c1).items():
+            b_t0, b_c0 = ti * rows, ci * cols
+            a0, a1 = max(t0, b_t0), min(t1, b_t0 + block.shape[0])
+            d0, d1 = max(c0, b_c0), min(c1, b_c0 + block.shape[1])
+            out[a0 - t0:a1 - t0, d0 - c0:d1 - c0] = block[a0 - b_t0:a1 - b_t0, d0 - b_c0:d1 - b_c0]
+        return out
+
+
+class Prefetcher:
+    """
+    Background thread that loads blocks ahead of the current window, in the
+    direction of navigation. Only the latest request is kept.
+    """
+    def __init__(self):
+        self._request = None
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def request(self, dataset, t0, t1, c0, c1):
+        """Asks for [t0:t1, c0:c1] of a CachedDataset to be loaded."""
+        t0, t1 = max(t0, 0), min(t1, dataset.shape[0])
+        if t1 <= t0:
+            return
+        with self._cond:
+            self._request = (dataset, t0, t1, c0, c1)
+            self._cond.notify()
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._request = None
+            self._cond.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._request is None and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                dataset, t0, t1, c0, c1 = self._request
+                self._request = None
+            try:
+                dataset.load(t0, t1, c0, c1, prefetch=True)
+            except Exception as ex:
+                print('Prefetch failed: ' + str(ex))
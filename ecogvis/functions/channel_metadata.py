@@ -0,0 +1,85 @@
+import numpy as np
+
+
+class ChannelMetadata:
+    """
+    Metadata of the channels of an ElectricalSeries, read once from the
+    electrodes table and kept as numpy arrays, so that drawing a frame needs
+    no table lookups.
+
+    Parameters
+    ----------
+    source : ElectricalSeries
+        Series shown on the signals panel.
+
+    Attributes
+    ----------
+    rows : ndarray of int
+        Row of every channel in the electrodes table.
+    ids : ndarray of int
+        Electrode id of every channel.
+    labels : ndarray of str
+        Axis label of every channel (its electrode id).
+    bad : ndarray of bool
+        True for channels marked as bad.
+    regions : ndarray of str
+        Sorted brain regions present in the series.
+    region_codes : ndarray of int
+        Index in `regions` of the location of every channel.
+    """
+    def __init__(self, source):
+        self.table = source.electrodes.table
+        self.rows = np.asarray(source.electrodes.data[:], dtype='int64')
+        self.ids = np.asarray(self.table.id[:])[self.rows]
+        self.labels = self.ids.astype(str)
+        locations = np.asarray(self.table['location'][:], dtype=str)[self.rows]
+        self.regions, self.region_codes = np.unique(locations, return_inverse=True)
+        if 'bad' in self.table:
+            self.bad = np.asarray(self.table['bad'][:], dtype=bool)[self.rows]
+        else:
+            self.bad = np.zeros(len(self.rows), dtype=bool)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def locations(self):
+        """Brain region of every channel."""
+        return self.regions[self.region_codes]
+
+    @property
+    def bad_ids(self):
+        """Electrode ids of the bad channels."""
+        return self.ids[self.bad]
+
+    def set_bad(self, ids, bad=True):
+        """
+        Marks or un-marks channels as bad.
+
+        Parameters
+        ----------
+        ids : list of int
+            Electrode ids of the channels.
+        bad : bool
+            New state of the channels.
+        """
+        self.bad[np.isin(self.ids, ids)] = bad
+
+    def in_regions(self, regions):
+        """Boolean mask of the channels located in any of `regions`."""
+        return np.isin(self.region_codes, np.flatnonzero(np.isin(self.regions, regions)))
+
+    def write_bad(self):
+        """Stores the bad channels in the 'bad' column of the electrodes table."""
+        if 'bad' not in self.table:
+            is_bad = np.zeros(len(self.table), dtype=bool)
+            is_bad[self.rows] = self.bad
+            self.table.add_column(
+                name='bad',
+                description='electrode identified as too noisy',
+                data=is_bad.tolist(),
+            )
+        else:
+            is_bad = np.asarray(self.table['bad'][:], dtype=bool)
+            is_bad[self.rows] = self.bad
+            self.table['bad'].data[:] = is_bad.tolist()
@@ -0,0 +1,369 @@
+import hashlib
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+
+def sidecar_path(nwb_path):
+    """
+    Path of the viewer cache file that lives next to an NWB file.
+
+    Parameters
+    ----------
+    nwb_path : str or path
+        Path to the NWB file, e.g. '/path/to/EC1_B1.nwb'.
+
+    Returns
+    -------
+    Path such as '/path/to/EC1_B1.ecogvis_cache.h5'
+    """
+    nwb_path = Path(nwb_path)
+    return nwb_path.with_name(nwb_path.stem + '.ecogvis_cache.h5')
+
+
+def open_sidecar(nwb_path):
+    """
+    Opens (or creates) the viewer cache file of an NWB file. If the directory
+    is not writable, an in-memory file is returned instead, so the cache still
+    works for the current session.
+    """
+    path = sidecar_path(nwb_path)
+    try:
+        return h5py.File(str(path), 'a')
+    except (OSError, IOError):
+        print('Could not open cache file ' + str(path) + ', using in-memory cache.')
+        return h5py.File(str(path), 'w', driver='core', backing_store=False)
+
+
+def minmax_decimate(data, factor):
+    """
+    Reduces a (nSamples, nChannels) array to bins of `factor` samples.
+
+    Parameters
+    ----------
+    data : ndarray (nSamples, nChannels)
+        Signals.
+    factor : int
+        Number of samples per bin. The last bin may be incomplete.
+
+    Returns
+    -------
+    mins, maxs, sums : ndarray (nBins, nChannels)
+        Minimum, maximum and sum of the samples in each bin.
+    counts : ndarray (nBins,)
+        Number of samples in each bin.
+    """
+    nSamples = data.shape[0]
+    starts = np.arange(0, nSamples, factor)
+    mins = np.minimum.reduceat(data, starts, axis=0)
+    maxs = np.maximum.reduceat(data, starts, axis=0)
+    sums = np.add.reduceat(data, starts, axis=0, dtype='float64')
+    counts = np.diff(np.append(starts, nSamples))
+    return mins, maxs, sums, counts
+
+
+def interleave_envelope(mins, maxs, bin_starts, factor):
+    """
+    Turns min/max bins into a single trace that draws every bin as a vertical
+    segment, so no transient is lost when the trace is drawn at pixel
+    resolution.
+
+    Returns
+    -------
+    x : ndarray (2 * nBins,)
+        Sample positions (float) of every point, at the center of each bin.
+    y : ndarray (2 * nBins, nChannels)
+        Interleaved min and max values.
+    """
+    nBins = mins.shape[0]
+    y = np.empty((2 * nBins,) + mins.shape[1:], dtype=mins.dtype)
+    y[0::2] = mins
+    y[1::2] = maxs
+    x = np.repeat(bin_starts + factor / 2., 2)
+    return x, y
+
+
+class DecimationPyramid:
+    """
+    Multi-resolution min/max/mean envelopes of a (nSamples, nChannels) dataset,
+    stored in the viewer cache file.
+
+    Level k holds bins of `base_factor * step**k` samples. The same streaming
+    pass also stores running statistics (count, sum, sum of squares, min and
+    max) of every channel per chunk of the source dataset, from which the
+    statistics of any window are combined, see `stats`. Everything is reused
+    across sessions, as long as the source dataset does not change.
+
+    Parameters
+    ----------
+    cache : h5py.File
+        Viewer cache file, see `open_sidecar`.
+    key : str
+        Unique name of the source dataset, e.g. its HDF5 path.
+    data : h5py.Dataset or ndarray
+        Source data, (nSamples, nChannels) or (nSamples,).
+    base_factor : int
+        Number of samples per bin at the finest level.
+    step : int
+        Decimation factor between consecutive levels.
+    min_bins : int
+        Coarsest level still has at least this many bins.
+    """
+    def __init__(self, cache, key, data, base_factor=16, step=4, min_bins=256):
+        self.cache = cache
+        self.key = key.strip('/').replace('/', '__')
+        self.data = data
+        self.nSamples = data.shape[0]
+        self.nChannels = data.shape[1] if len(data.shape) > 1 else 1
+        self.base_factor = base_factor
+        self.step = step
+        self.factors = []
+        factor = base_factor
+        while self.nSamples // factor >= min_bins:
+            self.factors.append(factor)
+            factor *= step
+        chunks = getattr(data, 'chunks', None)
+        if chunks is not None:
+            self.stats_length = chunks[0]
+        elif len(self.factors) > 0:
+            self.stats_length = self.factors[-1]
+        else:
+            self.stats_length = self.nSamples
+        self.fingerprint = self._fingerprint()
+        self.ready = self._is_valid()
+        self._range = None
+        self._global_stats = None
+
+    def _fingerprint(self):
+        """Cheap identity of the source data: shape, dtype and edge samples."""
+        n = min(self.nSamples, 1024)
+        h = hashlib.sha1()
+        h.update(str(tuple(self.data.shape)).encode())
+        h.update(str(self.data.dtype).encode())
+        h.update(np.ascontiguousarray(self.data[:n]).tobytes())
+        h.update(np.ascontiguousarray(self.data[self.nSamples - n:]).tobytes())
+        return h.hexdigest()
+
+    def _is_valid(self):
+        if len(self.factors) == 0:
+            return False
+        if self.key not in self.cache:
+            return False
+        grp = self.cache[self.key]
+        return (grp.attrs.get('fingerprint', '') == self.fingerprint and
+                bool(grp.attrs.get('complete', False)) and 'stats' in grp)
+
+    def _block_length(self, target_bytes=32e6):
+        """
+        Block length of at most `target_bytes` (at least one bin of the finest
+        level), a multiple of the finest bin, and of the data chunks if they
+        align with it within `target_bytes`. Otherwise blocks read partial
+        chunks at their edges.
+        """
+        align = self.factors[0]
+        row_bytes = self.nChannels * np.dtype(self.data.dtype).itemsize
+        n_rows = max(int(target_bytes // row_bytes), align)
+        chunks = getattr(self.data, 'chunks', None)
+        if chunks is not None:
+            chunk_align = int(np.lcm(align, chunks[0]))
+            if chunk_align <= n_rows:
+                return n_rows // chunk_align * chunk_align
+        return n_rows // align * align
+
+    def build(self, is_cancelled=None):
+        """
+        Builds all levels in one streaming pass over the source data.
+
+        Parameters
+        ----------
+        is_cancelled : callable, optional
+            Called between blocks, the build stops if it returns True.
+
+        Returns
+        -------
+        True if the pyramid was completed.
+        """
+        if len(self.factors) == 0:
+            return False
+        if self.key in self.cache:
+            del self.cache[self.key]
+        grp = self.cache.create_group(self.key)
+        grp.attrs['fingerprint'] = self.fingerprint
+        grp.attrs['complete'] = False
+        grp.attrs['factors'] = self.factors
+        levels = []
+        for factor in self.factors:
+            nBins = int(np.ceil(self.nSamples / factor))
+            chunks = (min(nBins, 1024), self.nChannels)
+            lvl = grp.create_group('level_' + str(factor))
+            for name in ['min', 'max', 'mean']:
+                lvl.create_dataset(name, shape=(nBins, self.nChannels),
+                                   dtype='float32', chunks=chunks)
+            levels.append(lvl)
+        nRecords = int(np.ceil(self.nSamples / self.stats_length))
+        stats = grp.create_group('stats')
+        stats.attrs['length'] = self.stats_length
+        # Records are accumulated block by block, from these initial values
+        stats.create_dataset('count', shape=(nRecords,), dtype='int64', fillvalue=0)
+        for name, fill in [('sum', 0.), ('sumsq', 0.), ('min', np.inf), ('max', -np.inf)]:
+            stats.create_dataset(name, shape=(nRecords, self.nChannels), dtype='float64',
+                                 chunks=(min(nRecords, 1024), self.nChannels),
+                                 fillvalue=fill)
+
+        block_len = self._block_length()
+        pending = [(np.empty((0, self.nChannels), dtype=self.data.dtype),
+                    np.empty((0, self.nChannels), dtype=self.data.dtype),
+                    np.empty((0, self.nChannels)), np.empty(0, dtype=int)) for _ in levels]
+        next_bin = [0] * len(levels)
+        for start in range(0, self.nSamples, block_len):
+            if is_cancelled is not None and is_cancelled():
+                return False
+            stop = min(start + block_len, self.nSamples)
+            block = np.asarray(self.data[start:stop]).reshape(stop - start, self.nChannels)
+            # Running statistics per chunk. Blocks need not be aligned to the
+            # records, the first and last ones may be shared with other blocks
+            r0 = start // self.stats_length
+            r1 = (stop - 1) // self.stats_length + 1
+            starts = np.maximum(np.arange(r0, r1) * self.stats_length - start, 0)
+            stats['count'][r0:r1] += np.diff(np.append(starts, stop - start))
+            stats['sum'][r0:r1] += np.add.reduceat(block, starts, axis=0, dtype='float64')
+            stats['sumsq'][r0:r1] += np.add.reduceat(np.square(block, dtype='float64'),
+                                                     starts, axis=0)
+            stats['min'][r0:r1] = np.minimum(stats['min'][r0:r1],
+                                             np.minimum.reduceat(block, starts, axis=0))
+            stats['max'][r0:r1] = np.maximum(stats['max'][r0:r1],
+                                             np.maximum.reduceat(block, starts, axis=0))
+            # Finest level from raw samples, coarser levels from the previous
+            # one. Blocks are whole bins of the finest level only, the bins of
+            # the previous level that do not complete a coarser bin are kept
+            # for the next block
+            bins = minmax_decimate(block, self.factors[0])
+            for ii, lvl in enumerate(levels):
+                if ii > 0:
+                    bins = tuple(np.concatenate([p, b]) for p, b in zip(pending[ii], bins))
+                    n = len(bins[3])
+                    if stop < self.nSamples:
+                        n = n // self.step * self.step
+                    pending[ii] = tuple(b[n:] for b in bins)
+                    bins = tuple(b[:n] for b in bins)
+                    if n == 0:
+                        continue
+                    starts = np.arange(0, n, self.step)
+                    bins = (np.minimum.reduceat(bins[0], starts, axis=0),
+                            np.maximum.reduceat(bins[1], starts, axis=0),
+                            np.add.reduceat(bins[2], starts, axis=0),
+                            np.add.reduceat(bins[3], starts))
+                mins, maxs, sums, counts = bins
+                b0 = next_bin[ii]
+                b1 = next_bin[ii] = b0 + len(counts)
+                lvl['min'][b0:b1] = mins
+                lvl['max'][b0:b1] = maxs
+                lvl['mean'][b0:b1] = sums / counts[:, np.newaxis]
+        grp.attrs['complete'] = True
+        self.cache.flush()
+        self.ready = True
+        return True
+
+    def stats(self, channels, start=None, stop=None):
+        """
+        Statistics of chosen channels, combined from the per-chunk records.
+
+        Parameters
+        ----------
+        channels : ndarray of int
+            0-based, increasing channel indices.
+        start, stop : int, optional
+            Sample range. Chunks partially covered by the range are included
+            whole. By default, the whole recording.
+
+        Returns
+        -------
+        dict with 'count', 'mean', 'std', 'min' and 'max', arrays (nChannels,).
+        None if the pyramid is not ready.
+        """
+        if not self.ready:
+            return None
+        channels = np.asarray(channels)
+        if start is None and stop is None:
+            if self._global_stats is None:
+                self._global_stats = self._combine_stats(0, self.nSamples, slice(None))
+            return {k: v[channels] for k, v in self._global_stats.items()}
+        start = 0 if start is None else start
+        stop = self.nSamples if stop is None else stop
+        return self._combine_stats(start, stop, channels)
+
+    def _combine_stats(self, start, stop, channels):
+        stats = self.cache[self.key]['stats']
+        r0 = start // self.stats_length
+        r1 = max(int(np.ceil(stop / self.stats_length)), r0 + 1)
+        if isinstance(channels, slice):
+            c0, c1, cols = 0, self.nChannels, slice(None)
+        else:
+            c0, c1 = int(channels[0]), int(channels[-1]) + 1
+            cols = channels - c0
+        count = np.sum(stats['count'][r0:r1])
+        total = np.sum(stats['sum'][r0:r1, c0:c1][:, cols], axis=0)
+        sumsq = np.sum(stats['sumsq'][r0:r1, c0:c1][:, cols], axis=0)
+        mean = total / count
+        var = np.maximum(sumsq / count - mean ** 2, 0)
+        return {'count': np.full(mean.shape, count), 'mean': mean, 'std': np.sqrt(var),
+                'min': np.min(stats['min'][r0:r1, c0:c1][:, cols], axis=0),
+                'max': np.max(stats['max'][r0:r1, c0:c1][:, cols], axis=0)}
+
+    def data_range(self):
+        """Minimum and maximum of the whole dataset, from the coarsest level."""
+        if self._range is None:
+            lvl = self.cache[self.key]['level_' + str(self.factors[-1])]
+            self._range = (float(np.min(lvl['min'][:])), float(np.max(lvl['max'][:])))
+        return self._range
+
+    def choose_level(self, nSamples, max_bins):
+        """
+        Finest level that represents `nSamples` with at most `max_bins` bins,
+        or the coarsest level if none does.
+        """
+        for factor in self.factors:
+            if nSamples / factor <= max_bins:
+                return factor
+        return self.factors[-1]
+
+    def envelope(self, start, stop, channels, max_bins, force=False):
+        """
+        Min/max/mean bins covering samples [start, stop) of chosen channels.
+
+        Parameters
+        ----------
+        start, stop : int
+            Sample range.
+        channels : ndarray of int
+            0-based, increasing channel indices.
+        max_bins : int
+            Maximum number of bins to return, usually the plot width in pixels.
+        force : bool
+            Returns bins even if the window is short enough to be drawn from
+            raw samples, e.g. for a fast preview.
+
+        Returns
+        -------
+        None if the pyramid is not ready or, unless forced, if the window is
+        short enough to be drawn from raw samples. Otherwise a tuple (factor, bin_starts, mins,
+        maxs, means), where bin_starts are sample positions and the arrays
+        have shape (nBins, nChannels).
+        """
+        if not self.ready:
+            return None
+        if not force and (stop - start) / self.base_factor <= max_bins:
+            return None
+        factor = self.choose_level(stop - start, max_bins)
+        lvl = self.cache[self.key]['level_' + str(factor)]
+        b0 = start // factor
+        b1 = int(np.ceil(stop / factor))
+        channels = np.asarray(channels)
+        c0, c1 = int(channels[0]), int(channels[-1]) + 1
+        cols = channels - c0
+        mins = lvl['min'][b0:b1, c0:c1][:, cols]
+        maxs = lvl['max'][b0:b1, c0:c1][:, cols]
+        means = lvl['mean'][b0:b1, c0:c1][:, cols]
+        bin_starts = np.arange(b0, b1) * factor
+        return factor, bin_starts, mins, maxs, means
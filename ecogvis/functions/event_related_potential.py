@@ -42,9 +42,9 @@ class ERPDialog(QMainWindow):
                 times = times[times < self.maxTime]
                 self.intervals[interval_type][alignment_type] = {}
                 self.intervals[interval_type][alignment_type]['times'] = times
-                self.intervals[interval_type][alignment_type]['Y_mean'] = {}
-                self.intervals[interval_type][alignment_type]['Y_sem'] = {}
         self.X = []
+        # ERP mean and sem per channel, within the memory budget of the viewer
+        self.erp_cache = self.parent.memory_budget.cache('ERP')
 
         self.interval_sel = default_interval
         self.alignment_sel = default_alignment
@@ -245,10 +245,7 @@ class ERPDialog(QMainWindow):
             self.win.ci.layout.setRowSpacing(i, 3)
 
     def set_width(self):
-        for interval_type, interval_dict in self.intervals.items():
-            for alignment_type, alignment_dict in interval_dict.items():
-                alignment_dict['Y_mean'] = {}
-                alignment_dict['Y_sem'] = {}
+        self.erp_cache.clear()
         self.X = []
         self.draw_erp()
 
@@ -305,22 +302,18 @@ class ERPDialog(QMainWindow):
                 if curr_txt != 'individual':
                     p.setYRange(self.Yscale[curr_txt][0], self.Yscale[curr_txt][1])
                 else:
-                    yrng = max(abs(self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)]))
+                    yrng = max(abs(self.get_erp(ch)[0]))
                     p.setYRange(-yrng, yrng)
 
     def get_erp(self, ch):
-        try:
-            return self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)], \
-                   self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)], \
-                   self.X
-        except:
-            Y_mean, Y_sem, X = self.calc_erp(ch=ch)
-            self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)] = Y_mean
-            self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)] = Y_sem
-            self.X = X
-            return self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)], \
-                   self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)], \
-                   self.X
+        """ERP mean, sem and time axis of a channel, computed once per width."""
+        key = (self.interval_sel, self.alignment_sel, int(ch))
+        erp = self.erp_cache.get(key)
+        if erp is None or len(self.X) != erp.shape[1]:
+            Y_mean, Y_sem, self.X = self.calc_erp(ch=ch)
+            erp = np.vstack((Y_mean, Y_sem))
+            self.erp_cache.put(key, erp)
+        return erp[0], erp[1], self.X
 
     def calc_erp(self, ch):
         ref_times = self.intervals[self.interval_sel][self.alignment_sel]['times']
@@ -535,20 +528,6 @@ class IndividualERPDialog(QtGui.QDialog):
         self.alignment_sel = sel
         self.draw_erp()
 
-    def get_erp(self, ch):
-        try:
-            return self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)], \
-                   self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)], \
-                   self.X
-        except:
-            Y_mean, Y_sem, X = self.calc_erp(ch=ch)
-            self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)] = Y_mean
-            self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)] = Y_sem
-            self.X = X
-            return self.intervals[self.interval_sel][self.alignment_sel]['Y_mean'][str(ch)], \
-                   self.intervals[self.interval_sel][self.alignment_sel]['Y_sem'][str(ch)], \
-                   self.X
-
     def calc_erp(self, ch):
         ref_times = self.intervals[self.interval_sel][self.alignment_sel]['times']
         ref_bins = (ref_times * self.fs).astype('int')
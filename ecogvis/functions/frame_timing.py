@@ -0,0 +1,109 @@
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class FrameTimer:
+    """
+    Per-redraw timing of the viewer, split in HDF5 I/O, NumPy compute and
+    pyqtgraph item updates ('io', 'compute' and 'render').
+
+    Parameters
+    ----------
+    log_path : str or path, optional
+        If given, every frame is appended to this file as a JSON line.
+    max_frames : int
+        Number of frames kept in memory.
+
+    Examples
+    --------
+    >>> timer = FrameTimer()
+    >>> timer.start_frame(['signals'])
+    >>> with timer.section('io'):
+    ...     data = dataset[0:1000]
+    >>> frame = timer.end_frame()
+    """
+    sections = ('io', 'compute', 'render')
+
+    def __init__(self, log_path=None, max_frames=10000):
+        self.frames = deque(maxlen=max_frames)
+        self.log_file = open(str(log_path), 'a') if log_path else None
+        self._frame = None
+        self._t0 = 0.
+
+    def start_frame(self, parts=()):
+        """Starts timing a redraw of the given parts of the screen."""
+        self._frame = {'time': time.time(), 'parts': sorted(parts)}
+        for name in self.sections:
+            self._frame[name + '_ms'] = 0.
+        self._t0 = time.perf_counter()
+
+    @contextmanager
+    def section(self, name):
+        """Adds the time spent in the block to section `name` of the frame."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self._frame is not None:
+                self._frame[name + '_ms'] += 1e3 * (time.perf_counter() - t0)
+
+    def annotate(self, **kwargs):
+        """Adds extra fields to the current frame, e.g. bytes read."""
+        if self._frame is not None:
+            self._frame.update(kwargs)
+
+    def end_frame(self):
+        """Closes the current frame, logs it and returns it as a dict."""
+        frame = self._frame
+        if frame is None:
+            return None
+        frame['total_ms'] = 1e3 * (time.perf_counter() - self._t0)
+        self._frame = None
+        self.frames.append(frame)
+        if self.log_file is not None:
+            self.log_file.write(json.dumps(frame) + '\n')
+            self.log_file.flush()
+        return frame
+
+    def summary(self, last=None):
+        """
+        Median and 95th percentile of the frame times.
+
+        Parameters
+        ----------
+        last : int, optional
+            Only uses the last frames.
+
+        Returns
+        -------
+        dict such as {'frames': 10, 'total_p50': 12.1, 'total_p95': 20.3,
+        'io_p50': ...}, times in milliseconds.
+        """
+        frames = list(self.frames)[-last:] if last else list(self.frames)
+        summary = {'frames': len(frames)}
+        if len(frames) == 0:
+            return summary
+        for name in self.sections + ('total',):
+            values = np.array([f[name + '_ms'] for f in frames])
+            summary[name + '_p50'] = float(np.percentile(values, 50))
+            summary[name + '_p95'] = float(np.percentile(values, 95))
+        return summary
+
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+            self.log_file = None
+
+
+def format_frame(frame):
+    """One line description of a frame, for the log and the overlay."""
+    text = '{}: {:.1f} ms (io {:.1f}, compute {:.1f}, render {:.1f})'.format(
+        ', '.join(frame['parts']), frame['total_ms'], frame['io_ms'],
+        frame['compute_ms'], frame['render_ms'])
+    if frame.get('frames_skipped'):
+        text += ', {} skipped'.format(frame['frames_skipped'])
+    return text
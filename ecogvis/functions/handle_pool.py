@@ -0,0 +1,196 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from ecogvis.functions.block_cache import ChunkCache, CachedDataset
+
+
+class PooledFile:
+    """
+    NWB file opened read-only, with the decoded chunks of its first window.
+
+    Attributes
+    ----------
+    io : pynwb.NWBHDF5IO
+        Open file.
+    nwb : pynwb.NWBFile
+        File contents.
+    chunk_cache : ChunkCache
+        Chunks read while warming up the file, adopted by the viewer.
+    """
+    def __init__(self, io, nwb, budget=None):
+        self.io = io
+        self.nwb = nwb
+        self.chunk_cache = ChunkCache(budget=budget, name=Path(io.source).name)
+
+    def close(self):
+        self.chunk_cache.clear()
+        self.io.close()
+
+
+def signal_series(nwb):
+    """Series the signals panel can show: raw, preprocessed and high gamma."""
+    series = [v for v in nwb.acquisition.values()
+              if type(v).__name__ == 'ElectricalSeries']
+    if 'ecephys' in nwb.processing:
+        interfaces = nwb.processing['ecephys'].data_interfaces
+        if 'LFP' in interfaces and 'preprocessed' in interfaces['LFP'].electrical_series:
+            series.append(interfaces['LFP'].electrical_series['preprocessed'])
+        if 'high_gamma' in interfaces:
+            series.append(interfaces['high_gamma'])
+    return series
+
+
+class HandlePool:
+    """
+    Read-only NWB files opened ahead of time, e.g. the neighbouring blocks of
+    the same subject, so that switching blocks does not pay the open cost.
+
+    Files are opened in a background thread, which also reads the electrodes
+    table and the first window of every signal, so that the first frame is
+    served from memory. Beyond `max_handles`, the least recently used files
+    are closed.
+
+    Parameters
+    ----------
+    max_handles : int
+        Maximum number of files kept open, besides the one on screen.
+    window : float
+        Seconds of signal read when warming up a file.
+    n_channels : int
+        Channels read when warming up a file.
+    budget : MemoryBudget, optional
+        Memory budget of the chunk caches of the files.
+
+    Attributes
+    ----------
+    hits : int
+        Number of files taken from the pool.
+    misses : int
+        Number of files opened on demand.
+    """
+    def __init__(self, max_handles=3, window=2., n_channels=16, budget=None):
+        self.max_handles = max_handles
+        self.window = window
+        self.n_channels = n_channels
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._files = OrderedDict()   # path: Future of a PooledFile
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def __contains__(self, path):
+        with self._lock:
+            return self._key(path) in self._files
+
+    def prewarm(self, paths):
+        """Opens and warms up files in the background, if not in the pool yet."""
+        for path in paths:
+            key = self._key(path)
+            with self._lock:
+                if key in self._files:
+                    self._files.move_to_end(key)
+                    continue
+                self._files[key] = self._executor.submit(self._open, key, True)
+        self._evict()
+
+    def acquire(self, path):
+        """
+        Takes a file out of the pool, waiting for it if it is still warming
+        up, or opens it if it is not in the pool.
+
+        Returns
+        -------
+        PooledFile
+        """
+        key = self._key(path)
+        with self._lock:
+            future = self._files.pop(key, None)
+        if future is not None:
+            try:
+                pooled = future.result()
+                self.hits += 1
+                return pooled
+            except Exception as ex:
+                print('Warm-up of ' + key + ' failed: ' + str(ex))
+        self.misses += 1
+        return self._open(key, warm=False)
+
+    def release(self, path, io, nwb):
+        """
+        Gives back a file that is no longer on screen, still read-only. Its
+        first window is read again in the background.
+        """
+        key = self._key(path)
+        with self._lock:
+            old = self._files.pop(key, None)
+            self._files[key] = self._executor.submit(self._warm, PooledFile(io, nwb, self.budget))
+        if old is not None:
+            self._close(old, wait=False)
+        self._evict()
+
+    def clear(self):
+        """
+        Closes all the files of the pool, e.g. before one of them is opened
+        in read/write mode. Waits for files being opened.
+        """
+        with self._lock:
+            futures = list(self._files.values())
+            self._files.clear()
+        for future in futures:
+            self._close(future, wait=True)
+
+    def close(self):
+        self.clear()
+        self._executor.shutdown(wait=True)
+
+    def _key(self, path):
+        return str(Path(path).absolute())
+
+    def _evict(self):
+        with self._lock:
+            evicted = []
+            while len(self._files) > self.max_handles:
+                evicted.append(self._files.popitem(last=False)[1])
+        for future in evicted:
+            self._close(future, wait=False)
+
+    def _close(self, future, wait):
+        if future.cancel():
+            return
+        if wait:
+            try:
+                future.result()
+            except Exception:
+                return
+        future.add_done_callback(
+            lambda f: f.result().close() if f.exception() is None else None)
+
+    def _open(self, path, warm):
+        import pynwb
+        io = pynwb.NWBHDF5IO(path, 'r', load_namespaces=True)
+        try:
+            pooled = PooledFile(io, io.read(), self.budget)
+        except Exception:
+            io.close()
+            raise
+        if warm:
+            self._warm(pooled)
+        return pooled
+
+    def _warm(self, pooled):
+        """Reads the electrodes table and the first window of every signal."""
+        nwb = pooled.nwb
+        if nwb.electrodes is not None:
+            nwb.electrodes.id[:]
+            for name in ('location', 'bad'):
+                if name in nwb.electrodes.colnames:
+                    nwb.electrodes[name].data[:]
+        for series in signal_series(nwb):
+            data = CachedDataset(series.data, pooled.chunk_cache)
+            n_rows = min(int(self.window * series.rate) + 1, data.shape[0])
+            n_cols = min(self.n_channels, data.shape[1]) if data.ndim > 1 else 1
+            data.load(0, n_rows, 0, n_cols, prefetch=True)
+        return pooled
@@ -0,0 +1,119 @@
+import numpy as np
+
+
+class IntervalIndex:
+    """
+    Time intervals kept as columns sorted by start time, with the running
+    maximum of the stop times, so that the intervals overlapping a window are
+    found by binary search.
+
+    Attributes
+    ----------
+    ids : ndarray of int
+        Unique id of every interval, kept across insertions and deletions.
+    start, stop : ndarray of float
+        Start and stop times.
+    max_stop : ndarray of float
+        Largest stop time of the intervals up to each position.
+    type : ndarray of str
+        Interval type (e.g. 'invalid').
+    color : ndarray of str
+        Interval color: 'yellow', 'red', 'green' or 'blue'.
+    session : ndarray of str
+        Session name.
+    version : int
+        Incremented on every change, to know when drawings are outdated.
+    """
+    columns = ('ids', 'start', 'stop', 'type', 'color', 'session')
+
+    def __init__(self):
+        self.ids = np.zeros(0, dtype='int64')
+        self.start = np.zeros(0)
+        self.stop = np.zeros(0)
+        self.max_stop = np.zeros(0)
+        self.type = np.zeros(0, dtype=object)
+        self.color = np.zeros(0, dtype=object)
+        self.session = np.zeros(0, dtype=object)
+        self.version = 0
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self.start)
+
+    def extend(self, start, stop, type, color, session):
+        """
+        Adds intervals. `type`, `color` and `session` are either one value per
+        interval or a single value for all of them.
+        """
+        start = np.atleast_1d(np.asarray(start, dtype='float64'))
+        n = len(start)
+        new = {
+            'ids': np.arange(self._next_id, self._next_id + n),
+            'start': start,
+            'stop': np.atleast_1d(np.asarray(stop, dtype='float64')),
+        }
+        for name, value in zip(('type', 'color', 'session'), (type, color, session)):
+            column = np.empty(n, dtype=object)
+            column[:] = value if np.ndim(value) == 0 else list(value)
+            new[name] = column
+        order = np.argsort(np.concatenate((self.start, start)), kind='stable')
+        for name in self.columns:
+            setattr(self, name, np.concatenate((getattr(self, name), new[name]))[order])
+        self._next_id += n
+        self._changed()
+
+    def add(self, start, stop, type, color, session):
+        """Adds one interval, returns its id."""
+        self.extend([start], [stop], type, color, session)
+        return self._next_id - 1
+
+    def delete(self, index):
+        """Deletes the intervals at positions `index`."""
+        for name in self.columns:
+            setattr(self, name, np.delete(getattr(self, name), index))
+        self._changed()
+
+    def overlapping(self, x0, x1):
+        """Positions of the intervals overlapping [x0, x1], in start order."""
+        # Intervals before i0 all stop before x0, intervals from i1 start after x1
+        i0 = np.searchsorted(self.max_stop, x0, side='left')
+        i1 = np.searchsorted(self.start, x1, side='right')
+        return i0 + np.flatnonzero(self.stop[i0:i1] >= x0)
+
+    def merged(self, x0, x1, n_bins, index=None):
+        """
+        Union of intervals at the resolution of `n_bins` bins in [x0, x1], e.g.
+        one bin per pixel.
+
+        Parameters
+        ----------
+        x0, x1 : float
+            Time range.
+        n_bins : int
+            Number of bins.
+        index : ndarray, optional
+            Positions of the intervals to merge, by default all of them.
+
+        Returns
+        -------
+        starts, stops : ndarray
+            Covered runs of bins, as times.
+        """
+        if index is None:
+            index = self.overlapping(x0, x1)
+        if len(index) == 0 or x1 <= x0:
+            return np.zeros(0), np.zeros(0)
+        dx = (x1 - x0) / n_bins
+        b0 = np.clip(np.floor((self.start[index] - x0) / dx), 0, n_bins).astype(int)
+        b1 = np.clip(np.ceil((self.stop[index] - x0) / dx), 0, n_bins).astype(int)
+        b1 = np.maximum(b1, np.minimum(b0 + 1, n_bins))   # at least one bin wide
+        depth = np.zeros(n_bins + 1, dtype=int)
+        np.add.at(depth, b0, 1)
+        np.add.at(depth, b1, -1)
+        covered = np.concatenate(([0], np.cumsum(depth[:-1]) > 0, [0])).astype(int)
+        edges = np.flatnonzero(np.diff(covered))
+        return x0 + edges[0::2] * dx, x0 + edges[1::2] * dx
+
+    def _changed(self):
+        self.max_stop = np.maximum.accumulate(self.stop) if len(self.stop) else np.zeros(0)
+        self.version += 1
@@ -0,0 +1,177 @@
+import heapq
+import itertools
+import threading
+import weakref
+
+
+class MemoryBudget:
+    """
+    Memory ceiling shared by all the caches of the viewer, e.g. the decoded
+    chunks of every open file and the ERP averages.
+
+    When the cached arrays exceed `max_bytes`, entries are evicted across all
+    caches with the GreedyDual-Size policy: every entry gets the priority
+    `clock + 1 / nbytes` when it is added or used, the entry with the lowest
+    priority is evicted first, and the clock advances to the priority of
+    the last evicted entry. Large entries are evicted before small ones of
+    the same age, and entries of the same size are evicted least recently
+    used first.
+
+    Parameters
+    ----------
+    max_bytes : int
+        Maximum total size of the cached arrays.
+
+    Attributes
+    ----------
+    nbytes : int
+        Total size of the cached arrays.
+    evictions : int
+        Number of entries evicted to keep within the budget.
+    """
+    def __init__(self, max_bytes=1e9):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._entries = {}          # (cache id, key): [priority, order, value]
+        self._heap = []             # (priority, order, cache id, key), lazily updated
+        self._clock = 0.
+        self._order = itertools.count()
+        self._ids = itertools.count()
+        self._caches = weakref.WeakValueDictionary()
+        self._lock = threading.RLock()
+
+    def cache(self, name):
+        """New cache, named e.g. after its file, within this budget."""
+        return BudgetedCache(self, name)
+
+    def caches(self):
+        """Caches of the budget still in use."""
+        return [self._caches[i] for i in sorted(self._caches.keys())]
+
+    def summary(self):
+        """
+        Usage of every cache, for diagnostics.
+
+        Returns
+        -------
+        list of dicts with 'name', 'nbytes', 'entries', 'hits' and 'misses'.
+        """
+        return [{'name': c.name, 'nbytes': c.nbytes, 'entries': c.entries,
+                 'hits': c.hits, 'misses': c.misses} for c in self.caches()]
+
+    def set_max_bytes(self, max_bytes):
+        """Changes the ceiling, evicting entries if needed."""
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _register(self, cache):
+        cache_id = next(self._ids)
+        self._caches[cache_id] = cache
+        return cache_id
+
+    def _get(self, cache, key):
+        with self._lock:
+            entry = self._entries.get((cache.id, key))
+            if entry is None:
+                return None
+            self._touch(cache.id, key, entry)
+            return entry[2]
+
+    def _contains(self, cache, key):
+        with self._lock:
+            return (cache.id, key) in self._entries
+
+    def _put(self, cache, key, value):
+        with self._lock:
+            if (cache.id, key) in self._entries:
+                return
+            entry = [0., 0, value]
+            self._entries[(cache.id, key)] = entry
+            self._touch(cache.id, key, entry)
+            self.nbytes += value.nbytes
+            cache.nbytes += value.nbytes
+            cache.entries += 1
+            self._evict()
+
+    def _clear(self, cache_id):
+        with self._lock:
+            for name in [name for name in self._entries if name[0] == cache_id]:
+                self._remove(*name)
+
+    def _touch(self, cache_id, key, entry):
+        entry[0] = self._clock + 1. / max(entry[2].nbytes, 1)
+        entry[1] = next(self._order)
+        heapq.heappush(self._heap, (entry[0], entry[1], cache_id, key))
+        # Rebuilds the heap once most of it is stale
+        if len(self._heap) > 2 * len(self._entries) + 64:
+            self._heap = [(e[0], e[1]) + name for name, e in self._entries.items()]
+            heapq.heapify(self._heap)
+
+    def _evict(self):
+        while self.nbytes > self.max_bytes and len(self._entries) > 1:
+            priority, order, cache_id, key = heapq.heappop(self._heap)
+            entry = self._entries.get((cache_id, key))
+            if entry is None or entry[1] != order:
+                continue   # stale, the entry was used again or removed
+            self._clock = priority
+            self._remove(cache_id, key)
+            self.evictions += 1
+
+    def _remove(self, cache_id, key):
+        value = self._entries.pop((cache_id, key))[2]
+        self.nbytes -= value.nbytes
+        cache = self._caches.get(cache_id)
+        if cache is not None:
+            cache.nbytes -= value.nbytes
+            cache.entries -= 1
+
+
+class BudgetedCache:
+    """
+    Cache of arrays within a MemoryBudget, with its own usage and hit rates.
+    Lookups from background loaders pass count=False to `get`, to keep hit
+    rates meaningful.
+
+    Parameters
+    ----------
+    budget : MemoryBudget
+        Budget shared with the other caches.
+    name : str
+        Name shown in the diagnostics.
+    """
+    def __init__(self, budget, name):
+        self.budget = budget
+        self.name = name
+        self.nbytes = 0
+        self.entries = 0
+        self.hits = 0
+        self.misses = 0
+        self.id = budget._register(self)
+        # Entries of a cache no longer in use are dropped from the budget
+        weakref.finalize(self, budget._clear, self.id)
+
+    def __contains__(self, key):
+        return self.budget._contains(self, key)
+
+    @property
+    def max_bytes(self):
+        return self.budget.max_bytes
+
+    def get(self, key, count=True):
+        """Returns the cached array, or None, and updates its recency."""
+        value = self.budget._get(self, key)
+        if count:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        """Adds an array, evicting entries of any cache of the budget if needed."""
+        self.budget._put(self, key, value)
+
+    def clear(self):
+        self.budget._clear(self.id)
@@ -10,8 +10,8 @@ import pandas as pd
 import pyqtgraph as pg
 import pyqtgraph.opengl as gl
 from PyQt5.QtWebEngineWidgets import QWebEngineView
-from PyQt5 import QtGui, QtCore, uic
-from PyQt5.QtWidgets import (QTableWidgetItem, QGridLayout, QGroupBox,
+from PyQt5 import QtGui, QtCore
+from PyQt5.QtWidgets import (QTableWidget, QTableWidgetItem, QGridLayout, QGroupBox,
                              QLineEdit, QStyle, QMainWindow, QCheckBox,
                              QWidget, QLabel, QPushButton, QVBoxLayout,
                              QHBoxLayout, QComboBox, QScrollArea,
@@ -24,17 +24,17 @@ from pynwb import NWBHDF5IO
 from pynwb.epoch import TimeIntervals
 from ndx_bipolar_scheme.bipolar_scheme import BipolarSchemeTable
 from .FS_colorLUT import get_lut
+# Dialog layouts, generated from ecogvis/ui/*.ui with: pyuic5 name.ui -o name.py
+from ecogvis.ui.intervals_gui import Ui_Dialog as Ui_CustomInterval
+from ecogvis.ui.exit_gui import Ui_Dialog as Ui_Exit
+from ecogvis.ui.spectral_choice_gui import Ui_Dialog as Ui_SpectralChoice
+from ecogvis.ui.high_gamma_gui import Ui_Dialog as Ui_HighGamma
+from ecogvis.ui.preprocessing_gui import Ui_Dialog as Ui_Preprocessing
 
 # from threading import Event, Thread
 
-# Path where UI files are
-ui_path = os.path.join(os.path.dirname(__file__), '..', 'ui')
-
 
 # Creates custom interval type -----------------------------------------------
-Ui_CustomInterval, _ = uic.loadUiType(os.path.join(ui_path, "intervals_gui.ui"))
-
-
 class CustomIntervalDialog(QtGui.QDialog, Ui_CustomInterval):
     def __init__(self):
         super().__init__()
@@ -222,9 +222,6 @@ class PSDCalcFunction(QtCore.QThread):
 
 
 # Exit confirmation ----------------------------------------------------------
-Ui_Exit, _ = uic.loadUiType(os.path.join(ui_path, "exit_gui.ui"))
-
-
 class ExitDialog(QtGui.QDialog, Ui_Exit):
     def __init__(self, parent):
         super().__init__()
@@ -798,6 +795,51 @@ class ShowElectrodesDialog(QtGui.QDialog):
         self.accept()
 
 
+# Shows memory usage and hit rates of the viewer caches ----------------------
+class MemoryUsageDialog(QtGui.QDialog):
+    def __init__(self, budget):
+        super().__init__()
+        self.budget = budget
+
+        self.label = QLabel()
+        self.table = QTableWidget(0, 5)
+        self.table.setHorizontalHeaderLabels(['Cache', 'MB', 'Entries', 'Hits', 'Misses'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.verticalHeader().setVisible(False)
+        self.push_refresh = QPushButton('Refresh')
+        self.push_refresh.clicked.connect(self.refresh)
+        self.push_close = QPushButton('Close')
+        self.push_close.clicked.connect(self.accept)
+        hbox = QHBoxLayout()
+        hbox.addStretch()
+        hbox.addWidget(self.push_refresh)
+        hbox.addWidget(self.push_close)
+
+        vbox = QVBoxLayout()
+        vbox.addWidget(self.label)
+        vbox.addWidget(self.table)
+        vbox.addLayout(hbox)
+        self.setLayout(vbox)
+        self.setWindowTitle('Memory Usage')
+        self.resize(500, 300)
+        self.refresh()
+        self.exec_()
+
+    def refresh(self):
+        """Reads the current usage of every cache."""
+        self.label.setText('{:.1f} of {:.0f} MB used, {} entries evicted'.format(
+            self.budget.nbytes / 1e6, self.budget.max_bytes / 1e6, self.budget.evictions))
+        rows = self.budget.summary()
+        self.table.setRowCount(len(rows))
+        for i, row in enumerate(rows):
+            lookups = row['hits'] + row['misses']
+            hit_rate = ' ({:.0f}%)'.format(100. * row['hits'] / lookups) if lookups else ''
+            values = [row['name'], '{:.1f}'.format(row['nbytes'] / 1e6), str(row['entries']),
+                      str(row['hits']) + hit_rate, str(row['misses'])]
+            for j, value in enumerate(values):
+                self.table.setItem(i, j, QTableWidgetItem(value))
+
+
 # Selects channels from specific brain regions to be plotted -----------------
 class SelectChannelsDialog(QtGui.QDialog):
     def __init__(self, stringlist, checked):
@@ -859,10 +901,6 @@ class SelectChannelsDialog(QtGui.QDialog):
 
 
 # Creates Spectral Analysis choice dialog ------------------------------------
-Ui_SpectralChoice, _ = uic.loadUiType(
-    os.path.join(ui_path, "spectral_choice_gui.ui"))
-
-
 class SpectralChoiceDialog(QtGui.QDialog, Ui_SpectralChoice):
     def __init__(self, parent):
         super().__init__()
@@ -1004,9 +1042,6 @@ class ProcessingDataFunction(QtCore.QThread):
 
 
 # Creates High Gamma dialog --------------------------------------------------
-Ui_HighGamma, _ = uic.loadUiType(os.path.join(ui_path, "high_gamma_gui.ui"))
-
-
 class HighGammaDialog(QtGui.QDialog, Ui_HighGamma):
     def __init__(self, parent):
         super().__init__()
@@ -1220,9 +1255,6 @@ class HighGammaDialog(QtGui.QDialog, Ui_HighGamma):
 
 
 # Creates preprocessing dialog -----------------------------------------------
-Ui_Preprocessing, _ = uic.loadUiType(os.path.join(ui_path, "preprocessing_gui.ui"))
-
-
 class PreprocessingDialog(QtGui.QDialog, Ui_Preprocessing):
     def __init__(self, parent):
         super().__init__()
@@ -1239,6 +1271,10 @@ class PreprocessingDialog(QtGui.QDialog, Ui_Preprocessing):
         self.pushButton_2.clicked.connect(self.ok)
         self.fname = parent.model.source_path.name
         self.fpath = parent.model.source_path.parent
+        # Size of the raw signals in memory, as float64
+        self.raw_nbytes = sum(
+            8 * np.prod(acq.data.shape) for acq in parent.model.nwb.acquisition.values()
+            if type(acq).__name__ == 'ElectricalSeries')
         # if preprocessed signals already exist on NWB file
         if 'ecephys' in parent.model.nwb.processing:
             if 'LFP' in parent.model.nwb.processing['ecephys'].data_interfaces:
@@ -1281,6 +1317,10 @@ class PreprocessingDialog(QtGui.QDialog, Ui_Preprocessing):
             config['Downsample'] = float(self.lineEdit_3.text())
         else:
             config['Downsample'] = None
+        # Long recordings are streamed to the file in chunks
+        if self.raw_nbytes > 1e9:
+            config['chunk_duration'] = 20.
+        config['n_workers'] = None   # all the CPUs
         subj, aux = self.fname.split('_')
         block = [aux.split('.')[0][1:]]
         self.thread = ProcessingDataFunction(
@@ -0,0 +1,65 @@
+import time
+
+from PyQt5 import QtCore
+
+
+class RedrawScheduler:
+    """
+    Merges redraw requests and renders at most once per display frame.
+
+    Navigation updates the target state right away and only requests a
+    redraw. Requests arriving before the pending redraw is drawn are merged
+    into it (latest wins), so held keys never queue up stale frames.
+
+    Parameters
+    ----------
+    redraw : callable
+        Called with the set of parts to re-draw, e.g. refreshScreen.
+    min_interval : float
+        Minimum time between two redraws, in seconds.
+
+    Attributes
+    ----------
+    requests : int
+        Number of redraw requests.
+    drawn : int
+        Number of redraws done.
+    skipped : int
+        Number of requests merged into an already pending redraw.
+    """
+    def __init__(self, redraw, min_interval=1 / 60.):
+        self.redraw = redraw
+        self.min_interval = min_interval
+        self.pending = set()
+        self.requests = 0
+        self.drawn = 0
+        self.skipped = 0
+        self.last_draw = 0.
+        self.timer = QtCore.QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def request(self, parts):
+        """Asks for parts of the screen to be re-drawn on the next frame."""
+        self.requests += 1
+        if self.pending:
+            self.skipped += 1
+        self.pending |= set(parts)
+        if not self.timer.isActive():
+            wait = self.min_interval - (time.perf_counter() - self.last_draw)
+            self.timer.start(max(int(1e3 * wait), 0))
+
+    def flush(self):
+        """Draws the pending redraw, if any, right away."""
+        self.timer.stop()
+        if not self.pending:
+            return
+        parts, self.pending = self.pending, set()
+        self.last_draw = time.perf_counter()
+        self.drawn += 1
+        self.redraw(parts)
+
+    def cancel(self):
+        """Drops the pending redraw, e.g. before closing the file."""
+        self.timer.stop()
+        self.pending = set()
@@ -1,14 +1,25 @@
 import os
+import time
 from pathlib import Path
 from scipy import signal
 import numpy as np
 import pandas as pd
 from PyQt5.QtWidgets import QMessageBox
-from PyQt5 import QtGui
+from PyQt5 import QtGui, QtCore
 import pyqtgraph as pg
 import datetime
 import pynwb
 import ndx_ecog
+from ecogvis.functions.decimation_pyramid import (open_sidecar, DecimationPyramid,
+                                                  minmax_decimate, interleave_envelope)
+from ecogvis.functions.window_fetch import WindowFetcher
+from ecogvis.functions.block_cache import CachedDataset, Prefetcher
+from ecogvis.functions.batched_curves import ChannelCurves
+from ecogvis.functions.channel_metadata import ChannelMetadata
+from ecogvis.functions.frame_timing import FrameTimer, format_frame
+from ecogvis.functions.redraw_scheduler import RedrawScheduler
+from ecogvis.functions.annotation_store import AnnotationStore
+from ecogvis.functions.interval_index import IntervalIndex
 
 
 class TimeSeriesPlotter:
@@ -20,6 +31,10 @@ class TimeSeriesPlotter:
     def __init__(self, par):
         self.parent = par
         self.source_path = Path(par.source_path)
+        # Time from opening the file to the first frame on screen
+        self.open_start = time.perf_counter()
+        self.open_ms = None
+        self.first_frame_budget_ms = 1000.
 
         # Makes nwbfile object from nwb file
         if self.source_path.is_file():
@@ -29,8 +44,12 @@ class TimeSeriesPlotter:
             else:
                 self.subject_id = ''
                 self.block = ''
-            self.io = pynwb.NWBHDF5IO(str(self.source_path), 'r+', load_namespaces=True)
-            self.nwb = self.io.read()      # reads NWB file
+            # Files are opened read-only, from the pool of warm files if
+            # possible, and re-opened in read/write mode before changes
+            pooled = self.parent.handle_pool.acquire(self.source_path)
+            self.io = pooled.io
+            self.nwb = pooled.nwb
+            self.writable = False
         else:
             raise TypeError("Invalid file type")
 
@@ -67,30 +86,54 @@ class TimeSeriesPlotter:
         except:
             print("No 'high_gamma' data in 'processing' group.")
 
-        self.plotData = self.source.data
-        self.fs_signal = self.source.rate     # sampling frequency [Hz]
-        self.tbin_signal = 1 / self.fs_signal  # time bin duration [seconds]
-        self.nBins = self.source.data.shape[0]     # total number of bins
+        # Viewer cache file (decimation pyramids), next to the NWB file
+        self.cache_file = open_sidecar(self.source_path)
+        self.pyramid_thread = None
+        self.stim_pyramid_thread = None
+        self.channel_curves = None
+        self.stim_curve = None
+        # Per-frame timing, optional JSON-lines log and on-screen overlay
+        self.frame_timer = FrameTimer(log_path=self.parent.frame_log)
+        # Navigation redraws are merged and drawn at most once per display frame
+        self.scheduler = RedrawScheduler(self.refreshScreen)
+        # Dragging the timeline window draws coarse previews, the dropped
+        # window is loaded in the background and then drawn at full resolution
+        self.refine_generation = 0
+        self.refine_threads = []
+        self.settle_timer = QtCore.QTimer()
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(150)
+        self.settle_timer.timeout.connect(self.refine)
+        self.timing_overlay = None
+        if self.parent.show_timing:
+            self.timing_overlay = pg.TextItem(color=(120, 120, 120), anchor=(0, 0))
+            self.timing_overlay.setParentItem(self.parent.win1.getPlotItem().getViewBox())
+            self.timing_overlay.setPos(5, 5)
+        # Decoded chunks of the signals, shared by all sources of the file
+        self.chunk_cache = pooled.chunk_cache
+        self.prefetcher = Prefetcher()
+        self.scroll_direction = 1
+        self.set_source(self.source)
         self.min_window_bins = 10                   # minimum number of bins to plot
         # Electrodes table - bipolar or regular table
         self.electrodes_table = self.source.electrodes.table
         # all electricalseries channels ids
         self.all_channels_ids = self.electrodes_table.id[:]
-        self.electrical_series_channel_ids = np.array(self.all_channels_ids)[self.source.electrodes.data[:]].tolist()
-        self.n_channels_total = len(self.electrical_series_channel_ids)     # total number of channels
+        self.electrical_series_channel_ids = self.channel_meta.ids.tolist()
+        self.n_channels_total = len(self.channel_meta)     # total number of channels
 
         # Get Brain regions present in current file
-        self.all_regions = list(self.electrodes_table['location'][self.electrical_series_channel_ids])
-        self.all_regions.sort()
+        self.all_regions = sorted(self.channel_meta.locations)
         self.regions_mask = [True] * len(self.all_regions)
 
-        self.channels_mask = np.ones(len(list(self.electrodes_table['location'][self.electrical_series_channel_ids])))
+        self.channels_mask = np.ones(len(self.channel_meta), dtype=bool)
         self.channels_mask_ind = np.where(self.channels_mask)[0]
 
         self.h = []
         self.text = []
-        self.AnnotationsList = []
-        self.AnnotationsPosAV = np.array([])    # (x, y_va, y_off)
+        self.annotations = AnnotationStore()
+        self.annotation_items = {}              # id: TextItem, visible annotations only
+        self.max_annotation_items = 500         # more would not be readable anyway
         self.unsaved_changes_annotation = False
         self.unsaved_changes_interval = False
 
@@ -102,108 +145,150 @@ class TimeSeriesPlotter:
         self.selectedChannels = np.arange(self.firstCh - 1, self.lastCh)
 
         self.current_rect = []
-
-        # List of bad channels
-        if 'bad' in self.electrodes_table:
-            aux_mask = self.electrodes_table[self.electrical_series_channel_ids]['bad']
-            self.bad_channels_ids = list(self.electrodes_table[self.electrical_series_channel_ids][aux_mask].index)
-        else:
-            self.bad_channels_ids = []
+        self.scale_va = 1.
+        self.all_parts = {'signals', 'timeline', 'stimulus', 'annotations', 'intervals'}
 
         # Load invalid intervals from NWB file
-        self.allIntervals = []
+        self.intervals = IntervalIndex()
         if self.nwb.invalid_times is not None:
-            self.nBI = self.nwb.invalid_times.columns[0][:].shape[0]  # number of BI
-            for ii in np.arange(self.nBI):
-                # create new interval
-                obj = CustomInterval()
-                obj.start = self.nwb.invalid_times.columns[0][ii]
-                obj.stop = self.nwb.invalid_times.columns[1][ii]
-                obj.type = 'invalid'
-                obj.color = 'red'
-                obj.session = ''
-                self.allIntervals.append(obj)
-
-        # Plot interval rectangles at upper and middle pannels
-        self.IntRects1 = np.array([], dtype='object')
-        self.IntRects2 = np.array([], dtype='object')
-        for i, obj in enumerate(self.allIntervals):
-            start = obj.start
-            stop = obj.stop
-            # on timeline
-            c = pg.QtGui.QGraphicsRectItem(start, -1, max(stop - start, 0.01), 2)
-            self.IntRects1 = np.append(self.IntRects1, c)
-            c.setPen(pg.mkPen(color='r'))
-            c.setBrush(QtGui.QColor(255, 0, 0, 120))
-            self.parent.win2.addItem(c)
-            # on signals plot
-            c = pg.QtGui.QGraphicsRectItem(start, -1, max(stop - start, 0.01), 2)
-            self.IntRects2 = np.append(self.IntRects2, c)
-            c.setPen(pg.mkPen(color='r'))
-            c.setBrush(QtGui.QColor(255, 0, 0, 120))
-            self.parent.win1.addItem(c)
+            self.intervals.extend(self.nwb.invalid_times.columns[0][:],
+                                  self.nwb.invalid_times.columns[1][:], 'invalid', 'red', '')
 
-        # Test if current nwb file contains Survey table
-        if 'behavior' in self.nwb.processing:
-            list_surveys = [v for v in self.nwb.processing['behavior'].data_interfaces.values()
-                            if v.neurodata_type == 'SurveyTable']
-            if len(list_surveys) > 0:
-                self.parent.action_vis_survey.setEnabled(True)
-                self.parent.action_add_survey.setEnabled(False)
-            else:
-                self.parent.action_vis_survey.setEnabled(False)
-                self.parent.action_add_survey.setEnabled(True)
-        else:
-            self.parent.action_vis_survey.setEnabled(False)
-            self.parent.action_add_survey.setEnabled(True)
-
-        # Test if current nwb file contains Transcription tables
-        if 'behavior' in self.nwb.processing:
-            list_transcripts = [v for v in self.nwb.processing['behavior'].data_interfaces.values()
-                                if v.name in ['phonemes', 'syllables', 'words', 'sentences']]
-            if len(list_transcripts) > 0:
-                self.parent.transcriptionadd_tools_menu.setEnabled(False)
-                self.parent.action_vis_transcription.setEnabled(True)
-            else:
-                self.parent.transcriptionadd_tools_menu.setEnabled(True)
-                self.parent.action_vis_transcription.setEnabled(False)
-        else:
-            self.parent.transcriptionadd_tools_menu.setEnabled(True)
-            self.parent.action_vis_transcription.setEnabled(False)
-
-        # Add Speaker and Mic Intervals if they exist
-        self.SpeakerAndMicIntervalAdd()
+        # Interval rectangles at upper and middle panels, one item per color
+        self.interval_bars_timeline = {}
+        self.interval_bars_signals = {}
+        self.interval_overview = None   # (version, width) of the timeline drawing
 
         # Load stimuli signals (audio)
         self.load_stimuli()
 
-        # Initiate plots
-        self.updateCurXAxisPosition()
+        # Initiate plots, then everything not needed for the first frame
+        self.update_interval()
         self.refreshScreen()
+        self.deferred_timer = QtCore.QTimer()
+        self.deferred_timer.setSingleShot(True)
+        self.deferred_timer.timeout.connect(self.load_deferred)
+        self.deferred_timer.start(0)
+
+    def load_deferred(self):
+        """Reads the parts of the file not needed for the first frame."""
+        self.check_behavior_tables()
+        # Add Speaker and Mic Intervals if they exist
+        n_intervals = len(self.intervals)
+        self.SpeakerAndMicIntervalAdd()
+        if len(self.intervals) > n_intervals:
+            self.refreshScreen(['intervals'])
+        # Opens the neighbouring blocks in the background
+        self.parent.prewarm_blocks()
+
+    def check_behavior_tables(self):
+        """Enables the survey and transcription menus, according to the file."""
+        interfaces = {}
+        if 'behavior' in self.nwb.processing:
+            interfaces = self.nwb.processing['behavior'].data_interfaces
+        # Test if current nwb file contains Survey table
+        has_survey = any(v.neurodata_type == 'SurveyTable' for v in interfaces.values())
+        self.parent.action_vis_survey.setEnabled(has_survey)
+        self.parent.action_add_survey.setEnabled(not has_survey)
+        # Test if current nwb file contains Transcription tables
+        has_transcripts = any(name in interfaces
+                              for name in ['phonemes', 'syllables', 'words', 'sentences'])
+        self.parent.transcriptionadd_tools_menu.setEnabled(not has_transcripts)
+        self.parent.action_vis_transcription.setEnabled(has_transcripts)
+
+    def set_source(self, source):
+        """
+        Sets the ElectricalSeries shown on the signals panel and starts building
+        its decimation pyramid, if it is not in the viewer cache yet.
+        """
+        self.stop_pyramid_build()
+        self.source = source
+        self.plotData = CachedDataset(self.source.data, self.chunk_cache)
+        self.fs_signal = self.source.rate     # sampling frequency [Hz]
+        self.tbin_signal = 1 / self.fs_signal  # time bin duration [seconds]
+        self.nBins = self.source.data.shape[0]     # total number of bins
+        self.fetcher = WindowFetcher(self.plotData, verbose=self.parent.log_io)
+        self.channel_meta = ChannelMetadata(self.source)
+        key = getattr(self.source.data, 'name', None) or self.source.name
+        # The pyramid streams through the whole dataset, bypassing the cache
+        self.pyramid = DecimationPyramid(cache=self.cache_file, key=key,
+                                         data=self.source.data)
+        if not self.pyramid.ready and len(self.pyramid.factors) > 0:
+            self.pyramid_thread = PyramidBuildFunction(self.pyramid)
+            self.pyramid_thread.finished.connect(self.pyramid_built)
+            self.pyramid_thread.start()
+
+    def pyramid_built(self):
+        """Re-draws with the decimation pyramid, once it is available."""
+        if self.pyramid.ready:
+            self.refreshScreen(['signals'])
+
+    def stop_pyramid_build(self, stimulus=False):
+        """
+        Cancels a running pyramid build, e.g. before closing the file. With
+        stimulus=True, the build of the stimulus pyramid is cancelled too.
+        """
+        if self.pyramid_thread is not None:
+            self.pyramid_thread.cancelled = True
+            self.pyramid_thread.wait()
+            self.pyramid_thread = None
+        if stimulus and self.stim_pyramid_thread is not None:
+            self.stim_pyramid_thread.cancelled = True
+            self.stim_pyramid_thread.wait()
+            self.stim_pyramid_thread = None
 
     def load_stimuli(self):
         """Loads stimuli signals (speaker audio)."""
+        self.stop_pyramid_build(stimulus=True)
         self.nStim = len(self.nwb.stimulus)
         self.stimList = list(self.nwb.stimulus.keys())
-        self.stimX = []
         self.stimY = {}
+        self.stimRate = {}
+        self.stimPyramids = {}
         self.parent.combo4.clear()
         for stim in self.stimList:
             self.parent.combo4.addItem(stim)   # add stimulus name to dropdown button
-            dt_stim = 1. / self.nwb.stimulus[stim].rate
-            nb_stim = self.nwb.stimulus[stim].data.shape[0]
-            self.stimX = np.linspace(dt_stim, nb_stim * dt_stim, nb_stim)
+            self.stimRate[stim] = self.nwb.stimulus[stim].rate
             self.stimY[stim] = self.nwb.stimulus[stim].data
         else:
             self.disp_audio = 0
 
+    def stimulus_pyramid(self, stimName):
+        """
+        Decimation pyramid of a stimulus. It is built in the background the
+        first time the stimulus is shown, if it is not in the viewer cache.
+        """
+        if stimName not in self.stimPyramids:
+            data = self.stimY[stimName]
+            key = getattr(data, 'name', None) or 'stimulus__' + stimName
+            self.stimPyramids[stimName] = DecimationPyramid(cache=self.cache_file, key=key,
+                                                            data=data)
+        pyramid = self.stimPyramids[stimName]
+        if (not pyramid.ready and len(pyramid.factors) > 0 and
+                self.stim_pyramid_thread is None):
+            self.stim_pyramid_thread = PyramidBuildFunction(pyramid)
+            self.stim_pyramid_thread.finished.connect(self.stim_pyramid_built)
+            self.stim_pyramid_thread.start()
+        return pyramid
+
+    def stim_pyramid_built(self):
+        """Re-draws the stimulus with its decimation pyramid."""
+        self.stim_pyramid_thread = None
+        self.refreshScreen(['stimulus'])
+
     def refresh_file(self):
         """Re-opens the current file, for when new data is included"""
+        self.stop_pyramid_build(stimulus=True)
+        self.stop_refine()
+        self.prefetcher.stop()
         if hasattr(self, 'io'):
             self.io.close()   # closes current NWB file
+        self.chunk_cache.clear()
+        self.prefetcher = Prefetcher()
 
         self.io = pynwb.NWBHDF5IO(str(self.source_path), 'r+', load_namespaces=True)
         self.nwb = self.io.read()      # reads NWB file
+        self.writable = True
 
         # Searches for signal source on file
         try:   # Tries to load Raw data
@@ -224,167 +309,393 @@ class TimeSeriesPlotter:
             self.parent.combo3.setCurrentIndex(self.parent.combo3.findText('high gamma'))
         except:
             None
-        self.plotData = self.source.data
-        self.fs_signal = self.source.rate      # sampling frequency [Hz]
-        self.tbin_signal = 1 / self.fs_signal  # time bin duration [seconds]
-        self.nBins = self.source.data.shape[0]     # total number of bins
+        self.set_source(self.source)
         self.load_stimuli()  # load stimuli signals (audio)
         self.updateCurXAxisPosition()
 
-    def refreshScreen(self):
-        """Re-draws all plots"""
-        self.TimeSeries_plotter()
+    def make_writable(self):
+        """
+        Re-opens the file in read/write mode, if it is still read-only, keeping
+        the signal source on screen. Called before anything is written to it.
+        """
+        if self.writable:
+            return
+        source = self.parent.combo3.currentText()
+        self.refresh_file()
+        if self.parent.combo3.currentText() != source:
+            self.parent.combo3.setCurrentIndex(self.parent.combo3.findText(source))
+            self.parent.voltage_time_series()
+
+    def refreshScreen(self, parts=None):
+        """
+        Re-draws the parts of the screen affected by a change.
 
-    def TimeSeries_plotter(self):
-        """Plots time series signals"""
+        Parameters
+        ----------
+        parts : iterable of str, optional
+            Any of 'signals', 'timeline', 'stimulus', 'annotations' and
+            'intervals'. By
+            default, everything is re-drawn. 'preview' draws the signals from a
+            coarse decimation level, while the timeline window is dragged.
+        """
+        parts = self.all_parts if parts is None else set(parts)
+        self.frame_timer.start_frame(parts)
+        if 'signals' in parts:
+            self.TimeSeries_plotter()
+        elif 'preview' in parts:
+            self.TimeSeries_plotter(preview=True)
+        with self.frame_timer.section('render'):
+            if parts & {'signals', 'preview', 'annotations'}:
+                self.update_annotations()
+            if parts & {'signals', 'preview', 'intervals'}:
+                self.update_intervals()
+            if 'timeline' in parts:
+                self.update_timeline()
+            if parts & {'timeline', 'intervals'}:
+                self.update_interval_overview()
+        if 'stimulus' in parts:
+            self.update_stimulus()
+        self.frame_timer.annotate(frames_skipped=self.scheduler.skipped)
+        first_frame = self.open_ms is None
+        if first_frame:
+            self.open_ms = 1e3 * (time.perf_counter() - self.open_start)
+            self.frame_timer.annotate(open_ms=self.open_ms)
+        frame = self.frame_timer.end_frame()
+        if first_frame and (self.parent.log_io or self.open_ms > self.first_frame_budget_ms):
+            print('First frame {:.0f} ms after opening the file (budget {:.0f} ms)'.format(
+                self.open_ms, self.first_frame_budget_ms))
+        if self.timing_overlay is not None:
+            self.timing_overlay.setText(format_frame(frame))
+        if self.parent.log_io:
+            print('Redraw ' + format_frame(frame))
+
+    def TimeSeries_plotter(self, preview=False):
+        """
+        Plots time series signals. With preview=True, draws from a decimation
+        level four times coarser than the screen and never reads raw samples.
+        """
         startSamp = self.intervalStartSamples
         endSamp = self.intervalEndSamples
+        timer = self.frame_timer
+
+        # Max number of bins to plot - one min/max pair per pixel
+        maxBins = max(self.parent.win1.width(), 100)
+        with timer.section('io'):
+            if preview:
+                envelope = self.pyramid.envelope(startSamp, endSamp, self.selectedChannels,
+                                                 max_bins=maxBins // 4, force=True)
+                if envelope is None:
+                    return   # pyramid not built yet, wait for the refined frame
+            else:
+                envelope = self.pyramid.envelope(startSamp, endSamp, self.selectedChannels,
+                                                 max_bins=maxBins)
+            if envelope is None:
+                data = self.fetcher.fetch(startSamp, endSamp, self.selectedChannels)
+                timer.annotate(bytes_read=self.fetcher.last_frame['bytes_read'],
+                               bytes_decompressed=self.fetcher.last_frame['bytes_decompressed'])
+                # Loads the next window in the direction of navigation
+                length = endSamp - startSamp
+                ahead = endSamp if self.scroll_direction > 0 else startSamp - length
+                self.prefetcher.request(self.plotData, ahead, ahead + length,
+                                        int(self.selectedChannels.min()),
+                                        int(self.selectedChannels.max()) + 1)
+            # Standard deviations from the per-chunk statistics, when available
+            if self.parent.combo5.currentText() == 'global std':
+                stats = self.pyramid.stats(self.selectedChannels)
+            else:
+                stats = self.pyramid.stats(self.selectedChannels, startSamp, endSamp)
+
+        with timer.section('compute'):
+            if envelope is not None:
+                # Zoomed out: min/max envelope from the decimation pyramid
+                factor, bin_starts, mins, maxs, bin_means = envelope
+                samples, data = interleave_envelope(mins, maxs, bin_starts, factor)
+                stdData = data
+                means = np.mean(bin_means, axis=0)
+            else:
+                stdData = data
+                means = np.mean(data, axis=0)
+                # Subsample too big arrays to a min/max envelope, keeping transients
+                if endSamp - startSamp > 2 * maxBins:
+                    factor = int(np.ceil((endSamp - startSamp) / maxBins))
+                    mins, maxs, _, _ = minmax_decimate(data, factor)
+                    bin_starts = np.arange(startSamp, endSamp, factor)
+                    samples, data = interleave_envelope(mins, maxs, bin_starts, factor)
+                else:
+                    samples = np.arange(startSamp, endSamp)
+
+            # Use the same scaling factor for all channels, to keep things comparable
+            self.verticalScaleFactor = float(self.parent.qline4.text())
+            if stats is not None:
+                scaleFac = 2 * stats['std'] / self.verticalScaleFactor
+            else:
+                scaleFac = 2 * np.std(stdData, axis=0) / self.verticalScaleFactor
 
-        # Bins to plot - subsample for too big arrays
-        maxBins = 1000
-        ratio_to_max = (endSamp - startSamp) / maxBins
-        if ratio_to_max > 1:
-            bins_to_plot = np.linspace(startSamp, endSamp, maxBins, dtype='int')
-        else:
-            bins_to_plot = np.arange(startSamp, endSamp, dtype='int')
-
-        # Use the same scaling factor for all channels, to keep things comparable
-        self.verticalScaleFactor = float(self.parent.qline4.text())
-        scaleFac = 2 * np.std(self.plotData[startSamp:endSamp, self.selectedChannels - 1], axis=0) / self.verticalScaleFactor
+            # Scale variance_units, offset for each channel
+            scale_va = np.max(scaleFac)
+            self.scaleVec = np.arange(1, self.nChToShow + 1) * scale_va
 
-        # Scale variance_units, offset for each channel
-        scale_va = np.max(scaleFac)
-        self.scaleVec = np.arange(1, self.nChToShow + 1) * scale_va
+            scaleV = np.zeros([len(self.scaleVec), 1])
+            scaleV[:, 0] = self.scaleVec
 
-        scaleV = np.zeros([len(self.scaleVec), 1])
-        scaleV[:, 0] = self.scaleVec
+            # transpose matrix, plotData dims=[self.nChToShow, plotInterval]
+            means = np.reshape(means, (-1, 1))  # to align each trace around its reference trace
+            plotData = data.T + scaleV - means  # data + offset
 
-        # constrains the plotData to the chosen interval (and transpose matix)
-        # plotData dims=[self.nChToShow, plotInterval]
-        data = self.plotData[startSamp:endSamp, self.selectedChannels - 1].T
-        data = data[:, bins_to_plot - startSamp - 1]
-        means = np.reshape(np.mean(data, 1), (-1, 1))  # to align each trace around its reference trace
-        plotData = data + scaleV - means  # data + offset
+            # A line indicating reference for every channel
+            timebaseGuiUnits = samples * self.tbin_signal
+            startGuiUnits = startSamp * self.tbin_signal
+            endGuiUnits = endSamp * self.tbin_signal
+            bad = self.channel_meta.bad[self.selectedChannels]
+            labels = self.channel_meta.labels[self.selectedChannels]
 
         # Middle signals plot
-        # A line indicating reference for every channel
-        timebaseGuiUnits = bins_to_plot * self.tbin_signal
-        # timebaseGuiUnits = np.arange(startSamp, endSamp)*self.tbin_signal
-        plt2 = self.parent.win1  # middle signal plot
-        plt2.clear()
-        # Channels reference lines
-        for l in range(len(self.scaleVec)):
-            plt2.plot([timebaseGuiUnits[0], timebaseGuiUnits[-1]],
-                      [self.scaleVec[l], self.scaleVec[l]],
-                      pen='k')
-
-        # Iterate over chosen channels, plot one at a time
-        nrows, ncols = np.shape(plotData)
-        for i in range(nrows):
-            elec_index = self.source.electrodes[int(self.selectedChannels[i])].index[0]
-            if elec_index in self.bad_channels_ids:
-                plt2.plot(timebaseGuiUnits, plotData[i], pen=pg.mkPen((220, 0, 0), width=1.2))
-            else:
-                c = pg.mkPen((0, 120, 0), width=1.2)
-                if i % 2 == 0:
-                    c = pg.mkPen((0, 0, 200), width=1.2)
-                plt2.plot(timebaseGuiUnits, plotData[i], pen=c)
-        plt2.setLabel('bottom', 'Time', units='sec')
-        plt2.setLabel('left', 'Channel #')
-        labels = [str(self.electrical_series_channel_ids[ch]) for ch in self.selectedChannels]
-        ticks = list(zip(self.scaleVec, labels))
-        plt2.getAxis('left').setTicks([ticks])
-        plt2.setXRange(timebaseGuiUnits[0], timebaseGuiUnits[-1], padding=0.003)
-        plt2.setYRange(self.scaleVec[0], self.scaleVec[-1], padding=0.06)
-        plt2.getAxis('left').setWidth(w=53)
-
-        # Show Intervals
-        for i in range(len(self.IntRects2)):
-            plt2.removeItem(self.IntRects2[i])
-        for i in range(len(self.IntRects2)):
-            plt2.addItem(self.IntRects2[i])
-
-        # Show Annotations
-        for i in range(len(self.AnnotationsList)):
-            plt2.removeItem(self.AnnotationsList[i])
-        for i in range(len(self.AnnotationsList)):
-            aux = self.AnnotationsList[i].pg_item
-            x = self.AnnotationsPosAV[i, 0]
-            # Y to plot = (Y_va + Channel offset)*scale_variance
-            y_va = self.AnnotationsPosAV[i, 1]
-            y = (y_va + self.AnnotationsPosAV[i, 2] - self.firstCh) * scale_va
-            aux.setPos(x, y)
-            plt2.addItem(aux)
-
-        # Upper horizontal bar
-        plt1 = self.parent.win2
-        plt1.clear()
+        with timer.section('render'):
+            plt2 = self.parent.win1  # middle signal plot
+            if self.channel_curves is None:
+                self.channel_curves = ChannelCurves(plt2)
+            # All chosen channels and their reference lines, in one batch
+            self.channel_curves.set_data(timebaseGuiUnits, plotData, bad, self.scaleVec,
+                                         (startGuiUnits, endGuiUnits))
+            plt2.setLabel('bottom', 'Time', units='sec')
+            plt2.setLabel('left', 'Channel #')
+            ticks = list(zip(self.scaleVec, labels))
+            plt2.getAxis('left').setTicks([ticks])
+            plt2.setXRange(startGuiUnits, endGuiUnits, padding=0.003)
+            plt2.setYRange(self.scaleVec[0], self.scaleVec[-1], padding=0.06)
+            plt2.getAxis('left').setWidth(w=53)
+            plt2.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
+            plt2.getAxis('bottom').setPen(pg.mkPen(color=(50, 50, 50)))
+
+        # Channel offsets, also used to place annotations
+        self.scale_va = scale_va
+
+    def update_annotations(self):
+        """
+        Places the annotations inside the view at the offsets of the channels
+        they belong to. Plot items only exist for the visible annotations. When
+        there are too many, a subset that is stable while scrolling is shown.
+        """
+        store = self.annotations
+        (x0, x1), (y0, y1) = self.parent.win1.getViewBox().viewRange()
+        window = store.window(x0, x1)
+        # Y to plot = (Y_va + Channel offset)*scale_variance
+        y = (store.y_va[window] + store.y_off[window] - self.firstCh) * self.scale_va
+        visible = np.flatnonzero((y >= y0) & (y <= y1))
+        ids = store.ids[window][visible]
+        if len(ids) > self.max_annotation_items:
+            stride = int(np.ceil(len(ids) / self.max_annotation_items))
+            keep = ids % stride == 0
+            visible, ids = visible[keep], ids[keep]
+        plt = self.parent.win1
+        for ann_id in set(self.annotation_items) - set(ids.tolist()):
+            plt.removeItem(self.annotation_items.pop(ann_id))
+        for ann_id, i, y_i in zip(ids, visible + window.start, y[visible]):
+            item = self.annotation_items.get(ann_id)
+            if item is None:
+                item = annotation_item(store.text[i], store.color[i])
+                self.annotation_items[ann_id] = item
+                plt.addItem(item)
+            item.setPos(store.x[i], y_i)
+
+    def update_intervals(self):
+        """Draws the intervals overlapping the view of the signals panel."""
+        (x0, x1), _ = self.parent.win1.getViewBox().viewRange()
+        index = self.intervals.overlapping(x0, x1)
+        colors = self.intervals.color[index]
+        runs = {}
+        for color in set(colors):
+            sel = index[colors == color]
+            runs[color] = (self.intervals.start[sel], self.intervals.stop[sel])
+        self.draw_interval_bars(self.parent.win1, self.interval_bars_signals, runs)
+
+    def update_interval_overview(self):
+        """Draws all intervals on the timeline bar, merged at pixel resolution."""
+        width = max(self.parent.win2.width(), 100)
+        if self.interval_overview == (self.intervals.version, width):
+            return
+        self.interval_overview = (self.intervals.version, width)
         max_dur = self.nBins * self.tbin_signal
-        plt1.plot([0, max_dur], [0, 0], pen=pg.mkPen('k', width=2))
-        plt1.setXRange(0, max_dur)
-        plt1.setYRange(-1, 1)
+        runs = {}
+        for color in set(self.intervals.color):
+            index = np.flatnonzero(self.intervals.color == color)
+            runs[color] = self.intervals.merged(0, max_dur, width, index)
+        self.draw_interval_bars(self.parent.win2, self.interval_bars_timeline, runs)
 
-        if self.current_rect != []:
-            plt1.removeItem(self.current_rect)
+    def draw_interval_bars(self, plt, bars, runs):
+        """
+        Updates the rectangles of a panel, one BarGraphItem per color.
 
-        # Rectangle Plot
+        Parameters
+        ----------
+        plt : pyqtgraph.PlotWidget
+            Panel.
+        bars : dict
+            Items of the panel, by color. New items are added to it.
+        runs : dict
+            (starts, stops) arrays of the rectangles, by color.
+        """
+        empty = (np.zeros(0), np.zeros(0))
+        for color in set(bars) | set(runs):
+            starts, stops = runs.get(color, empty)
+            if color in bars:
+                bars[color].setOpts(x0=starts, x1=stops)
+                continue
+            bc = interval_color(color)
+            bars[color] = pg.BarGraphItem(x0=starts, x1=stops, y0=-1, height=2,
+                                          pen=pg.mkPen(color=QtGui.QColor(bc[0], bc[1], bc[2], 255)),
+                                          brush=QtGui.QColor(bc[0], bc[1], bc[2], bc[3]))
+            bars[color].setZValue(-10)   # below the draggable window of the timeline
+            plt.addItem(bars[color])
+
+    def update_timeline(self):
+        """Moves the upper visualization window along the timeline bar."""
+        plt1 = self.parent.win2
         x = float(self.parent.qline2.text())
         w = float(self.parent.qline3.text())
-        self.current_rect = CustomBox(self, x, -1000, w, 2000)
-        self.current_rect.setPen(pg.mkPen(color=(0, 0, 0, 50)))
-        self.current_rect.setBrush(QtGui.QColor(0, 0, 0, 50))
-        self.current_rect.setFlags(QtGui.QGraphicsItem.ItemIsMovable)
-        plt1.addItem(self.current_rect)
-        plt1.setLabel('left', 'Span')
-        plt1.getAxis('left').setWidth(w=53)
-        plt1.getAxis('left').setStyle(showValues=False)
-        plt1.getAxis('left').setTicks([])
-
-        # Show Intervals
-        for i in range(len(self.IntRects1)):
-            plt1.removeItem(self.IntRects1[i])
-        for i in range(len(self.IntRects1)):
-            plt1.addItem(self.IntRects1[i])
-
-        # Bottom plot - Stimuli
+        max_dur = self.nBins * self.tbin_signal
+        if self.current_rect == []:
+            self.timeline_bar = plt1.plot(pen=pg.mkPen('k', width=2))
+            # Rectangle Plot
+            self.current_rect = CustomBox(self, x, -1000, w, 2000)
+            self.current_rect.setPen(pg.mkPen(color=(0, 0, 0, 50)))
+            self.current_rect.setBrush(QtGui.QColor(0, 0, 0, 50))
+            self.current_rect.setFlags(QtGui.QGraphicsItem.ItemIsMovable)
+            plt1.addItem(self.current_rect)
+            plt1.setLabel('left', 'Span')
+            plt1.getAxis('left').setWidth(w=53)
+            plt1.getAxis('left').setStyle(showValues=False)
+            plt1.getAxis('left').setTicks([])
+            plt1.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
+        self.timeline_bar.setData([0, max_dur], [0, 0])
+        plt1.setXRange(0, max_dur)
+        plt1.setYRange(-1, 1)
+        self.current_rect.setRect(x, -1000, w, 2000)
+        self.current_rect.setPos(0, 0)   # resets the offset of a drag
+
+    def update_stimulus(self):
+        """Plots the stimulus of the current time window."""
         plt3 = self.parent.win3
-        plt3.clear()
-        stimData = None
-        if self.parent.combo4.currentText() != '':
-            try:
-                xmask = (self.stimX > timebaseGuiUnits[0]) * (self.stimX < timebaseGuiUnits[-1])
-                stimName = self.parent.combo4.currentText()
-                stimData = self.stimY[stimName]
-                plt3.plot(self.stimX[xmask], stimData[xmask], pen='k', width=1)
-                plt3.setYRange(np.min(stimData), np.max(stimData))
-                plt3.setXLink(plt2)
-            except:  # THIS IS MOMENTARY TO PLOT ARTIFICIAL DATA-- REMOVE LATER
-                stimName = self.parent.combo4.currentText()
-                stimData = self.stimY[stimName]
-                plt3.plot(stimData, pen='k', width=1)
-                # remove this later -------------------------------------------
-
-        if stimData is not None:
-            plt3.setYRange(np.min(stimData), np.max(stimData))
-        plt3.setLabel('left', 'Stim')
-        plt3.getAxis('left').setWidth(w=53)
-        plt3.getAxis('left').setStyle(showValues=False)
-        plt3.getAxis('left').setTicks([])
-
-        # set colors
-        plt1.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
-        plt2.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
-        plt2.getAxis('bottom').setPen(pg.mkPen(color=(50, 50, 50)))
-        plt3.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
-
-    def drag_window(self, dt):
-        """Updates upper visualization window position when dragged by the user."""
-        self.parent.qline2.setText(str(self.intervalStartGuiUnits + dt))
-        self.updateCurXAxisPosition()
+        if self.stim_curve is None:
+            self.stim_curve = plt3.plot(pen='k', width=1)
+            plt3.setXLink(self.parent.win1)
+            plt3.setLabel('left', 'Stim')
+            plt3.getAxis('left').setWidth(w=53)
+            plt3.getAxis('left').setStyle(showValues=False)
+            plt3.getAxis('left').setTicks([])
+            plt3.getAxis('left').setPen(pg.mkPen(color=(50, 50, 50)))
+        stimName = self.parent.combo4.currentText()
+        if stimName not in self.stimY:
+            self.stim_curve.setData([], [])
+            return
+
+        # Stimulus samples of the current window, found by index arithmetic
+        stimData = self.stimY[stimName]
+        rate = self.stimRate[stimName]
+        start = max(int(np.floor(self.intervalStartSamples * self.tbin_signal * rate)), 0)
+        stop = min(int(np.ceil(self.intervalEndSamples * self.tbin_signal * rate)) + 1,
+                   stimData.shape[0])
+        if stop <= start:
+            self.stim_curve.setData([], [])
+            return
+
+        maxBins = max(plt3.width(), 100)
+        timer = self.frame_timer
+        pyramid = self.stimulus_pyramid(stimName)
+        with timer.section('io'):
+            envelope = pyramid.envelope(start, stop, [0], max_bins=maxBins)
+            if envelope is None:
+                values = np.asarray(stimData[start:stop]).reshape(-1, 1)
+            # Amplitude range of the whole stimulus, once the pyramid is available
+            yrange = pyramid.data_range() if pyramid.ready else None
+        with timer.section('compute'):
+            if envelope is not None:
+                factor, bin_starts, mins, maxs, _ = envelope
+                samples, values = interleave_envelope(mins, maxs, bin_starts, factor)
+            elif stop - start > 2 * maxBins:
+                factor = int(np.ceil((stop - start) / maxBins))
+                mins, maxs, _, _ = minmax_decimate(values, factor)
+                bin_starts = np.arange(start, stop, factor)
+                samples, values = interleave_envelope(mins, maxs, bin_starts, factor)
+            else:
+                samples = np.arange(start, stop)
+            if yrange is None:
+                yrange = (np.min(values), np.max(values))
+        with timer.section('render'):
+            self.stim_curve.setData(samples / rate, values[:, 0])
+            plt3.setYRange(*yrange)
+
+    def drag_preview(self, start):
+        """
+        Draws a coarse preview of the window while it is dragged along the
+        timeline, and refines it once the motion stops.
+
+        Parameters
+        ----------
+        start : float
+            Start of the dragged window, in seconds.
+        """
+        self.refine_generation += 1   # cancels the refinement of older windows
+        self.parent.qline2.setText(str(start))
+        self.update_interval()
+        self.scheduler.request(['preview'])
+        self.settle_timer.start()
+
+    def drag_window(self, start):
+        """Updates upper visualization window position when dropped by the user."""
+        self.settle_timer.stop()
+        self.parent.qline2.setText(str(start))
+        self.update_interval()
+        self.refine()
+
+    def refine(self):
+        """
+        Loads the samples of the current window in the background, then
+        re-draws it at full resolution. Superseded by any later drag.
+        """
+        self.settle_timer.stop()
+        self.refine_generation += 1
+        self.refine_threads = [t for t in self.refine_threads if t.isRunning()]
+        maxBins = max(self.parent.win1.width(), 100)
+        length = self.intervalEndSamples - self.intervalStartSamples
+        if self.pyramid.ready and length / self.pyramid.base_factor > maxBins:
+            # Drawn from the pyramid, nothing to load
+            self.refined(self.refine_generation)
+            return
+        thread = RefineFunction(self, self.refine_generation, self.plotData,
+                                self.intervalStartSamples, self.intervalEndSamples,
+                                int(self.selectedChannels.min()),
+                                int(self.selectedChannels.max()) + 1)
+        thread.refined.connect(self.refined)
+        self.refine_threads.append(thread)
+        thread.start()
+
+    def refined(self, generation):
+        """Draws the refined window, unless another one was chosen meanwhile."""
+        if generation != self.refine_generation:
+            return
+        parts = ['signals', 'stimulus']
+        if not (self.current_rect != [] and self.current_rect.dragging):
+            parts.append('timeline')   # would reset the offset of an ongoing drag
+        self.scheduler.request(parts)
+
+    def stop_refine(self):
+        """Cancels the background refinements, e.g. before closing the file."""
+        self.settle_timer.stop()
+        self.refine_generation += 1
+        for thread in self.refine_threads:
+            thread.wait()
+        self.refine_threads = []
 
     def updateCurXAxisPosition(self):
         """Updates the time interval selected from the user forms,
            with checks for allowed values"""
+        self.update_interval()
+        self.refreshScreen(['signals', 'timeline', 'stimulus'])
+
+    def update_interval(self):
+        """Reads the time interval from the user forms, with checks for
+           allowed values, without re-drawing"""
         # Read from user forms
         self.intervalStartGuiUnits = float(self.parent.qline2.text())
         self.intervalLengthGuiUnits = float(self.parent.qline3.text())
@@ -416,8 +727,6 @@ class TimeSeriesPlotter:
         self.intervalStartSamples = int(min(self.intervalStartSamples, self.nBins - self.min_window_bins))
         self.intervalEndSamples = self.intervalStartSamples + self.intervalLengthSamples
 
-        self.refreshScreen()
-
     def time_window_resize(self, wscale):
         """Updates the plotting time interval range"""
         self.intervalLengthGuiUnits = float(self.parent.qline3.text())
@@ -428,6 +737,8 @@ class TimeSeriesPlotter:
     def time_scroll(self, scroll=0):
         """Updates the plotting time interval for scrolling.
            Buttons: >>, >, <<, <"""
+        if scroll != 0:
+            self.scroll_direction = np.sign(scroll)
         # new interval start
         self.intervalStartSamples = self.intervalStartSamples + int(scroll * self.intervalLengthSamples)
         # if the last sample of the new interval is beyond is the available data
@@ -445,7 +756,7 @@ class TimeSeriesPlotter:
         self.intervalStartGuiUnits = np.round(self.intervalStartGuiUnits, 3)
         self.intervalEndGuiUnits = self.intervalEndSamples * self.tbin_signal
         self.parent.qline2.setText(str(self.intervalStartGuiUnits))
-        self.refreshScreen()
+        self.scheduler.request(['signals', 'timeline', 'stimulus'])
 
     def channel_Scroll_Up(self, opt='unit'):
         """Updates the channels to be plotted. Buttons: ^, ^^ """
@@ -462,7 +773,7 @@ class TimeSeriesPlotter:
             self.parent.qline1.setText(str(self.firstCh))
             self.nChToShow = self.lastCh - self.firstCh + 1
             self.selectedChannels = self.channels_mask_ind[self.firstCh - 1:self.lastCh]
-        self.refreshScreen()
+        self.scheduler.request(['signals'])
 
     def channel_Scroll_Down(self, opt='unit'):
         """Updates the channels to be plotted. Buttons: v, vv """
@@ -479,7 +790,7 @@ class TimeSeriesPlotter:
             self.parent.qline1.setText(str(self.firstCh))
             self.nChToShow = self.lastCh - self.firstCh + 1
             self.selectedChannels = self.channels_mask_ind[self.firstCh - 1:self.lastCh]
-        self.refreshScreen()
+        self.scheduler.request(['signals'])
 
     def nChannels_Displayed(self):
         """Updates channels to be plotted."""
@@ -508,7 +819,7 @@ class TimeSeriesPlotter:
         self.selectedChannels = self.channels_mask_ind[self.firstCh - 1:self.lastCh]
         self.parent.qline0.setText(str(self.lastCh))
         self.parent.qline1.setText(str(self.firstCh))
-        self.refreshScreen()
+        self.refreshScreen(['signals'])
 
     # Annotation functions ----------------------------------------------------
     def AnnotationAdd(self, x, y, color='yellow', text=''):
@@ -526,36 +837,10 @@ class TimeSeriesPlotter:
         text : str
             Annotation text
         """
-        if color == 'yellow':
-            bgcolor = pg.mkBrush(250, 250, 150, 200)
-        elif color == 'red':
-            bgcolor = pg.mkBrush(250, 0, 0, 200)
-        elif color == 'green':
-            bgcolor = pg.mkBrush(0, 255, 0, 200)
-        elif color == 'blue':
-            bgcolor = pg.mkBrush(0, 0, 255, 200)
-        c = pg.TextItem(anchor=(.5, .5), border=pg.mkPen(100, 100, 100), fill=bgcolor)
-        c.setText(text=text, color=(0, 0, 0))
         # Y coordinate transformed to variance_units (for plot control)
         y_va = np.round(y / self.scaleVec[0]).astype('int')
-        c.setPos(x, y_va)
-        # create annotation object and add it to the list
-        obj = CustomAnnotation()
-        obj.pg_item = c
-        obj.x = x
-        obj.y_va = y_va
-        obj.y_off = self.firstCh
-        obj.color = color
-        obj.text = text
-        obj.session = self.parent.current_session
-        self.AnnotationsList = np.append(self.AnnotationsList, obj)
-        # List of positions (to calculate distances)
-        if len(self.AnnotationsPosAV) > 0:
-            self.AnnotationsPosAV = np.concatenate((self.AnnotationsPosAV,
-                                                    np.array([x, y_va, self.firstCh]).reshape(1, 3)))
-        else:
-            self.AnnotationsPosAV = np.array([x, y_va, self.firstCh]).reshape(1, 3)
-        self.refreshScreen()
+        self.annotations.add(x, y_va, self.firstCh, color, text, self.parent.current_session)
+        self.refreshScreen(['annotations'])
         self.unsaved_changes_annotation = True
 
     def AnnotationDel(self, x, y):
@@ -569,20 +854,18 @@ class TimeSeriesPlotter:
         y : float
             y position
         """
-        x_ann = self.AnnotationsPosAV[:, 0]
-        y_ann = np.round((self.AnnotationsPosAV[:, 1] + self.AnnotationsPosAV[:, 2] - self.firstCh) * self.scaleVec[0])
-        # Calculates euclidian distance from click
-        euclid_dist = np.sqrt((x_ann - x)**2 + (y_ann - y)**2)
-        indmin = np.argmin(euclid_dist)
+        indmin = self.annotations.nearest(x, y, self.scaleVec[0], self.firstCh)
+        if indmin is None:
+            return
         # Checks if user intends to delete annotation
-        text = self.AnnotationsList[indmin].text
+        text = self.annotations.text[indmin]
         buttonReply = QMessageBox.question(None,
                                            'Delete Annotation', "Delete the annotation: \n\n" + text + ' ?',
                                            QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if buttonReply == QMessageBox.Yes:
-            self.AnnotationsList = np.delete(self.AnnotationsList, indmin, axis=0)
-            self.AnnotationsPosAV = np.delete(self.AnnotationsPosAV, indmin, axis=0)
-            self.refreshScreen()
+            ann_id = self.annotations.delete(indmin)
+            if ann_id in self.annotation_items:
+                self.parent.win1.removeItem(self.annotation_items.pop(ann_id))
             self.unsaved_changes_annotation = True
 
     def AnnotationSave(self):
@@ -590,13 +873,9 @@ class TimeSeriesPlotter:
         buttonReply = QMessageBox.question(None, ' ', 'Save annotations on external file?',
                                            QMessageBox.No | QMessageBox.Yes)
         if buttonReply == QMessageBox.Yes:
-            c0 = self.AnnotationsPosAV[:, 0]     # x
-            c1 = self.AnnotationsPosAV[:, 1]     # y_va
-            c2 = self.AnnotationsPosAV[:, 2]     # y_off
-            c3 = [self.AnnotationsList[i].color for i in range(len(self.AnnotationsList))]
-            c4 = [self.AnnotationsList[i].text for i in range(len(self.AnnotationsList))]
-            c5 = [self.AnnotationsList[i].session for i in range(len(self.AnnotationsList))]
-            d = {'x': c0, 'y_va': c1, 'y_off': c2, 'color': c3, 'text': c4, 'session': c5}
+            store = self.annotations
+            d = {'x': store.x, 'y_va': store.y_va, 'y_off': store.y_off,
+                 'color': store.color, 'text': store.text, 'session': store.session}
             df = pd.DataFrame(data=d)
             fullfile = os.path.join('annotations_' +
                                     datetime.datetime.today().strftime('%Y-%m-%d') +
@@ -607,42 +886,9 @@ class TimeSeriesPlotter:
     def AnnotationLoad(self, fname=''):
         """Loads annotations from an external CSV file."""
         df = pd.read_csv(fname)
-        all_x = df['x'].values
-        all_y_va = df['y_va'].values
-        all_y_off = df['y_off'].values
-        texts = df['text'].tolist()
-        colors = df['color'].tolist()
-        session = df['session'].tolist()
-        for i, txt in enumerate(texts):    # Add loaded annotations to graph
-            if colors[i] == 'yellow':
-                bgcolor = pg.mkBrush(250, 250, 150, 200)
-            elif colors[i] == 'red':
-                bgcolor = pg.mkBrush(250, 0, 0, 200)
-            elif colors[i] == 'green':
-                bgcolor = pg.mkBrush(0, 255, 0, 200)
-            elif colors[i] == 'blue':
-                bgcolor = pg.mkBrush(0, 0, 255, 200)
-            c = pg.TextItem(anchor=(.5, .5), border=pg.mkPen(100, 100, 100), fill=bgcolor)
-            c.setText(text=txt, color=(0, 0, 0))
-            # Y coordinate transformed to variance_units (for plot control)
-            y_va = all_y_va[i]
-            x = all_x[i]
-            c.setPos(x, y_va)
-            obj = CustomAnnotation()
-            obj.pg_item = c
-            obj.x = all_x[i]
-            obj.y_va = all_y_va[i]
-            obj.y_off = all_y_off[i]
-            obj.color = colors[i]
-            obj.text = txt
-            obj.session = session[i]
-            self.AnnotationsList.append(obj)
-            if len(self.AnnotationsPosAV) > 0:
-                self.AnnotationsPosAV = np.concatenate((self.AnnotationsPosAV,
-                                                        np.array([x, y_va, all_y_off[i]]).reshape(1, 3)))
-            else:
-                self.AnnotationsPosAV = np.array([x, y_va, all_y_off[i]]).reshape(1, 3)
-        self.refreshScreen()
+        self.annotations.extend(df['x'].values, df['y_va'].values, df['y_off'].values,
+                                df['color'].values, df['text'].values, df['session'].values)
+        self.refreshScreen(['annotations'])
 
     # Interval functions ------------------------------------------------------
     def IntervalAdd(self, interval, int_type, color, session):
@@ -660,70 +906,33 @@ class TimeSeriesPlotter:
         session : str
             Session name.
         """
-        if color == 'yellow':
-            bc = [250, 250, 150, 180]
-        elif color == 'red':
-            bc = [250, 0, 0, 100]
-        elif color == 'green':
-            bc = [0, 255, 0, 130]
-        elif color == 'blue':
-            bc = [0, 0, 255, 100]
-        x = interval[0]
-        w = np.diff(np.array(interval))[0]
-        # add rectangle to upper plot
-        c = pg.QtGui.QGraphicsRectItem(x, -1, w, 2)
-        c.setPen(pg.mkPen(color=QtGui.QColor(bc[0], bc[1], bc[2], 255)))
-        c.setBrush(QtGui.QColor(bc[0], bc[1], bc[2], bc[3]))
-        self.IntRects1 = np.append(self.IntRects1, [c])
-        # add rectangle to middle signal plot
-        c = pg.QtGui.QGraphicsRectItem(x, -1, w, 2)
-        c.setPen(pg.mkPen(color=QtGui.QColor(bc[0], bc[1], bc[2], 255)))
-        c.setBrush(QtGui.QColor(bc[0], bc[1], bc[2], bc[3]))
-        self.IntRects2 = np.append(self.IntRects2, [c])
-        # new Interval object
-        obj = CustomInterval()
-        obj.start = interval[0]
-        obj.stop = interval[1]
-        obj.type = int_type
-        obj.color = color
-        obj.session = session
-        self.allIntervals.append(obj)
-        self.nBI = len(self.allIntervals)
+        self.intervals.add(interval[0], interval[1], int_type, color, session)
         self.unsaved_changes_interval = True
+        self.refreshScreen(['intervals'])
 
     def IntervalDel(self, x):
         """
-        Deletes from plot scene the interval passing by the x position.
+        Deletes from plot scene the intervals passing by the x position.
 
         Parameters
         ----------
         x : float
             x position.
         """
-        for i, obj in enumerate(self.allIntervals):
-            if (x >= obj.start) & (x <= obj.stop):   # interval of the click
-                self.parent.win2.removeItem(self.IntRects1[i])
-                self.IntRects1 = np.delete(self.IntRects1, i, axis=0)
-                self.parent.win1.removeItem(self.IntRects2[i])
-                self.IntRects2 = np.delete(self.IntRects2, i, axis=0)
-                del self.allIntervals[i]
-                self.nBI = len(self.allIntervals)
-                self.refreshScreen()
-                self.unsaved_changes_interval = True
+        index = self.intervals.overlapping(x, x)
+        if len(index) > 0:
+            self.intervals.delete(index)
+            self.unsaved_changes_interval = True
+            self.refreshScreen(['intervals'])
 
     def IntervalSave(self):
         """Saves intervals in an external CSV file."""
         buttonReply = QMessageBox.question(None, ' ', 'Save intervals on external file?',
                                            QMessageBox.No | QMessageBox.Yes)
         if buttonReply == QMessageBox.Yes:
-            c0, c1, c2, c3, c4 = [], [], [], [], []
-            for i, obj in enumerate(self.allIntervals):
-                c0.append(obj.start)     # start
-                c1.append(obj.stop)      # stop
-                c2.append(obj.type)      # type
-                c3.append(obj.color)     # color
-                c4.append(obj.session)   # session
-            d = {'start': c0, 'stop': c1, 'type': c2, 'color': c3, 'session': c4}
+            ivs = self.intervals
+            d = {'start': ivs.start, 'stop': ivs.stop, 'type': ivs.type, 'color': ivs.color,
+                 'session': ivs.session}
             df = pd.DataFrame(data=d)
             fullfile = os.path.join('intervals_' +
                                     datetime.datetime.today().strftime('%Y-%m-%d') +
@@ -734,30 +943,23 @@ class TimeSeriesPlotter:
     def IntervalLoad(self, fname):
         """Loads intervals from an external CSV file."""
         df = pd.read_csv(fname)
-        for index, row in df.iterrows():    # Add loaded intervals to graph
-            interval = [row.start, row.stop]
-            int_type = row.type
-            color = row.color
-            session = row.session
-            self.IntervalAdd(interval, int_type, color, session)
-            # Update dictionary of interval types
-            # TO-DO
-        self.refreshScreen()
+        self.intervals.extend(df['start'].values, df['stop'].values, df['type'].values,
+                              df['color'].values, df['session'].values)
+        self.unsaved_changes_interval = True
+        self.refreshScreen(['intervals'])
+        # Update dictionary of interval types
+        # TO-DO
 
     def SpeakerAndMicIntervalAdd(self):
+        """Adds the speaker and mic TimeIntervals of the file, if they exist."""
         if self.nwb.intervals is not None:
             keys = ['TimeIntervals_speaker', 'TimeIntervals_mic']
             colors = ['blue', 'green']
             for name, color in zip(keys, colors):
                 if name in self.nwb.intervals:
                     ti = self.nwb.intervals[name]
-                    nI = len(ti)
-                    for ii in np.arange(nI):
-                        interval = [ti['start_time'][ii], ti['stop_time'][ii]]
-                        int_type = name
-                        color = color
-                        session = ''
-                        self.IntervalAdd(interval, int_type, color, session)
+                    self.intervals.extend(ti['start_time'][:], ti['stop_time'][:], name, color, '')
+                    self.unsaved_changes_interval = True
 
     # Channels functions -------------------------------------------------------
     def BadChannelAdd(self, ch_list):
@@ -769,10 +971,8 @@ class TimeSeriesPlotter:
         ch_list : list of integers
             List of indices of channels to be marked as 'bad'.
         """
-        # Update list of bad electrodes ids
-        for ch in ch_list:
-            if ch not in self.bad_channels_ids:
-                self.bad_channels_ids.append(ch)
+        self.make_writable()
+        self.channel_meta.set_bad(ch_list, bad=True)
         self.update_bad_channels()
 
     def BadChannelDel(self, ch_list):
@@ -784,32 +984,16 @@ class TimeSeriesPlotter:
         ch_list : list of integers
             List of indices of channels to be un-marked as 'bad'.
         """
-        # Update list of bad electrodes ids
-        for ch in ch_list:
-            if ch in self.bad_channels_ids:
-                self.bad_channels_ids.remove(ch)
+        self.make_writable()
+        self.channel_meta.set_bad(ch_list, bad=False)
         self.update_bad_channels()
 
     def update_bad_channels(self):
-        """Updates list of bad channels after add or del"""
-        # List of electrodes IDs
-        elecs_ids = list(self.electrodes_table.id[:])
-        is_bad_list = [False] * len(elecs_ids)
-        for i, id in enumerate(elecs_ids):
-            if id in self.bad_channels_ids:
-                is_bad_list[i] = True
-
-        if 'bad' not in self.electrodes_table:
-            self.electrodes_table.add_column(
-                name='bad',
-                description='electrode identified as too noisy',
-                data=is_bad_list,
-            )
-        else:
-            self.electrodes_table['bad'].data[:] = is_bad_list
+        """Updates the electrodes table after add or del of bad channels"""
+        self.channel_meta.write_bad()
 
         # Refresh screen
-        self.refreshScreen()
+        self.refreshScreen(['signals'])
 
     def DrawMarkTime(self, position):
         """Marks temporary reference line when adding a new interval."""
@@ -826,64 +1010,98 @@ class TimeSeriesPlotter:
 
     def close_nwbfile(self):
         """Close current nwbfile"""
+        if hasattr(self, 'deferred_timer'):
+            self.deferred_timer.stop()
+        if hasattr(self, 'scheduler'):
+            self.scheduler.cancel()
+            self.stop_refine()
+        self.stop_pyramid_build(stimulus=True)
+        if hasattr(self, 'prefetcher'):
+            self.prefetcher.stop()
+            self.chunk_cache.clear()
         if hasattr(self, 'io'):
-            self.io.close()
-
-
-class CustomInterval:
-    """
-    Stores information about individual Intervals.
-
-    Parameters
-    ----------
-    start : float
-        Start time position.
-    stop : float
-        Stop time position.
-    type : str
-        Interval type (e.g. 'invalid').
-    color : str
-        Interval color: 'yellow', 'red', 'green' or 'blue'.
-    session: str
-        Session name.
-    """
-    def __init__(self):
-        self.start = -999
-        self.stop = -999
-        self.type = ''
-        self.color = ''
-        self.session = ''
+            if self.writable:
+                self.io.close()
+            else:   # kept open, to come back to this block fast
+                self.parent.handle_pool.release(self.source_path, self.io, self.nwb)
+        if hasattr(self, 'cache_file'):
+            self.cache_file.close()
+        if hasattr(self, 'frame_timer'):
+            self.frame_timer.close()
+
+
+class PyramidBuildFunction(QtCore.QThread):
+    """Builds a decimation pyramid in the background."""
+    def __init__(self, pyramid):
+        super().__init__()
+        self.pyramid = pyramid
+        self.cancelled = False
+
+    def run(self):
+        start = time.time()
+        try:
+            if self.pyramid.build(is_cancelled=lambda: self.cancelled):
+                print('Decimation pyramid for ' + self.pyramid.key + ' built in '
+                      '{:.1f} seconds'.format(time.time() - start))
+        except Exception as ex:
+            print('Decimation pyramid build failed: ' + str(ex))
 
 
-class CustomAnnotation:
+class RefineFunction(QtCore.QThread):
     """
-    Stores information about individual Annotations.
-
-    Parameters
-    ----------
-    pg_item :
-        pyqtgraph TextItem object.
-    x : float
-        X position (time).
-    y_va : int
-        Y coordinate transformed to variance_units (for plot control).
-    y_off : int
-        Y offset, usually the bottom channel on plot when annotation is saved.
-    color : str
-        Interval color: 'yellow', 'red', 'green' or 'blue'.
-    text : str
-        Annotation text.
-    session: str
-        Session name.
+    Loads the blocks of a window into the chunk cache in the background, and
+    gives up as soon as the window is no longer the one on screen.
     """
-    def __init__(self):
-        self.pg_item = None
-        self.x = 0
-        self.y_va = 0
-        self.y_off = 0
-        self.color = ''
-        self.text = ''
-        self.session = ''
+    refined = QtCore.pyqtSignal(int)
+
+    def __init__(self, model, generation, dataset, t0, t1, c0, c1):
+        super().__init__()
+        self.model = model
+        self.generation = generation
+        self.dataset = dataset
+        self.window = (t0, t1, c0, c1)
+
+    def run(self):
+        t0, t1, c0, c1 = self.window
+        rows = self.dataset.block_shape[0]
+        ti_range, _ = self.dataset.block_ranges(t0, t1, c0, c1)
+        try:
+            for ti in ti_range:
+                if self.model.refine_generation != self.generation:
+                    return
+                self.dataset.load(max(ti * rows, t0), min((ti + 1) * rows, t1), c0, c1,
+                                  prefetch=True)
+        except Exception as ex:
+            print('Loading the window failed: ' + str(ex))
+        self.refined.emit(self.generation)
+
+
+def interval_color(color):
+    """RGBA fill of an interval color, its border is the opaque RGB."""
+    if color == 'yellow':
+        bc = [250, 250, 150, 180]
+    elif color == 'red':
+        bc = [250, 0, 0, 100]
+    elif color == 'green':
+        bc = [0, 255, 0, 130]
+    elif color == 'blue':
+        bc = [0, 0, 255, 100]
+    return bc
+
+
+def annotation_item(text, color):
+    """Plot item of an annotation, a text box filled with the annotation color."""
+    if color == 'yellow':
+        bgcolor = pg.mkBrush(250, 250, 150, 200)
+    elif color == 'red':
+        bgcolor = pg.mkBrush(250, 0, 0, 200)
+    elif color == 'green':
+        bgcolor = pg.mkBrush(0, 255, 0, 200)
+    elif color == 'blue':
+        bgcolor = pg.mkBrush(0, 0, 255, 200)
+    item = pg.TextItem(anchor=(.5, .5), border=pg.mkPen(100, 100, 100), fill=bgcolor)
+    item.setText(text=text, color=(0, 0, 0))
+    return item
 
 
 class CustomBox(pg.QtGui.QGraphicsRectItem):
@@ -891,7 +1109,20 @@ class CustomBox(pg.QtGui.QGraphicsRectItem):
     def __init__(self, parent, x, y, w, h):
         pg.QtGui.QGraphicsRectItem.__init__(self, x, y, w, h)
         self.parent = parent
+        self.dragging = False
+
+    def start(self):
+        """Start of the window, in seconds, including the drag offset."""
+        return self.rect().x() + self.x()
+
+    def mousePressEvent(self, event):
+        self.dragging = True
+        pg.QtGui.QGraphicsRectItem.mousePressEvent(self, event)
+
+    def mouseMoveEvent(self, event):
+        pg.QtGui.QGraphicsRectItem.mouseMoveEvent(self, event)
+        self.parent.drag_preview(self.start())
 
     def mouseReleaseEvent(self, event):
-        dt = self.x()
-        self.parent.drag_window(dt)
+        self.dragging = False
+        self.parent.drag_window(self.start())
@@ -0,0 +1,27 @@
+import numpy as np
+from ecogvis.functions.annotation_store import AnnotationStore
+
+
+def test_annotation_store():
+    store = AnnotationStore()
+    assert store.nearest(0., 0., 1., 0) is None
+    store.add(5., 2, 0, 'red', 'b', 's')
+    store.extend([9., 1., 5.], [0, 0, 4], [0, 0, 0], ['blue'] * 3, ['d', 'a', 'c'], ['s'] * 3)
+    store.add(3., 0, 0, 'green', 'e', 's')
+
+    # Columns are sorted by time, ties keep their insertion order
+    np.testing.assert_array_equal(store.x, [1., 3., 5., 5., 9.])
+    np.testing.assert_array_equal(store.text, ['a', 'e', 'b', 'c', 'd'])
+    np.testing.assert_array_equal(store.ids, [2, 4, 0, 3, 1])
+    assert store.window(3., 5.) == slice(1, 4)
+
+    # Same choice as the distances to every annotation
+    rng = np.random.RandomState(0)
+    for x, y in rng.uniform(0, 10, (50, 2)):
+        y_ann = np.round((store.y_va + store.y_off - 0) * 2.)
+        expected = np.argmin(np.sqrt((store.x - x)**2 + (y_ann - y)**2))
+        assert store.nearest(x, y, 2., 0) == expected
+
+    assert store.delete(2) == 0
+    assert len(store) == 4 and 0 not in store.ids
+    assert store.add(4., 0, 0, 'red', 'f', 's') == 5
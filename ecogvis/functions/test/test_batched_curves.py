@@ -0,0 +1,11 @@
+import numpy as np
+from ecogvis.functions.batched_curves import stack_segments
+
+
+def test_stack_segments():
+    x = np.array([0., 1., 2.])
+    Y = np.array([[1., 2., 3.], [4., 5., 6.]])
+    xs, ys, connect = stack_segments(x, Y)
+    np.testing.assert_equal(xs, [0, 1, 2, 0, 1, 2])
+    np.testing.assert_equal(ys, [1, 2, 3, 4, 5, 6])
+    np.testing.assert_equal(connect, [1, 1, 0, 1, 1, 0])
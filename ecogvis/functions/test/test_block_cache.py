@@ -0,0 +1,54 @@
+import time
+import numpy as np
+import h5py
+from ecogvis.functions.block_cache import ChunkCache, CachedDataset, Prefetcher
+
+
+def test_cached_dataset(tmp_path):
+    X = np.random.RandomState(0).randn(5000, 10).astype('float32')
+    with h5py.File(str(tmp_path / 'source.h5'), 'w') as f:
+        data = f.create_dataset('data', data=X, chunks=(512, 4), compression='gzip')
+        cache = ChunkCache()
+        cached = CachedDataset(data, cache)
+
+        np.testing.assert_equal(cached[100:1300, 2:9], X[100:1300, 2:9])
+        assert cache.misses == 3 * 3 and cache.hits == 0
+        # Last column of chunks is only 2 channels wide
+        assert cached.last_read_bytes == 3 * 512 * (4 + 4 + 2) * 4
+
+        # Overlapping window is served from the cache
+        np.testing.assert_equal(cached[600:1000, [3, 5, 8]], X[600:1000][:, [3, 5, 8]])
+        assert cache.hits == 3
+        assert cached.last_read_bytes == 0
+        np.testing.assert_equal(cached[4999], X[4999])
+        np.testing.assert_equal(cached[-10:, 9], X[-10:, 9])
+
+
+def test_chunk_cache_eviction():
+    cache = ChunkCache(max_bytes=3 * 800)
+    for ii in range(5):
+        cache.put(('f', ii), np.zeros(100))
+    assert cache.nbytes == 3 * 800
+    assert ('f', 0) not in cache and ('f', 4) in cache
+    # Recently used chunks are kept
+    cache.get(('f', 2))
+    cache.put(('f', 5), np.zeros(100))
+    assert ('f', 2) in cache and ('f', 3) not in cache
+
+
+def test_prefetcher():
+    X = np.arange(20000, dtype='float64').reshape(-1, 2)
+    cache = ChunkCache()
+    cached = CachedDataset(X, cache, block_rows=1000)
+    prefetcher = Prefetcher()
+    prefetcher.request(cached, 2000, 5000, 0, 2)
+    for _ in range(100):
+        if (cached.key, (4, 0)) in cache:
+            break
+        time.sleep(0.01)
+    prefetcher.stop()
+    assert all((cached.key, (ti, 0)) in cache for ti in range(2, 5))
+    # Prefetching does not count as cache misses
+    assert cache.misses == 0
+    np.testing.assert_equal(cached[2500:4500], X[2500:4500])
+    assert cache.hits == 3
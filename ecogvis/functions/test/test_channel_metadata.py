@@ -0,0 +1,45 @@
+from datetime import datetime
+from dateutil.tz import tzlocal
+import pynwb
+import numpy as np
+from numpy.testing import assert_array_equal
+from ecogvis.functions.channel_metadata import ChannelMetadata
+
+
+def create_electrical_series():
+    nwbfile = pynwb.NWBFile('description', 'id', datetime.now(tzlocal()))
+    device = nwbfile.create_device(name='device')
+    electrode_group = nwbfile.create_electrode_group(name='electrode_group0',
+                                                     description="an electrode group",
+                                                     location="somewhere",
+                                                     device=device)
+    locations = ['STG', 'MTG', 'STG', 'precentral', 'MTG', 'STG']
+    for idx, location in enumerate(locations):
+        nwbfile.add_electrode(id=10 + idx, x=1.0, y=2.0, z=3.0, imp=float(-idx),
+                              location=location, filtering='none', group=electrode_group)
+    # Series on a subset of the electrodes
+    region = nwbfile.create_electrode_table_region([1, 2, 4, 5], 'electrodes_table_region')
+    series = pynwb.ecephys.ElectricalSeries(name='raw_data', data=np.zeros((10, 4)),
+                                            electrodes=region, rate=100.)
+    nwbfile.add_acquisition(series)
+    return nwbfile, series
+
+
+def test_channel_metadata():
+    nwbfile, series = create_electrical_series()
+    meta = ChannelMetadata(series)
+    assert_array_equal(meta.ids, [11, 12, 14, 15])
+    assert_array_equal(meta.labels, ['11', '12', '14', '15'])
+    assert_array_equal(meta.regions, ['MTG', 'STG'])
+    assert_array_equal(meta.locations, ['MTG', 'STG', 'MTG', 'STG'])
+    assert_array_equal(meta.in_regions(['STG']), [False, True, False, True])
+    assert not meta.bad.any()
+
+    meta.set_bad([12, 15, 3])
+    meta.set_bad([15], bad=False)
+    assert_array_equal(meta.bad_ids, [12])
+    meta.write_bad()
+    assert_array_equal(nwbfile.electrodes['bad'][:], [False, False, True, False, False, False])
+
+    # Bad channels are read back from the electrodes table
+    assert_array_equal(ChannelMetadata(series).bad, [False, True, False, False])
@@ -0,0 +1,140 @@
+import numpy as np
+import h5py
+from ecogvis.functions.decimation_pyramid import (DecimationPyramid, minmax_decimate,
+                                                  interleave_envelope)
+
+
+def test_minmax_decimate():
+    X = np.arange(10, dtype='float32').reshape(-1, 1)
+    mins, maxs, sums, counts = minmax_decimate(X, 4)
+    np.testing.assert_equal(mins[:, 0], [0, 4, 8])
+    np.testing.assert_equal(maxs[:, 0], [3, 7, 9])
+    np.testing.assert_equal(sums[:, 0], [6, 22, 17])
+    np.testing.assert_equal(counts, [4, 4, 2])
+
+    x, y = interleave_envelope(mins, maxs, np.array([0, 4, 8]), 4)
+    np.testing.assert_equal(x, [2, 2, 6, 6, 10, 10])
+    np.testing.assert_equal(y[:, 0], [0, 3, 4, 7, 8, 9])
+
+
+def test_decimation_pyramid(tmp_path):
+    rng = np.random.RandomState(1)
+    X = rng.randn(20011, 3).astype('float32')
+    X[12345, 1] = 50.   # single sample spike
+
+    with h5py.File(str(tmp_path / 'source.h5'), 'w') as f, \
+            h5py.File(str(tmp_path / 'cache.h5'), 'w') as cache:
+        data = f.create_dataset('data', data=X, chunks=(500, 3))
+        pyramid = DecimationPyramid(cache, data.name, data, min_bins=64)
+        assert pyramid.factors == [16, 64, 256]
+        assert not pyramid.ready
+        # Small blocks, so that levels are built across several blocks
+        pyramid._block_length = lambda: 1536
+        assert pyramid.build()
+
+        for factor in pyramid.factors:
+            level = cache[pyramid.key]['level_' + str(factor)]
+            mins, maxs, sums, counts = minmax_decimate(X, factor)
+            np.testing.assert_equal(level['min'][:], mins)
+            np.testing.assert_equal(level['max'][:], maxs)
+            np.testing.assert_almost_equal(level['mean'][:], sums / counts[:, None], decimal=5)
+
+        # Cached pyramid is reused
+        pyramid = DecimationPyramid(cache, data.name, data, min_bins=64)
+        assert pyramid.ready
+
+        # Short windows are drawn from raw samples
+        assert pyramid.envelope(0, 1000, np.array([0, 1]), max_bins=100) is None
+        # unless forced, e.g. for previews
+        factor, _, mins, _, _ = pyramid.envelope(0, 1000, np.array([0, 1]), max_bins=25,
+                                                 force=True)
+        assert factor == 64 and mins.shape == (16, 2)
+        # The spike survives decimation
+        factor, bin_starts, mins, maxs, means = pyramid.envelope(
+            0, 20011, np.array([1, 2]), max_bins=100)
+        assert factor == 256
+        assert mins.shape == (79, 2)
+        assert maxs[:, 0].max() == 50.
+
+
+def test_decimation_pyramid_1d(tmp_path):
+    rng = np.random.RandomState(2)
+    x = rng.randn(50000).astype('float32')
+    with h5py.File(str(tmp_path / 'cache.h5'), 'w') as cache:
+        pyramid = DecimationPyramid(cache, 'stimulus/speaker1', x)
+        assert pyramid.build()
+        assert pyramid.data_range() == (x.min(), x.max())
+        factor, bin_starts, mins, maxs, _ = pyramid.envelope(0, 50000, [0], max_bins=1000)
+        assert factor == 64
+        np.testing.assert_equal(mins[:, 0], np.minimum.reduceat(x, bin_starts))
+
+
+def test_pyramid_stats(tmp_path):
+    rng = np.random.RandomState(3)
+    X = (5 + 3 * rng.randn(20000, 4)).astype('float32')
+    with h5py.File(str(tmp_path / 'source.h5'), 'w') as f, \
+            h5py.File(str(tmp_path / 'cache.h5'), 'w') as cache:
+        data = f.create_dataset('data', data=X, chunks=(1024, 4))
+        pyramid = DecimationPyramid(cache, data.name, data, min_bins=64)
+        assert pyramid.stats([0]) is None
+        pyramid._block_length = lambda: 3072
+        assert pyramid.build()
+        assert pyramid.stats_length == 1024
+
+        stats = pyramid.stats(np.array([1, 3]))
+        np.testing.assert_allclose(stats['mean'], X[:, [1, 3]].mean(axis=0), rtol=1e-6)
+        np.testing.assert_allclose(stats['std'], X[:, [1, 3]].std(axis=0), rtol=1e-6)
+        np.testing.assert_equal(stats['max'], X[:, [1, 3]].max(axis=0))
+        # Windows are rounded out to whole chunks
+        stats = pyramid.stats(np.array([2]), 2500, 4100)
+        np.testing.assert_allclose(stats['std'], X[2048:5120, [2]].std(axis=0), rtol=1e-6)
+        assert stats['count'][0] == 3072
+
+
+class RecordedReads:
+    """Dataset wrapper that records the bytes of every read."""
+    def __init__(self, data):
+        self.data = data
+        self.shape, self.dtype, self.chunks = data.shape, data.dtype, data.chunks
+        self.reads = []
+
+    def __getitem__(self, selection):
+        out = self.data[selection]
+        self.reads.append(out.nbytes)
+        return out
+
+
+def test_pyramid_blocks_within_target_bytes(tmp_path):
+    rng = np.random.RandomState(4)
+    X = rng.randn(20011, 3).astype('float32')
+    with h5py.File(str(tmp_path / 'source.h5'), 'w') as f, \
+            h5py.File(str(tmp_path / 'cache.h5'), 'w') as cache:
+        # Chunks that do not align with the coarsest bin (256) within the
+        # target size, lcm(256, 1001) is larger than the recording. Blocks may
+        # also be shorter than the coarsest bin
+        source = f.create_dataset('data', data=X, chunks=(1001, 3))
+        for target_bytes, block_len in [(5 * 256 * 3 * 4, 1280), (100 * 3 * 4, 96)]:
+            data = RecordedReads(source)
+            pyramid = DecimationPyramid(cache, 'data', data, min_bins=64)
+            assert pyramid._block_length(target_bytes) == block_len
+            pyramid._block_length = lambda: DecimationPyramid._block_length(
+                pyramid, target_bytes)
+            data.reads = []     # only the reads of the build
+            assert pyramid.build()
+            assert max(data.reads) <= target_bytes
+
+            for factor in pyramid.factors:
+                level = cache[pyramid.key]['level_' + str(factor)]
+                mins, maxs, sums, counts = minmax_decimate(X, factor)
+                np.testing.assert_equal(level['min'][:], mins)
+                np.testing.assert_equal(level['max'][:], maxs)
+                np.testing.assert_almost_equal(level['mean'][:], sums / counts[:, None],
+                                               decimal=5)
+        # Records of whole chunks, accumulated across blocks
+        assert pyramid.stats_length == 1001
+        stats = pyramid.stats(np.array([0, 2]))
+        np.testing.assert_allclose(stats['std'], X[:, [0, 2]].std(axis=0), rtol=1e-6)
+        stats = pyramid.stats(np.array([1]), 2500, 4100)
+        np.testing.assert_allclose(stats['mean'], X[2002:5005, [1]].mean(axis=0), rtol=1e-6)
+        np.testing.assert_equal(stats['min'], X[2002:5005, [1]].min(axis=0))
+        assert stats['count'][0] == 3003
@@ -0,0 +1,25 @@
+import json
+import time
+from ecogvis.functions.frame_timing import FrameTimer, format_frame
+
+
+def test_frame_timer(tmp_path):
+    log_path = tmp_path / 'frames.jsonl'
+    timer = FrameTimer(log_path=log_path)
+    for ii in range(3):
+        timer.start_frame(['signals', 'timeline'])
+        with timer.section('io'):
+            time.sleep(0.01)
+        with timer.section('render'):
+            pass
+        timer.annotate(bytes_read=100 * ii)
+        frame = timer.end_frame()
+    timer.close()
+
+    assert frame['io_ms'] >= 10 and frame['total_ms'] >= frame['io_ms']
+    assert frame['compute_ms'] == 0
+    assert format_frame(frame).startswith('signals, timeline: ')
+    summary = timer.summary()
+    assert summary['frames'] == 3 and summary['io_p50'] >= 10
+    lines = [json.loads(l) for l in open(str(log_path))]
+    assert [l['bytes_read'] for l in lines] == [0, 100, 200]
@@ -0,0 +1,45 @@
+import pynwb
+import numpy as np
+from numpy.testing import assert_array_equal
+from ecogvis.functions.handle_pool import HandlePool
+from ecogvis.functions.test.test_channel_metadata import create_electrical_series
+
+
+def write_blocks(tmp_path, n_blocks):
+    paths = []
+    for block in range(1, n_blocks + 1):
+        nwbfile, series = create_electrical_series()
+        path = str(tmp_path / 'EC1_B{}.nwb'.format(block))
+        with pynwb.NWBHDF5IO(path, 'w') as io:
+            io.write(nwbfile)
+        paths.append(path)
+    return paths
+
+
+def test_handle_pool(tmp_path):
+    paths = write_blocks(tmp_path, 4)
+    pool = HandlePool(max_handles=2, window=0.05)
+    pool.prewarm(paths[:2])
+    assert paths[0] in pool and paths[1] in pool
+
+    pooled = pool.acquire(paths[0])
+    assert (pool.hits, pool.misses) == (1, 0)
+    assert paths[0] not in pool
+    assert_array_equal(pooled.nwb.acquisition['raw_data'].data[:], np.zeros((10, 4)))
+    # The first window (0.05 s at 100 Hz) was read while warming up
+    assert pooled.chunk_cache.entries > 0
+
+    # Files given back go to the pool, the least recently used are closed
+    pool.release(paths[0], pooled.io, pooled.nwb)
+    pool.prewarm(paths[2:3])
+    assert paths[1] not in pool
+    assert paths[0] in pool and paths[2] in pool
+
+    other = pool.acquire(paths[3])
+    assert (pool.hits, pool.misses) == (1, 1)
+    other.close()
+
+    # Closed files can be opened for writing
+    pool.close()
+    with pynwb.NWBHDF5IO(paths[0], 'r+') as io:
+        io.read()
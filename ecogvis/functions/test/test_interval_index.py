@@ -0,0 +1,29 @@
+import numpy as np
+from ecogvis.functions.interval_index import IntervalIndex
+
+
+def test_interval_index():
+    ivs = IntervalIndex()
+    assert len(ivs.overlapping(0., 10.)) == 0
+    ivs.extend([5., 0., 20.], [6., 15., 21.], 'invalid', 'red', '')
+    assert ivs.add(8., 9., 'speaker', 'blue', 's') == 3
+    np.testing.assert_array_equal(ivs.start, [0., 5., 8., 20.])
+    np.testing.assert_array_equal(ivs.max_stop, [15., 15., 15., 21.])
+    np.testing.assert_array_equal(ivs.color, ['red', 'red', 'blue', 'red'])
+
+    # Same result as testing every interval
+    rng = np.random.RandomState(0)
+    for x0, x1 in np.sort(rng.uniform(-1, 25, (50, 2)), axis=1):
+        expected = np.flatnonzero((ivs.start <= x1) & (ivs.stop >= x0))
+        np.testing.assert_array_equal(ivs.overlapping(x0, x1), expected)
+
+    # Overlapping intervals are merged, at the resolution of the bins
+    starts, stops = ivs.merged(0., 25., 25)
+    np.testing.assert_array_equal(starts, [0., 20.])
+    np.testing.assert_array_equal(stops, [15., 21.])
+
+    version = ivs.version
+    ivs.delete(ivs.overlapping(5.5, 5.5))
+    assert ivs.version > version
+    np.testing.assert_array_equal(ivs.ids, [3, 2])
+    np.testing.assert_array_equal(ivs.max_stop, [9., 21.])
@@ -0,0 +1,47 @@
+import gc
+import numpy as np
+from ecogvis.functions.memory_budget import MemoryBudget
+
+
+def test_budget_shared_by_caches():
+    budget = MemoryBudget(max_bytes=4000)
+    file1 = budget.cache('EC1_B1.nwb')
+    file2 = budget.cache('EC1_B2.nwb')
+    for ii in range(3):
+        file1.put(ii, np.zeros(100))      # 800 bytes each
+    file2.put(0, np.zeros(100))
+    file2.put(1, np.zeros(100))
+    assert budget.nbytes == 4000
+
+    # Least recently used entries go first, whatever their cache
+    assert file1.get(0) is not None
+    file2.put(2, np.zeros(100))
+    assert 1 not in file1 and 0 in file1
+    assert budget.nbytes == file1.nbytes + file2.nbytes == 4000
+    assert (file1.hits, file1.misses) == (1, 0)
+    assert budget.evictions == 1
+
+    summary = budget.summary()
+    assert [row['name'] for row in summary] == ['EC1_B1.nwb', 'EC1_B2.nwb']
+    assert summary[0]['entries'] == 2 and summary[1]['entries'] == 3
+
+    # Entries of caches no longer used leave the budget
+    del file1
+    gc.collect()
+    assert budget.nbytes == file2.nbytes == 2400
+    assert len(budget.caches()) == 1
+
+    budget.set_max_bytes(0)
+    assert budget.nbytes == 800     # the last entry is always kept
+
+
+def test_budget_large_entries_first():
+    budget = MemoryBudget(max_bytes=3200)
+    cache = budget.cache('ERP')
+    cache.put('small1', np.zeros(100))
+    cache.put('large', np.zeros(200))
+    cache.put('small2', np.zeros(100))
+    cache.put('small3', np.zeros(100))
+    assert 'large' not in cache
+    assert 'small1' in cache and 'small3' in cache
+    assert budget.nbytes == 2400
@@ -0,0 +1,24 @@
+from PyQt5.QtWidgets import QApplication
+from ecogvis.functions.redraw_scheduler import RedrawScheduler
+
+
+def test_redraw_scheduler():
+    app = QApplication.instance() or QApplication([])
+    drawn = []
+    scheduler = RedrawScheduler(drawn.append, min_interval=0.)
+    scheduler.request(['signals'])
+    scheduler.request(['signals', 'timeline'])
+    scheduler.request(['stimulus'])
+    assert drawn == []
+    app.processEvents()
+    assert drawn == [{'signals', 'timeline', 'stimulus'}]
+    assert (scheduler.requests, scheduler.drawn, scheduler.skipped) == (3, 1, 2)
+
+    # A flush draws right away, a cancelled request is never drawn
+    scheduler.request(['signals'])
+    scheduler.flush()
+    assert drawn[-1] == {'signals'}
+    scheduler.request(['timeline'])
+    scheduler.cancel()
+    app.processEvents()
+    assert len(drawn) == 2 and scheduler.drawn == 2
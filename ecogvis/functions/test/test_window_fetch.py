@@ -0,0 +1,24 @@
+import numpy as np
+import h5py
+from ecogvis.functions.window_fetch import WindowFetcher
+
+
+def test_window_fetch(tmp_path):
+    X = np.arange(1000 * 8, dtype='float32').reshape(1000, 8)
+    with h5py.File(str(tmp_path / 'source.h5'), 'w') as f:
+        data = f.create_dataset('data', data=X, chunks=(64, 4), compression='gzip')
+        # Pieces of two chunk rows
+        fetcher = WindowFetcher(data, piece_bytes=2 * 64 * 8 * 4)
+        assert fetcher.pieces(100, 300, 8) == [(100, 128), (128, 256), (256, 300)]
+
+        channels = np.array([1, 2, 5])
+        out = fetcher.fetch(100, 300, channels)
+        np.testing.assert_equal(out, X[100:300, channels])
+        # Rows 64 to 319, channels 0 to 7
+        assert fetcher.last_frame['chunks'] == 4 * 2
+        assert fetcher.last_frame['bytes_read'] == 200 * 5 * 4
+        assert fetcher.last_frame['bytes_decompressed'] == 8 * 64 * 4 * 4
+
+        out = fetcher.fetch(0, 1000, np.arange(8))
+        np.testing.assert_equal(out, X)
+        assert fetcher.totals['frames'] == 2
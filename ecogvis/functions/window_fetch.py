@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class WindowFetcher:
+    """
+    Reads time windows of a (nSamples, nChannels) dataset for the signals
+    panel.
+
+    Every window is read once, as the bounding time x channel hyperslab, in
+    pieces aligned to the dataset chunks. Channel selection is then done in
+    memory, so gzip compressed chunks are decompressed only once per frame.
+
+    Parameters
+    ----------
+    data : h5py.Dataset, CachedDataset or ndarray
+        Source data (nSamples, nChannels). For a CachedDataset, only the
+        chunks missing from the cache count as decompressed.
+    piece_bytes : int
+        Approximate size of each piece read from the dataset.
+    verbose : bool
+        If True, prints bytes read and decompressed for every frame.
+    """
+    def __init__(self, data, piece_bytes=8e6, verbose=False):
+        self.data = data
+        self.chunks = getattr(data, 'chunks', None)
+        self.itemsize = np.dtype(data.dtype).itemsize
+        self.piece_bytes = piece_bytes
+        self.verbose = verbose
+        self.last_frame = {}
+        self.totals = {'frames': 0, 'bytes_read': 0, 'bytes_decompressed': 0}
+
+    def pieces(self, start, stop, nColumns):
+        """Splits [start, stop) in sample ranges aligned to the chunk rows."""
+        rows = self.chunks[0] if self.chunks is not None else 1
+        n_rows = max(int(self.piece_bytes // (rows * nColumns * self.itemsize)), 1) * rows
+        first = (start // n_rows) * n_rows
+        bounds = np.arange(first + n_rows, stop, n_rows)
+        bounds = np.concatenate(([start], bounds, [stop]))
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def chunks_touched(self, start, stop, c0, c1):
+        """Number of chunks that must be decompressed to read a hyperslab."""
+        if self.chunks is None:
+            return 0
+        n_time = (stop - 1) // self.chunks[0] - start // self.chunks[0] + 1
+        n_chan = (c1 - 1) // self.chunks[1] - c0 // self.chunks[1] + 1
+        return n_time * n_chan
+
+    def fetch(self, start, stop, channels):
+        """
+        Reads samples [start, stop) of the chosen channels.
+
+        Parameters
+        ----------
+        start, stop : int
+            Sample range.
+        channels : ndarray of int
+            0-based channel indices.
+
+        Returns
+        -------
+        ndarray (stop - start, len(channels))
+        """
+        channels = np.asarray(channels)
+        c0, c1 = int(channels.min()), int(channels.max()) + 1
+        block = np.empty((stop - start, c1 - c0), dtype=self.data.dtype)
+        cached = hasattr(self.data, 'last_read_bytes')
+        decompressed = 0
+        for a, b in self.pieces(start, stop, c1 - c0):
+            block[a - start:b - start] = self.data[a:b, c0:c1]
+            if cached:
+                decompressed += self.data.last_read_bytes
+
+        # Frame I/O statistics
+        n_chunks = self.chunks_touched(start, stop, c0, c1)
+        if self.chunks is not None and not cached:
+            decompressed = n_chunks * int(np.prod(self.chunks)) * self.itemsize
+        self.last_frame = {'bytes_read': block.nbytes,
+                           'bytes_decompressed': decompressed,
+                           'chunks': n_chunks}
+        self.totals['frames'] += 1
+        self.totals['bytes_read'] += block.nbytes
+        self.totals['bytes_decompressed'] += decompressed
+        if self.verbose:
+            print('Frame I/O: read {:.1f} kB, decompressed {:.1f} kB ({} chunks)'.format(
+                block.nbytes / 1e3, decompressed / 1e3, n_chunks))
+
+        if np.array_equal(channels, np.arange(c0, c1)):
+            return block
+        return block[:, channels - c0]
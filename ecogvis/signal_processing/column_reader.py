@@ -0,0 +1,120 @@
+import numpy as np
+
+
+class ColumnBatchReader:
+    """
+    Reads the channels (columns) of a (nSamples, nChannels) dataset in
+    batches aligned to its HDF5 chunks, for loops that process one channel at
+    a time.
+
+    Reading `data[:, ch]` from a chunked dataset decompresses every chunk the
+    column crosses, i.e. all the channels of the chunk, once per channel.
+    Batches cover whole chunk columns, so every chunk is decompressed once,
+    and as many of them as fit in `max_bytes`. When a chunk column is larger
+    than `max_bytes`, it is split in batches that decompress its chunks once
+    each. Contiguous datasets and arrays are read in batches of channels
+    within `max_bytes`.
+
+    Parameters
+    ----------
+    data : h5py.Dataset or ndarray (nSamples, nChannels)
+        Signals.
+    max_bytes : float
+        Maximum size of a batch, at least one channel is read at a time.
+
+    Attributes
+    ----------
+    bytes_read : int
+        Bytes decompressed so far.
+    bytes_per_channel : int
+        Bytes a loop reading one channel at a time would have decompressed
+        for the same channels.
+
+    Examples
+    --------
+    >>> reader = ColumnBatchReader(lfp.data)
+    >>> for channels, X in reader:       # X (nSamples, len(channels))
+    >>>     ...
+    >>> for ch, Xch in reader.channels():
+    >>>     ...
+    >>> print(reader.report())
+    """
+    def __init__(self, data, max_bytes=512e6):
+        self.data = data
+        self.nSamples, self.nChannels = data.shape
+        self.itemsize = np.dtype(data.dtype).itemsize
+        chunks = getattr(data, 'chunks', None)
+        self.chunked = chunks is not None
+        self.chunks = tuple(chunks) if self.chunked else None
+
+        # Channels per batch: whole chunk columns that fit in max_bytes. If a
+        # chunk column does not fit (or the data is not chunked), as many
+        # channels as fit, each batch then decompresses the chunks it crosses
+        col_bytes = self.nSamples * self.itemsize
+        chunk_cols = self.chunks[1] if self.chunked else 1
+        n_chunk_cols = int(max_bytes // (col_bytes * chunk_cols))
+        if n_chunk_cols > 0:
+            self.batch_size = n_chunk_cols * chunk_cols
+        else:
+            self.batch_size = max(int(max_bytes // col_bytes), 1)
+        self.batch_size = min(self.batch_size, self.nChannels)
+        # Columns read at a time: the part of a chunk column in the batch, or
+        # the whole batch if not chunked
+        self.read_cols = min(chunk_cols, self.batch_size) if self.chunked else self.batch_size
+        # Rows read at a time, of about 32 MB (whole chunks if chunked)
+        if self.chunked:
+            chunk_rows = self.chunks[0]
+            n_chunk_rows = max(int(32e6 // (chunk_rows * self.read_cols * self.itemsize)), 1)
+            self.block_rows = n_chunk_rows * chunk_rows
+        else:
+            self.block_rows = max(int(32e6 // (self.read_cols * self.itemsize)), 1)
+        self.bytes_read = 0
+        self.bytes_per_channel = 0
+
+    def __len__(self):
+        return int(np.ceil(self.nChannels / self.batch_size))
+
+    def __iter__(self):
+        for c0 in range(0, self.nChannels, self.batch_size):
+            c1 = min(c0 + self.batch_size, self.nChannels)
+            # Blocks of whole chunks, into a buffer where every channel is
+            # contiguous
+            X = np.empty((self.nSamples, c1 - c0), dtype=self.data.dtype, order='F')
+            step = self.chunks[1] if self.chunked else self.read_cols
+            a = c0
+            while a < c1:
+                b = min(a - a % step + step, c1)
+                for t0 in range(0, self.nSamples, self.block_rows):
+                    t1 = min(t0 + self.block_rows, self.nSamples)
+                    X[t0:t1, a - c0:b - c0] = self.data[t0:t1, a:b]
+                a = b
+            self.bytes_read += self._chunk_bytes(c0, c1)
+            self.bytes_per_channel += sum(self._chunk_bytes(ch, ch + 1) for ch in range(c0, c1))
+            yield range(c0, c1), X
+
+    def channels(self):
+        """Yields every channel index and its signal (nSamples,), one at a time."""
+        for channels, X in self:
+            for ii, ch in enumerate(channels):
+                yield ch, X[:, ii]
+
+    def _chunk_bytes(self, c0, c1):
+        """Bytes of the chunks crossed by columns [c0, c1)."""
+        if not self.chunked:
+            return (c1 - c0) * self.nSamples * self.itemsize
+        rows, cols = self.chunks
+        n_rows = int(np.ceil(self.nSamples / rows))
+        n_cols = int(np.ceil(c1 / cols)) - c0 // cols
+        return n_rows * n_cols * rows * cols * self.itemsize
+
+    @property
+    def amplification_avoided(self):
+        """Ratio of the bytes a per channel loop would have decompressed to the bytes read."""
+        return self.bytes_per_channel / max(self.bytes_read, 1)
+
+    def report(self):
+        layout = 'chunks {}'.format(self.chunks) if self.chunked else 'contiguous'
+        return ('Read {:.1f} MB in {} batches of {} channels ({}), instead of '
+                '{:.1f} MB one channel at a time: {:.1f}x less read amplification'.format(
+                    self.bytes_read / 1e6, len(self), self.batch_size, layout,
+                    self.bytes_per_channel / 1e6, self.amplification_avoided))
@@ -1,30 +1,84 @@
 from __future__ import division
+import warnings
+
 import numpy as np
 
 
-__all__ = ['subtract_CAR',
+__all__ = ['COMMON_REFERENCES',
+           'subtract_CAR',
+           'subtract_block_reference',
            'subtract_common_median_reference']
 
-def subtract_CAR(X, b_size=16):
+# Referencing schemes of preprocess_raw_data, by method of subtract_block_reference
+COMMON_REFERENCES = {'CAR': 'mean', 'CMR': 'median'}
+
+def subtract_CAR(X, b_size=16, inplace=False):
     """
     Compute and subtract common average reference in 16 channel blocks.
+
+    If `inplace` is True, X is overwritten instead of copied.
     """
+    if not inplace:
+        X = X.copy()
+    return subtract_block_reference(X, b_size=b_size, method='mean')
 
+
+def subtract_block_reference(X, b_size=16, method='mean', chunk_size=4096):
+    """
+    Subtract, in place, the common average or median reference of blocks of
+    `b_size` channels (the last block has the remaining channels).
+
+    The reference is computed and subtracted `chunk_size` time points at a
+    time, so the only temporary arrays are of one block chunk. Bad channels
+    set to NaN are left out of the reference (and stay NaN).
+
+    Parameters
+    ----------
+    X : ndarray (n_channels, n_time)
+        Data to re-reference, overwritten.
+    b_size : int
+        Channels per block.
+    method : str
+        'mean' (CAR) or 'median' (CMR).
+    chunk_size : int
+        Time points per chunk.
+
+    Returns
+    -------
+    X : ndarray (n_channels, n_time)
+        The re-referenced input.
+    """
+    if method not in ('mean', 'median'):
+        raise ValueError("method must be 'mean' or 'median', not {}".format(method))
     channels, time_points = X.shape
-    s = channels // b_size
-    r = channels % b_size
-
-    X_1 = X[:channels-r].copy()
-
-    X_1 = X_1.reshape((s, b_size, time_points))
-    X_1 -= np.nanmean(X_1, axis=1, keepdims=True)
-    if r > 0:
-        X_2 = X[channels-r:].copy()
-        X_2 -= np.nanmean(X_2, axis=0, keepdims=True)
-        X = np.vstack([X_1.reshape((s*b_size, time_points)), X_2])
-        return X
-    else:
-        return X_1.reshape((s*b_size, time_points))
+    for c0 in range(0, channels, b_size):
+        block = X[c0:c0 + b_size]
+        for t0 in range(0, time_points, chunk_size):
+            chunk = block[:, t0:t0 + chunk_size]
+            chunk -= _reference(chunk, method)
+    return X
+
+
+def _reference(X, method):
+    """
+    Mean or median over the channels of X (n_channels, n_time), ignoring NaN
+    like np.nanmean and np.nanmedian.
+    """
+    reduce, nanreduce = (np.mean, np.nanmean) if method == 'mean' else (np.median, np.nanmedian)
+    ref = reduce(X, axis=0)
+    if not np.isnan(ref).any():
+        return ref
+    # Bad channels, NaN at all times, are left out with plain reductions,
+    # other NaN need the slower nan-aware ones
+    good = ~np.isnan(X).all(axis=1)
+    if not good.any():
+        return ref
+    ref = reduce(X[good], axis=0)
+    if not np.isnan(ref).any():
+        return ref
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)   # all-NaN time points
+        return nanreduce(X, axis=0)
 
 
 def subtract_common_median_reference(X, channel_axis=-2):
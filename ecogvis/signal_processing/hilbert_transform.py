@@ -1,6 +1,7 @@
 from __future__ import division
 from process_nwb.wavelet_transform import gaussian,hamming
 import numpy as np
+from scipy import fft as sp_fft
 
 from process_nwb.fft import fftfreq, fft, ifft
 try:
@@ -24,7 +25,8 @@ def hilbert_transform(X, rate, filters=None, phase=None, X_fft_h=None):
     Parameters
     ----------
     X : ndarray (n_channels, n_time)
-        Input data, dimensions
+        Input data, dimensions. float32 data is transformed in single
+        precision (complex64), other data in double precision (complex128).
     rate : float
         Number of samples per second.
     filters : filter or list of filters (optional)
@@ -40,22 +42,28 @@ def hilbert_transform(X, rate, filters=None, phase=None, X_fft_h=None):
     time = X.shape[-1]
     freq = fftfreq(time, 1. / rate)
 
-    Xh = np.zeros((len(filters),) + X.shape, dtype=np.complex)
+    # scipy.fft keeps single precision, numpy.fft always uses double
+    if X.dtype in (np.float32, np.complex64):
+        real, complex_, fft_, ifft_ = np.float32, np.complex64, sp_fft.fft, sp_fft.ifft
+    else:
+        real, complex_, fft_, ifft_ = np.float64, np.complex128, fft, ifft
+
+    Xh = np.zeros((len(filters),) + X.shape, dtype=complex_)
     if X_fft_h is None:
         # Heavyside filter
-        h = np.zeros(len(freq))
+        h = np.zeros(len(freq), dtype=real)
         h[freq > 0] = 2.
         h[0] = 1.
         h = h[np.newaxis, :]
-        X_fft_h = fft(X) * h
+        X_fft_h = fft_(X) * h
         if phase is not None:
             X_fft_h *= phase
     for ii, f in enumerate(filters):
         if f is None:
-            Xh[ii] = ifft(X_fft_h)
+            Xh[ii] = ifft_(X_fft_h)
         else:
-            f = f / np.linalg.norm(f)
-            Xh[ii] = ifft(X_fft_h * f)
+            f = (f / np.linalg.norm(f)).astype(real)
+            Xh[ii] = ifft_(X_fft_h * f)
     if Xh.shape[0] == 1:
         return Xh[0], X_fft_h
 
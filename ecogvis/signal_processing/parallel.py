@@ -0,0 +1,35 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def map_channels(func, channels, n_workers=1):
+    """
+    Calls `func` for every item of `channels`, e.g. channel indices, from a
+    pool of `n_workers` threads.
+
+    NumPy releases the GIL in its FFTs and in array arithmetic, so per channel
+    resampling and filtering run on several cores. Every item is processed by
+    the same code as in a serial loop, so results do not depend on
+    `n_workers`.
+
+    Parameters
+    ----------
+    func : callable
+        Function of one item.
+    channels : iterable
+        Items, e.g. range(nChannels).
+    n_workers : int, optional
+        Number of threads. None uses all the CPUs, 1 runs a serial loop.
+
+    Returns
+    -------
+    List of the results of `func`, in the order of `channels`.
+    """
+    channels = list(channels)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(channels))
+    if n_workers <= 1:
+        return [func(ch) for ch in channels]
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(func, channels))
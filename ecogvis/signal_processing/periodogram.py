@@ -3,6 +3,7 @@ from scipy import signal as sgn
 from pynwb import NWBHDF5IO, ProcessingModule
 from pynwb.ecephys import ElectricalSeries
 from ndx_spectrum import Spectrum
+from ecogvis.signal_processing.column_reader import ColumnBatchReader
 
 
 def psd_estimate(src_file, type):
@@ -39,8 +40,8 @@ def psd_estimate(src_file, type):
         # FFT - using a power of 2 number of samples improves performance
         nfft = int(2**(np.floor(np.log2(nSamples)).astype('int')))
         fx_lim = 200.
-        for ch in np.arange(nChannels):  # Iterate over channels
-            trace = data_obj.data[:, ch]
+        reader = ColumnBatchReader(data_obj.data)
+        for ch, trace in reader.channels():  # Iterate over channels
             fx_w, py_w = sgn.welch(trace, fs=fs, nperseg=win_len_welch)
             fx_f, py_f = sgn.periodogram(trace, fs=fs, nfft=nfft)
             # saves PSD up to 200 Hz
@@ -54,6 +55,7 @@ def psd_estimate(src_file, type):
             else:
                 PY_welch = np.append(PY_welch, py_w.reshape(-1, 1), axis=1)
                 PY_fft = np.append(PY_fft, py_f.reshape(-1, 1), axis=1)
+        print(reader.report())
 
         # vElectrodes
         elecs_region = nwb.electrodes.create_region(name='electrodes',
@@ -4,32 +4,46 @@ import time
 import os
 import numpy as np
 import warnings
+from scipy import sparse
 
 from pynwb import NWBHDF5IO, ProcessingModule
 from pynwb.ecephys import LFP, ElectricalSeries
 from pynwb.core import DynamicTable, VectorData
 from pynwb.misc import DecompositionSeries
+from hdmf.common import DynamicTableRegion
+from ndx_bipolar_scheme import BipolarSchemeTable, EcephysExt
 
 from ecogvis.signal_processing.hilbert_transform import hilbert_transform
 from process_nwb.wavelet_transform import gaussian
 from process_nwb.resample import resample
 from process_nwb.linenoise_notch import apply_linenoise_notch
-from ecogvis.signal_processing.common_referencing import subtract_CAR
+from ecogvis.signal_processing.common_referencing import (
+    COMMON_REFERENCES, subtract_block_reference)
+from ecogvis.signal_processing.streaming import PreprocessedChunks
+from ecogvis.signal_processing.parallel import map_channels
+from ecogvis.signal_processing.referencing import (
+    apply_reference, bipolar_scheme_matrix, laplacian_matrix)
+from ecogvis.signal_processing.column_reader import ColumnBatchReader
+from ecogvis.signal_processing.storage import output_data_io
 from ecogvis.functions.nwb_copy_file import nwb_copy_file
 
 
-def processing_data(path, subject, blocks, mode=None, config=None, new_file=''):
+def processing_data(path, subject, blocks, mode=None, config=None, new_file='',
+                    storage=None, precision='float64'):
     for block in blocks:
         block_path = os.path.join(path, '{}_B{}.nwb'.format(subject, block))
         if new_file != '':
             make_new_nwb(old_file=block_path, new_file=new_file)
 
         if mode == 'preprocess':
-            preprocess_raw_data(block_path, config=config)
+            preprocess_raw_data(block_path, config=config, storage=storage,
+                                precision=precision)
         elif mode == 'decomposition':
-            spectral_decomposition(block_path, bands_vals=config)
+            spectral_decomposition(block_path, bands_vals=config, storage=storage,
+                                   precision=precision)
         elif mode == 'high_gamma':
-            high_gamma_estimation(block_path, bands_vals=config, new_file=new_file)
+            high_gamma_estimation(block_path, bands_vals=config, new_file=new_file,
+                                  storage=storage, precision=precision)
 
 
 def make_new_nwb(old_file, new_file, cp_objs=None):
@@ -93,7 +107,7 @@ def make_new_nwb(old_file, new_file, cp_objs=None):
     nwb_copy_file(old_file, new_file, cp_objs=cp_objs)
 
 
-def preprocess_raw_data(block_path, config):
+def preprocess_raw_data(block_path, config, storage=None, precision='float64'):
     """
     Takes raw data and runs:
     1) CAR
@@ -109,8 +123,23 @@ def preprocess_raw_data(block_path, config):
             ('CAR', N_channels_per_group)
             ('CMR', N_channels_per_group)
             ('bipolar', INCLUDE_OBLIQUE_NBHD)
+            ('bipolar_scheme', None) - BipolarSchemeTable of the file
+            ('laplacian', radius) - radius of the neighbourhoods, None for the
+                nearest electrodes
         'Notch' - Main frequency (Hz) for notch filters (default=60)
         'Downsample' - Downsampling frequency (Hz, default= 400)
+        'chunk_duration' - Optional, seconds of signal preprocessed at a time.
+            If given, signals are streamed to the file in chunks, with
+            overlapping edges for the filters, instead of loaded in memory.
+        'n_workers' - Optional, number of threads resampling and filtering
+            channels in parallel (default=1, None for all the CPUs). Results
+            do not depend on it.
+    storage : dict or str, optional
+        Chunks and compression of the LFP dataset, see
+        ecogvis.signal_processing.storage.output_data_io
+    precision : str
+        'float64' or 'float32', dtype of the signals in memory. float32 halves
+        the memory use, see benchmarks/precision.py for its accuracy.
 
     Returns
     -------
@@ -149,71 +178,133 @@ def preprocess_raw_data(block_path, config):
                 'Not precisely one ElectricalSeries in acquisition!')
             source = source_list[0]
             nChannels = source.data.shape[1]
+            n_workers = config.get('n_workers', 1)
 
-            # Downsampling
-            if config['Downsample'] is not None:
-                print("Downsampling signals to " + str(config['Downsample']) + " Hz.")
-                print("Please wait...")
+            electrodes = source.electrodes
+            # Referencing schemes applied as a (sparse) matrix
+            reference = None
+            if config['referencing'] is not None and config['referencing'][0] in [
+                    'bipolar_scheme', 'laplacian']:
+                reference, electrodes = get_reference_matrix(nwb, source, config['referencing'])
+            if config.get('chunk_duration') is not None:
+                # Streaming: chunks are preprocessed as they are written, so
+                # memory use does not grow with the recording length
+                print("Preprocessing signals in chunks of "
+                      + str(config['chunk_duration']) + " seconds.")
                 start = time.time()
-                # Note: zero padding the signal to make the length
-                # a power of 2 won't help, since resample will further pad it
-                # (breaking the power of 2)
-                nBins = source.data.shape[0]
-                rate = config['Downsample']
-
-                # malloc
-                T = int(np.ceil(nBins * rate / source.rate))
-                X = np.zeros((source.data.shape[1], T))
-
-                # One channel at a time, to improve memory usage for long signals
-                for ch in np.arange(nChannels):
-                    # 1e6 scaling helps with numerical accuracy
-                    Xch = source.data[:, ch] * 1e6
-                    X[ch, :] = resample(Xch, rate, source.rate)
-                print('Downsampling finished in {} seconds'.format(
-                    time.time() - start))
-            else:  # No downsample
                 rate = source.rate
-                X = source.data[()].T * 1e6
-
-            # re-reference the (scaled by 1e6!) data
-            electrodes = source.electrodes
-            if config['referencing'] is not None:
-                if config['referencing'][0] == 'CAR':
-                    print("Computing and subtracting Common Average Reference in "
-                          + str(config['referencing'][1])+" channel blocks.")
+                if config['Downsample'] is not None:
+                    rate = config['Downsample']
+                car_size, car_method = None, 'mean'
+                if config['referencing'] is not None:
+                    if config['referencing'][0] in COMMON_REFERENCES:
+                        car_size = config['referencing'][1]
+                        car_method = COMMON_REFERENCES[config['referencing'][0]]
+                    elif config['referencing'][0] == 'bipolar':
+                        # Bipolar referencing is linear, its matrix is the
+                        # referencing of the identity
+                        reference, bipolarTable, electrodes = get_bipolar_referenced_electrodes(
+                            np.eye(nChannels), electrodes, rate, grid_step=1)
+                        reference = sparse.csr_matrix(reference)
+                        ecephys_module.add_data_interface(bipolarTable)
+                        print('bipolarElectrodes stored for saving in ' + block_path)
+                    elif reference is None:
+                        print('UNRECOGNIZED REFERENCING SCHEME; ', end='')
+                        print('SKIPPING REFERENCING!')
+                data = PreprocessedChunks(
+                    source.data, source.rate, new_rate=config['Downsample'],
+                    car_size=car_size, car_method=car_method, reference=reference,
+                    notch=config['Notch'] is not None,
+                    chunk_duration=config['chunk_duration'], n_workers=n_workers,
+                    precision=precision)
+            else:
+                # Downsampling
+                if config['Downsample'] is not None:
+                    print("Downsampling signals to " + str(config['Downsample']) + " Hz.")
+                    print("Please wait...")
+                    start = time.time()
+                    # Note: zero padding the signal to make the length
+                    # a power of 2 won't help, since resample will further pad it
+                    # (breaking the power of 2)
+                    nBins = source.data.shape[0]
+                    rate = config['Downsample']
+
+                    # malloc
+                    T = int(np.ceil(nBins * rate / source.rate))
+                    X = np.zeros((source.data.shape[1], T), dtype=precision)
+
+                    # Batches of channels, to improve memory usage for long signals
+                    reader = ColumnBatchReader(source.data)
+                    for channels, Xb in reader:
+                        def resample_channel(ii):
+                            # 1e6 scaling helps with numerical accuracy
+                            Xch = Xb[:, ii] * 1e6
+                            X[channels[ii], :] = resample(Xch, rate, source.rate)
+                        map_channels(resample_channel, range(len(channels)), n_workers)
+                    print(reader.report())
+                    print('Downsampling finished in {} seconds'.format(
+                        time.time() - start))
+                else:  # No downsample
+                    rate = source.rate
+                    # Scaled straight into the precision dtype, in blocks
+                    # of rows, without float64 copies of the whole signal
+                    nBins = source.data.shape[0]
+                    X = np.empty((nChannels, nBins), dtype=precision)
+                    block = max(int(32e6 // (8 * nChannels)), 1)
+                    for t0 in range(0, nBins, block):
+                        np.multiply(source.data[t0:t0 + block].T, 1e6,
+                                    out=X[:, t0:t0 + block], dtype=precision)
+
+                # re-reference the (scaled by 1e6!) data
+                if config['referencing'] is not None:
+                    if config['referencing'][0] in COMMON_REFERENCES:
+                        method = COMMON_REFERENCES[config['referencing'][0]]
+                        print("Computing and subtracting Common " + method.capitalize()
+                              + " Reference in " + str(config['referencing'][1])
+                              + " channel blocks.")
+                        start = time.time()
+                        subtract_block_reference(X, b_size=config['referencing'][1],
+                                                 method=method)
+                        print('{} subtract time for {}: {} seconds'.format(
+                            config['referencing'][0], block_name, time.time() - start))
+                    elif config['referencing'][0] == 'bipolar':
+                        X, bipolarTable, electrodes = get_bipolar_referenced_electrodes(
+                            X, electrodes, rate, grid_step=1)
+
+                        # add data interface for the metadata for saving
+                        ecephys_module.add_data_interface(bipolarTable)
+                        print('bipolarElectrodes stored for saving in ' + block_path)
+                    elif reference is not None:
+                        print("Referencing with the " + config['referencing'][0]
+                              + " scheme, " + str(reference.shape[0]) + " channels.")
+                        start = time.time()
+                        X = apply_reference(reference.astype(X.dtype), X)
+                        print('Referencing time for {}: {} seconds'.format(
+                            block_name, time.time() - start))
+                    else:
+                        print('UNRECOGNIZED REFERENCING SCHEME; ', end='')
+                        print('SKIPPING REFERENCING!')
+
+                # Apply Notch filters
+                if config['Notch'] is not None:
+                    print("Applying notch filtering of " + str(config['Notch']) + " Hz")
+                    # Note: zero padding the signal to make the length a power
+                    # of 2 won't help, since notch filtering will further pad it
                     start = time.time()
-                    X = subtract_CAR(X, b_size=config['referencing'][1])
-                    print('CAR subtract time for {}: {} seconds'.format(
+                    def notch_channel(ch):
+                        # NOTE: apply_linenoise_notch takes a signal that is
+                        # (n_timePoints, n_channels). The documentation may be wrong
+                        Xch = X[ch, :].reshape(-1, 1)
+                        Xch = apply_linenoise_notch(Xch, rate)
+                        X[ch, :] = Xch[:, 0]
+                    # All channels, bipolar referencing may change their number
+                    map_channels(notch_channel, range(X.shape[0]), n_workers)
+                    print('Notch filter time for {}: {} seconds'.format(
                         block_name, time.time() - start))
-                elif config['referencing'][0] == 'bipolar':
-                    X, bipolarTable, electrodes = get_bipolar_referenced_electrodes(
-                        X, electrodes, rate, grid_step=1)
-
-                    # add data interface for the metadata for saving
-                    ecephys_module.add_data_interface(bipolarTable)
-                    print('bipolarElectrodes stored for saving in ' + block_path)
-                else:
-                    print('UNRECOGNIZED REFERENCING SCHEME; ', end='')
-                    print('SKIPPING REFERENCING!')
-
-            # Apply Notch filters
-            if config['Notch'] is not None:
-                print("Applying notch filtering of " + str(config['Notch']) + " Hz")
-                # Note: zero padding the signal to make the length a power
-                # of 2 won't help, since notch filtering will further pad it
-                start = time.time()
-                for ch in np.arange(nChannels):
-                    # NOTE: apply_linenoise_notch takes a signal that is
-                    # (n_timePoints, n_channels). The documentation may be wrong
-                    Xch = X[ch, :].reshape(-1, 1)
-                    Xch = apply_linenoise_notch(Xch, rate)
-                    X[ch, :] = Xch[:, 0]
-                print('Notch filter time for {}: {} seconds'.format(
-                    block_name, time.time() - start))
 
-            X = X.astype('float32')     # signal (nChannels,nSamples)
-            X /= 1e6                    # Scales signals back to volts
+                X = X.astype('float32', copy=False)     # signal (nChannels,nSamples)
+                X /= 1e6                                # Scales signals back to volts
+                data = X.T
 
             # Add preprocessed downsampled signals as an electrical_series
             referencing = 'None' if config['referencing'] is None else config[
@@ -229,7 +320,7 @@ def preprocess_raw_data(block_path, config):
             # create an electrical series for the LFP and store it in lfp
             lfp.create_electrical_series(
                 name='preprocessed',
-                data=X.T,
+                data=output_data_io(data, storage),
                 electrodes=electrodes,
                 rate=rate,
                 description='',
@@ -240,6 +331,100 @@ def preprocess_raw_data(block_path, config):
             # Write LFP to NWB file
             io.write(nwb)
             print('LFP saved in ' + block_path)
+            if config.get('chunk_duration') is not None:
+                print('Preprocessing time for {}: {} seconds'.format(
+                    block_name, time.time() - start))
+
+
+def bipolar_grid_pairs(grid_size, grid_step=1):
+    """
+    Electrode pairs of the bipolar referencing of a grid: every electrode
+    with its "right" and "below" neighbours, in the order of the grid
+    columns.
+
+    Parameters
+    ----------
+    grid_size : array-like (2, )
+        Dimensions of the grid.
+    grid_step : int
+        Uses every `grid_step` electrodes of the grid.
+
+    Returns
+    -------
+    anodes, cathodes : ndarrays of ints (nPairs, )
+        Electrode indices of the pairs.
+    """
+    grid_size = np.asarray(grid_size)
+    elec_layout = np.arange(np.prod(grid_size) - 1, -1, -1).reshape(grid_size).T
+    elec_layout = elec_layout[::grid_step, ::grid_step]
+
+    # Neighbours along the two dimensions, (i, j, 0) and (i, j, 1), where
+    # they exist (remembering that grid is transposed)
+    anodes = np.repeat(elec_layout[:, :, np.newaxis], 2, axis=2)
+    cathodes = np.zeros_like(anodes)
+    valid = np.zeros(anodes.shape, dtype=bool)
+    cathodes[:, :-1, 0] = elec_layout[:, 1:]
+    valid[:, :-1, 0] = True
+    cathodes[:-1, :, 1] = elec_layout[1:, :]
+    valid[:-1, :, 1] = True
+    return anodes[valid], cathodes[valid]
+
+
+def get_reference_matrix(nwb, source, referencing):
+    """
+    Referencing matrix of the signals of `source` and the electrodes of the
+    referenced signals.
+
+    Parameters
+    ----------
+    nwb : NWBFile
+    source : ElectricalSeries
+        Signals (nSamples, nChannels).
+    referencing : tuple
+        ('bipolar_scheme', None) - Mean of the anodes minus mean of the
+            cathodes of every row of the file BipolarSchemeTable, that of
+            `source` or of the 'ecephys_ext' lab metadata.
+        ('laplacian', radius) - Each channel minus the mean of the channels
+            closer than `radius` (by default, the nearest ones) in x, y.
+
+    Returns
+    -------
+    reference : scipy.sparse.csr_matrix (nOutputs, nChannels)
+    electrodes : DynamicTableRegion (nOutputs, )
+    """
+    nChannels = source.data.shape[1]
+    if referencing[0] == 'bipolar_scheme':
+        if isinstance(source.electrodes.table, BipolarSchemeTable):
+            # Signals of all the electrodes, described by the scheme rows
+            # (as written by chang2nwb)
+            table = source.electrodes.table
+            electrodes = source.electrodes
+            columns = np.arange(nChannels)
+        else:
+            tables = [v.bipolar_scheme_table for v in nwb.lab_meta_data.values()
+                      if isinstance(v, EcephysExt) and v.bipolar_scheme_table is not None]
+            if len(tables) != 1:
+                raise ValueError('Not precisely one BipolarSchemeTable in the file!')
+            table = tables[0]
+            electrodes = DynamicTableRegion(
+                name='electrodes',
+                data=list(range(len(table))),
+                description='bipolar scheme',
+                table=table
+            )
+            columns = np.asarray(source.electrodes.data[:])
+        matrix = bipolar_scheme_matrix(table)[np.asarray(electrodes.data[:])]
+        reference = matrix[:, columns]
+        if reference.nnz != matrix.nnz:
+            raise ValueError('The bipolar scheme uses electrodes without signals in '
+                             + source.name)
+        return reference, electrodes
+    elif referencing[0] == 'laplacian':
+        rows = np.asarray(source.electrodes.data[:])
+        x = np.asarray(source.electrodes.table['x'].data[:])[rows]
+        y = np.asarray(source.electrodes.table['y'].data[:])[rows]
+        return laplacian_matrix(x, y, radius=referencing[1]), source.electrodes
+    raise ValueError('Unrecognized referencing matrix: ' + str(referencing[0]))
 
 
 def get_bipolar_referenced_electrodes(
@@ -262,83 +447,66 @@ def get_bipolar_referenced_electrodes(
     rate:
         sampling rate of X; for storage in ElectricalSeries
     grid_size:
-        numpy array with the two dimensions of the grid (2, )
+        numpy array with the two dimensions of the grid (2, ). By default,
+        a square grid of the electrodes of X, a ValueError is raised if
+        their number is not a square.
+    grid_step:
+        uses every grid_step electrodes of the grid
 
     Returns:
     --------
     bipolarElectrodes:
         ElectricalSeries containing the bipolar-referenced (pseudo) electrodes
-        and associated metadata.  (NB that a, e.g., 16x16 grid yields 960 of
+        and associated metadata.  (NB that a, e.g., 16x16 grid yields 480 of
         these pseudo-electrodes.)
     '''
 
     # set mutable default argument(s)
     if grid_size is None:
-        grid_size = np.array([16, 16])
-
-    # malloc
-    elec_layout = np.arange(np.prod(grid_size) - 1, -1, -1).reshape(grid_size).T
-    elec_layout = elec_layout[::grid_step, ::grid_step]
-    grid_size = elec_layout.T.shape  # in case grid_step > 1
-    Nchannels = 2 * np.prod(grid_size) - np.sum(grid_size)
-    XX = np.zeros((Nchannels, X.shape[1]))
-
-    # create a new dynamic table to hold the metadata
+        side = int(round(np.sqrt(X.shape[0])))
+        if side ** 2 != X.shape[0]:
+            raise ValueError('{} electrodes do not make a square grid, '
+                             'grid_size must be given.'.format(X.shape[0]))
+        grid_size = np.array([side, side])
+    if np.prod(grid_size) > X.shape[0]:
+        raise ValueError('A {} grid needs {} electrodes, X has {}.'.format(
+            'x'.join(str(n) for n in grid_size), np.prod(grid_size), X.shape[0]))
+
+    anodes, cathodes = bipolar_grid_pairs(grid_size, grid_step)
+    Nchannels = len(anodes)
+
+    # "bipolar referencing": the difference of neighboring electrodes,
+    # written in place, without temporary arrays
+    XX = np.empty((Nchannels, X.shape[1]), dtype=np.result_type(X.dtype, np.float32))
+    for iChannel, (iElectrode, jElectrode) in enumerate(zip(anodes, cathodes)):
+        np.subtract(X[iElectrode], X[jElectrode], out=XX[iChannel])
+
+    # metadata of the pseudo-electrodes, from whole columns of the table
+    table = electrodes.table
     column_names = ['x', 'y', 'z', 'imp', 'location', 'label', 'bad']
+    values = {name: np.asarray(table[name].data[:]) for name in column_names}
+    data = {name: values[name][anodes].tolist() for name in ['x', 'y', 'z', 'imp']}
+    data['location'] = ['_'.join({a, c}) for a, c in zip(
+        values['location'][anodes], values['location'][cathodes])]
+    data['label'] = ['-'.join([a, c]) for a, c in zip(
+        values['label'][anodes], values['label'][cathodes])]
+    data['bad'] = (values['bad'][anodes] | values['bad'][cathodes]).tolist()
     columns = [
         VectorData(
             name=name,
-            description=electrodes.table[name].description)
+            description=table[name].description,
+            data=data[name])
         for name in column_names
     ]
     bipolarTable = DynamicTable(
         name='bipolar-referenced metadata',
         description=('pseudo-channels derived via John Burke style'
                      ' bipolar referencing'),
-        colnames=column_names,
+        id=list(range(Nchannels)),
         columns=columns,
+        colnames=column_names,
     )
 
-    # compute bipolar-ref'd channel and add a new row of metadata to table
-    def add_new_channel(iChannel, iElectrode, jElectrode):
-        jElectrode = int(jElectrode)
-
-        # "bipolar referencing": the difference of neighboring electrodes
-        XX[iChannel, :] = X[iElectrode, :] - X[jElectrode, :]
-
-        # add a row to the table for this new pseudo-electrode
-        bipolarTable.add_row(
-            {
-                'location': '_'.join({
-                    electrodes.table['location'][iElectrode],
-                    electrodes.table['location'][jElectrode]
-                }),
-                'label': '-'.join([
-                    electrodes.table['label'][iElectrode],
-                    electrodes.table['label'][jElectrode]
-                ]),
-                'bad': (
-                    electrodes.table['bad'][iElectrode] or
-                    electrodes.table['bad'][jElectrode]
-                ),
-                **{name: electrodes.table[name][iElectrode]
-                   for name in ['x', 'y', 'z', 'imp']},
-            }
-        )
-        return iChannel + 1
-
-    iChannel = 0
-
-    # loop across columns and rows (remembering that grid is transposed)
-    for i in range(grid_size[1]):
-        for j in range(grid_size[0]):
-            if j < grid_size[0] - 1:
-                iChannel = add_new_channel(
-                    iChannel, elec_layout[i, j], elec_layout[i, j + 1])
-            if i < grid_size[1] - 1:
-                iChannel = add_new_channel(
-                    iChannel, elec_layout[i, j], elec_layout[i + 1, j])
-
     # create one big region for the entire table
     bipolarTableRegion = bipolarTable.create_region(
         'electrodes', [i for i in range(Nchannels)], 'all bipolar electrodes')
@@ -346,7 +514,7 @@ def get_bipolar_referenced_electrodes(
     return XX, bipolarTable, bipolarTableRegion
 
 
-def spectral_decomposition(block_path, bands_vals):
+def spectral_decomposition(block_path, bands_vals, storage=None, precision='float64'):
     """
     Takes preprocessed LFP data and does the standard Hilbert transform on
     different bands. Takes about 20 minutes to run on 1 10-min block.
@@ -358,6 +526,12 @@ def spectral_decomposition(block_path, bands_vals):
     bands_vals : [2,nBands] numpy array with Gaussian filter parameters, where:
         bands_vals[0,:] = filter centers [Hz]
         bands_vals[1,:] = filter sigmas [Hz]
+    storage : dict or str, optional
+        Chunks and compression of the DecompositionSeries dataset, see
+        ecogvis.signal_processing.storage.output_data_io
+    precision : str
+        'float64' or 'float32', dtype of the Hilbert transforms (complex128 or
+        complex64) and of the stored amplitudes.
 
     Returns
     -------
@@ -377,20 +551,22 @@ def spectral_decomposition(block_path, bands_vals):
         nBands = len(band_param_0)
         nSamples = lfp.data.shape[0]
         nChannels = lfp.data.shape[1]
-        Xp = np.zeros((nBands, nChannels, nSamples))  # power (nBands,nChannels,nSamples)
+        Xp = np.zeros((nBands, nChannels, nSamples), dtype=precision)  # power (nBands,nChannels,nSamples)
 
         # Apply Hilbert transform ---------------------------------------------
         print('Running Spectral Decomposition...')
         start = time.time()
-        for ch in np.arange(nChannels):
-            Xch = lfp.data[:, ch] * 1e6       # 1e6 scaling helps with numerical accuracy
+        reader = ColumnBatchReader(lfp.data)
+        for ch, Xch in reader.channels():
+            Xch = Xch * 1e6       # 1e6 scaling helps with numerical accuracy
             Xch = Xch.reshape(1, -1)
-            Xch = Xch.astype('float32')     # signal (nChannels,nSamples)
+            Xch = Xch.astype('float32').astype(precision)     # signal (nChannels,nSamples)
             X_fft_h = None
             for ii, (bp0, bp1) in enumerate(zip(band_param_0, band_param_1)):
                 kernel = gaussian(Xch.shape[-1], rate, bp0, bp1)
                 X_analytic, X_fft_h = hilbert_transform(Xch, rate, kernel, phase=None, X_fft_h=X_fft_h)
                 Xp[ii, ch, :] = abs(X_analytic).astype('float32')
+        print(reader.report())
         print('Spectral Decomposition finished in {} seconds'.format(time.time() - start))
 
         # data: (ndarray) dims: num_times * num_channels * num_bands
@@ -416,7 +592,7 @@ def spectral_decomposition(block_path, bands_vals):
         )
         decs = DecompositionSeries(
             name='DecompositionSeries',
-            data=Xp,
+            data=output_data_io(Xp, storage),
             description='Analytic amplitude estimated with Hilbert transform.',
             metric='amplitude',
             unit='V',
@@ -432,7 +608,8 @@ def spectral_decomposition(block_path, bands_vals):
         print('Spectral decomposition saved in ' + block_path)
 
 
-def high_gamma_estimation(block_path, bands_vals, new_file=''):
+def high_gamma_estimation(block_path, bands_vals, new_file='', storage=None,
+                          precision='float64'):
     """
     Takes preprocessed LFP data and calculates High-Gamma power from the
     averaged power of standard Hilbert transform on 70~150 Hz bands.
@@ -448,6 +625,12 @@ def high_gamma_estimation(block_path, bands_vals, new_file=''):
         if this argument is of form 'path/to/new_file.nwb', High Gamma power
         will be saved in a new file. If it is an empty string, '', High Gamma
         power will be saved in the current NWB file.
+    storage : dict or str, optional
+        Chunks and compression of the high_gamma dataset, see
+        ecogvis.signal_processing.storage.output_data_io
+    precision : str
+        'float64' or 'float32', dtype of the Hilbert transforms (complex128 or
+        complex64) and of the stored power.
 
     Returns
     -------
@@ -467,21 +650,23 @@ def high_gamma_estimation(block_path, bands_vals, new_file=''):
         nBands = len(band_param_0)
         nSamples = lfp.data.shape[0]
         nChannels = lfp.data.shape[1]
-        Xp = np.zeros((nBands, nChannels, nSamples))  # power (nBands,nChannels,nSamples)
+        Xp = np.zeros((nBands, nChannels, nSamples), dtype=precision)  # power (nBands,nChannels,nSamples)
 
         # Apply Hilbert transform ---------------------------------------------
         print('Running High Gamma estimation...')
         start = time.time()
-        for ch in np.arange(nChannels):
-            Xch = lfp.data[:, ch] * 1e6       # 1e6 scaling helps with numerical accuracy
+        reader = ColumnBatchReader(lfp.data)
+        for ch, Xch in reader.channels():
+            Xch = Xch * 1e6       # 1e6 scaling helps with numerical accuracy
             Xch = Xch.reshape(1, -1)
-            Xch = Xch.astype('float32')     # signal (nChannels,nSamples)
+            Xch = Xch.astype('float32').astype(precision)     # signal (nChannels,nSamples)
             X_fft_h = None
             for ii, (bp0, bp1) in enumerate(zip(band_param_0, band_param_1)):
                 kernel = gaussian(Xch.shape[-1], rate, bp0, bp1)
                 X_analytic, X_fft_h = hilbert_transform(
                     Xch, rate, kernel, phase=None, X_fft_h=X_fft_h)
                 Xp[ii, ch, :] = abs(X_analytic).astype('float32')
+        print(reader.report())
         print('High Gamma estimation finished in {} seconds'.format(time.time() - start))
 
         # data: (ndarray) dims: num_times * num_channels * num_bands
@@ -510,7 +695,7 @@ def high_gamma_estimation(block_path, bands_vals, new_file=''):
             )
             hg = ElectricalSeries(
                 name='high_gamma',
-                data=HG,
+                data=output_data_io(HG, storage),
                 electrodes=elecs_region,
                 rate=rate,
                 description=''
@@ -531,7 +716,7 @@ def high_gamma_estimation(block_path, bands_vals, new_file=''):
                 )
                 hg = ElectricalSeries(
                     name='high_gamma',
-                    data=HG,
+                    data=output_data_io(HG, storage),
                     electrodes=elecs_region,
                     rate=rate,
                     description=''
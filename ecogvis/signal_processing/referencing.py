@@ -0,0 +1,152 @@
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+
+__all__ = ['difference_matrix',
+           'bipolar_scheme_matrix',
+           'common_average_matrix',
+           'laplacian_matrix',
+           'apply_reference']
+
+
+# Referencing schemes as sparse matrices (nOutputs, nChannels): every output
+# channel is a weighted sum of a few input channels, so referencing a time
+# chunk is one sparse product whatever the number of channels and outputs.
+# Matrices compose by products, e.g. laplacian_matrix(...) @ common_average_matrix(...)
+
+def difference_matrix(anodes, cathodes, n_channels):
+    """
+    Referencing matrix of the differences between the mean of groups of
+    anodes and the mean of groups of cathodes.
+
+    Parameters
+    ----------
+    anodes, cathodes : lists of lists of ints (nOutputs, )
+        Channels of each output.
+    n_channels : int
+        Number of input channels.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix (nOutputs, n_channels)
+    """
+    rows, cols, vals = [], [], []
+    for sign, groups in [(1., anodes), (-1., cathodes)]:
+        lengths = np.array([len(g) for g in groups])
+        rows.append(np.repeat(np.arange(len(groups)), lengths))
+        cols.append(np.array([ch for g in groups for ch in g], dtype=int))
+        vals.append(np.repeat(sign / np.maximum(lengths, 1), lengths))
+    return _csr(rows, cols, vals, (len(anodes), n_channels))
+
+
+def bipolar_scheme_matrix(bipolar_table, n_channels=None):
+    """
+    Referencing matrix of an ndx-bipolar-scheme BipolarSchemeTable: each row
+    is the mean of its anodes minus the mean of its cathodes.
+
+    Parameters
+    ----------
+    bipolar_table : BipolarSchemeTable
+        Its 'anodes' and 'cathodes' index the electrodes table, whose rows
+        are the input channels.
+    n_channels : int, optional
+        Number of input channels, by default the rows of the electrodes table.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix (nRows, n_channels)
+    """
+    rows, cols, vals = [], [], []
+    for sign, name in [(1., 'anodes'), (-1., 'cathodes')]:
+        # Ragged column: flat electrode indices and the end of each row
+        index = bipolar_table[name]
+        ends = np.asarray(index.data[:], dtype=int)
+        lengths = np.diff(np.concatenate([[0], ends]))
+        rows.append(np.repeat(np.arange(len(ends)), lengths))
+        cols.append(np.asarray(index.target.data[:], dtype=int))
+        vals.append(np.repeat(sign / np.maximum(lengths, 1), lengths))
+        if n_channels is None:
+            n_channels = len(index.target.table)
+    return _csr(rows, cols, vals, (len(bipolar_table), n_channels))
+
+
+def common_average_matrix(n_channels, b_size=16):
+    """
+    Referencing matrix of the Common Average Reference in blocks of `b_size`
+    channels (the last block has the remaining channels), as subtract_CAR.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix (n_channels, n_channels)
+    """
+    block = np.arange(n_channels) // b_size
+    sizes = np.bincount(block)
+    # All the pairs of channels of each block
+    rows = np.repeat(np.arange(n_channels), sizes[block])
+    starts = block * b_size
+    cols = np.concatenate([np.arange(s, s + n) for s, n in zip(starts, sizes[block])])
+    vals = -1. / sizes[block[rows]]
+    return _csr([np.arange(n_channels), rows], [np.arange(n_channels), cols],
+                [np.ones(n_channels), vals], (n_channels, n_channels))
+
+
+def laplacian_matrix(x, y, radius=None):
+    """
+    Referencing matrix of the Laplacian: each channel minus the mean of its
+    neighbours, the channels closer than `radius`.
+
+    Parameters
+    ----------
+    x, y : array-like (n_channels, )
+        Electrode positions.
+    radius : float, optional
+        Neighbourhood radius. By default, slightly over the smallest distance
+        between electrodes, i.e. the 4 nearest neighbours on a grid.
+        Channels without neighbours are not referenced.
+
+    Returns
+    -------
+    scipy.sparse.csr_matrix (n_channels, n_channels)
+    """
+    points = np.column_stack([x, y]).astype(float)
+    n_channels = len(points)
+    tree = cKDTree(points)
+    if radius is None:
+        distances, _ = tree.query(points, k=min(2, n_channels))
+        nearest = distances[:, -1][distances[:, -1] > 0] if n_channels > 1 else []
+        radius = 1.01 * np.min(nearest) if len(nearest) else 0.
+    pairs = tree.query_pairs(radius, output_type='ndarray')
+    pairs = np.concatenate([pairs, pairs[:, ::-1]])
+    n_neighbours = np.bincount(pairs[:, 0], minlength=n_channels)
+    return _csr([np.arange(n_channels), pairs[:, 0]], [np.arange(n_channels), pairs[:, 1]],
+                [np.ones(n_channels), -1. / n_neighbours[pairs[:, 0]]],
+                (n_channels, n_channels))
+
+
+def apply_reference(matrix, X):
+    """
+    Referenced signals, with one (sparse) product.
+
+    Parameters
+    ----------
+    matrix : scipy.sparse matrix or ndarray (nOutputs, n_channels)
+        Referencing matrix.
+    X : ndarray (n_channels, n_time)
+        Signals.
+
+    Returns
+    -------
+    ndarray (nOutputs, n_time)
+    """
+    # Sparse products are fastest with every channel contiguous
+    return np.asarray(matrix @ np.ascontiguousarray(X))
+
+
+def _csr(rows, cols, vals, shape):
+    """CSR matrix of the concatenated entries, with duplicates summed."""
+    matrix = sparse.coo_matrix(
+        (np.concatenate(vals), (np.concatenate(rows), np.concatenate(cols))), shape=shape)
+    matrix = matrix.tocsr()
+    matrix.eliminate_zeros()
+    return matrix
@@ -0,0 +1,65 @@
+import numpy as np
+from hdmf.backends.hdf5 import H5DataIO
+from hdmf.data_utils import AbstractDataChunkIterator
+
+
+# Storage of the processed signals (LFP, DecompositionSeries, high_gamma).
+# The viewer reads time windows of all channels, so chunks hold a few
+# seconds of every channel (and band). Float signals compress by 10-40% only,
+# while decompressing makes reading a window 10-20 times slower, so outputs
+# are not compressed by default, see benchmarks/output_storage.py
+STORAGE_OPTIONS = {
+    'none': {'compression': None},
+    'lzf': {'compression': 'lzf', 'shuffle': True},
+    'gzip': {'compression': 'gzip', 'compression_opts': 4, 'shuffle': True},
+}
+DEFAULT_STORAGE = {'compression': None, 'shuffle': False, 'chunk_bytes': 2**20}
+
+
+def output_chunks(shape, dtype, chunk_bytes=2**20):
+    """
+    Chunk shape of whole rows: all channels (and bands) of consecutive time
+    samples, with about `chunk_bytes` per chunk.
+    """
+    row_bytes = np.dtype(dtype).itemsize * int(np.prod(shape[1:]))
+    rows = int(np.clip(chunk_bytes // max(row_bytes, 1), 1, shape[0]))
+    return (rows,) + tuple(shape[1:])
+
+
+def output_data_io(data, storage=None):
+    """
+    Wraps a processed signal in H5DataIO, with the chunks and compression of
+    `storage`.
+
+    Parameters
+    ----------
+    data : ndarray or AbstractDataChunkIterator (nSamples, ...)
+        Processed signal.
+    storage : dict or str, optional
+        Name in STORAGE_OPTIONS ('none', 'lzf' or 'gzip'), or dictionary with:
+        'compression' - None, 'lzf' or 'gzip'
+        'compression_opts' - gzip level (0-9)
+        'shuffle' - byte shuffle filter, improves compression of floats
+        'chunk_bytes' - bytes per chunk, of whole time samples (default=1MB)
+        'chunks' - chunk shape, overrides 'chunk_bytes'
+        Missing keys take the values of DEFAULT_STORAGE.
+
+    Returns
+    -------
+    H5DataIO
+    """
+    if isinstance(storage, str):
+        storage = STORAGE_OPTIONS[storage]
+    options = dict(DEFAULT_STORAGE, **(storage or {}))
+    if isinstance(data, AbstractDataChunkIterator):
+        shape, dtype = data.maxshape, data.dtype
+    else:
+        shape, dtype = data.shape, data.dtype
+    chunks = options.get('chunks') or output_chunks(shape, dtype, options['chunk_bytes'])
+    kwargs = {'chunks': tuple(chunks)}
+    if options['compression'] is not None:
+        kwargs['compression'] = options['compression']
+        if options['compression'] == 'gzip':
+            kwargs['compression_opts'] = options.get('compression_opts', 4)
+        kwargs['shuffle'] = options.get('shuffle', False)
+    return H5DataIO(data, **kwargs)
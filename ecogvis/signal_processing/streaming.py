@@ -0,0 +1,163 @@
+import os
+from fractions import Fraction
+
+import numpy as np
+from hdmf.data_utils import AbstractDataChunkIterator, DataChunk
+from process_nwb.resample import resample_func
+from process_nwb.linenoise_notch import apply_linenoise_notch
+
+from ecogvis.signal_processing.common_referencing import subtract_block_reference
+from ecogvis.signal_processing.parallel import map_channels
+from ecogvis.signal_processing.referencing import apply_reference
+
+
+class PreprocessedChunks(AbstractDataChunkIterator):
+    """
+    Preprocesses raw signals one time chunk at a time, as they are written to
+    an HDF5 dataset, so that memory use is set by the chunk duration and not
+    by the recording length.
+
+    Every chunk is read with `overlap` seconds of signal on each side, so
+    that the FFT based resampling and notch filters see the neighbouring
+    signal, and then trimmed. Chunk boundaries fall on samples shared by
+    the original and the resampled signals.
+
+    Steps, in the order of `preprocess_raw_data`:
+    1) Downsampling
+    2) Referencing: CAR or CMR in channel blocks or a linear reference (e.g. bipolar)
+    3) Notch filters
+
+    Parameters
+    ----------
+    data : h5py.Dataset or ndarray (nSamples, nChannels)
+        Raw signals, in volts.
+    rate : float
+        Sampling frequency of `data` [Hz].
+    new_rate : float, optional
+        Downsampling frequency [Hz]. By default, not resampled.
+    car_size : int, optional
+        Channels per block of the Common Average (or Median) Reference.
+    car_method : str
+        'mean' (CAR) or 'median' (CMR).
+    reference : scipy.sparse matrix or ndarray (nOutputs, nChannels), optional
+        Referencing matrix, each output channel is a combination of the input
+        channels, e.g. from ecogvis.signal_processing.referencing.
+    notch : bool
+        If True, applies the line noise notch filters.
+    chunk_duration : float
+        Seconds of signal preprocessed at a time.
+    overlap : float
+        Seconds of signal added on each side of a chunk.
+    scale : float
+        Signals are multiplied by `scale` while processed, 1e6 helps with
+        numerical accuracy.
+    n_workers : int, optional
+        Number of threads resampling and filtering groups of channels in
+        parallel. None uses all the CPUs.
+    precision : str
+        'float64' or 'float32', dtype of the chunks while processed. Output
+        chunks are float32 in both cases.
+
+    Examples
+    --------
+    >>> data = PreprocessedChunks(source.data, source.rate, new_rate=400., car_size=16)
+    >>> lfp.create_electrical_series(name='preprocessed', data=data, ...)
+    """
+    def __init__(self, data, rate, new_rate=None, car_size=None, car_method='mean',
+                 reference=None, notch=True, chunk_duration=20., overlap=2., scale=1e6,
+                 n_workers=1, precision='float64'):
+        self.data = data
+        self.rate = rate
+        self.new_rate = new_rate
+        self.car_size = car_size
+        self.car_method = car_method
+        self.reference = reference
+        self.notch = notch
+        self.scale = scale
+        self.n_workers = n_workers
+        self.precision = precision
+        self.nSamples = data.shape[0]
+        self.nChannels = data.shape[1] if reference is None else reference.shape[0]
+
+        # Chunk boundaries are multiples of `step_in` samples, which are
+        # `step_out` resampled samples
+        if new_rate is None:
+            self.nOutput = self.nSamples
+            self.step_in, self.step_out = 1, 1
+        else:
+            self.nOutput = int(np.ceil(self.nSamples * new_rate / rate))
+            ratio = Fraction(new_rate / rate).limit_denominator(10**6)
+            self.step_in, self.step_out = ratio.denominator, ratio.numerator
+        self.out_rate = rate if new_rate is None else new_rate
+        self.chunk_len = max(int(round(chunk_duration * rate / self.step_in)), 1) * self.step_in
+        self.pad_len = int(np.ceil(overlap * rate / self.step_in)) * self.step_in
+        self._start = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self._start >= self.nSamples:
+            raise StopIteration
+        start = self._start
+        stop = min(start + self.chunk_len, self.nSamples)
+        self._start = stop
+        out_start = self._resampled_index(start)
+        out_stop = self.nOutput if stop == self.nSamples else self._resampled_index(stop)
+        X = self.process(start, stop)[:out_stop - out_start]
+        return DataChunk(data=X, selection=np.s_[out_start:out_stop, :self.nChannels])
+
+    def process(self, start, stop):
+        """
+        Preprocessed signals of samples [start, stop), which must be multiples
+        of `step_in`, as float32 (nResampled, nChannels).
+        """
+        pad_start = max(start - self.pad_len, 0)
+        pad_stop = min(stop + self.pad_len, self.nSamples)
+        X = np.multiply(self.data[pad_start:pad_stop], self.scale, dtype=self.precision)
+        if self.new_rate is not None:
+            num = (pad_stop - pad_start) // self.step_in * self.step_out
+            if pad_stop == self.nSamples:
+                num = self.nOutput - self._resampled_index(pad_start)
+            npad = int(max(self.new_rate, self.rate))
+            X = self._per_channel(lambda Xg: resample_func(Xg, num, npad=npad), X)
+        if self.car_size is not None:
+            subtract_block_reference(X.T, b_size=self.car_size, method=self.car_method)
+        if self.reference is not None:
+            X = apply_reference(self.reference.astype(X.dtype), X.T).T
+        if self.notch:
+            X = self._per_channel(lambda Xg: apply_linenoise_notch(Xg, self.out_rate), X)
+        offset = self._resampled_index(start) - self._resampled_index(pad_start)
+        X = X[offset:].astype('float32', copy=False)  # signal (nSamples, nChannels)
+        X /= self.scale                               # Scales signals back to volts
+        return X
+
+    def _per_channel(self, func, X):
+        """
+        Applies `func` to groups of channels (columns) of X, in parallel, with
+        results in the precision dtype.
+        """
+        n_groups = min(self.n_workers or os.cpu_count() or 1, X.shape[1])
+        if n_groups <= 1:
+            return func(X).astype(self.precision, copy=False)
+        groups = np.array_split(np.arange(X.shape[1]), n_groups)
+        return np.hstack(map_channels(
+            lambda g: func(X[:, g]).astype(self.precision, copy=False), groups, n_groups))
+
+    def _resampled_index(self, index):
+        return index // self.step_in * self.step_out
+
+    def recommended_chunk_shape(self):
+        rows = max(int(2**20 // (4 * self.nChannels)), 1)   # about 1 MB chunks
+        return (min(rows, self.nOutput), self.nChannels)
+
+    def recommended_data_shape(self):
+        return (self.nOutput, self.nChannels)
+
+    @property
+    def dtype(self):
+        return np.dtype('float32')
+
+    @property
+    def maxshape(self):
+        return (self.nOutput, self.nChannels)
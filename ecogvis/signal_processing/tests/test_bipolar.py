@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from datetime import datetime
+from dateutil.tz import tzlocal
+from pynwb import NWBFile
+from ecogvis.signal_processing.processing_data import get_bipolar_referenced_electrodes
+
+
+def create_electrodes(n_electrodes):
+    nwb = NWBFile('grid', 'bipolar', datetime.now(tzlocal()))
+    device = nwb.create_device(name='device')
+    group = nwb.create_electrode_group('grid', description='', location='ctx', device=device)
+    nwb.add_electrode_column('label', 'electrode label')
+    nwb.add_electrode_column('bad', 'bad electrode')
+    for i in range(n_electrodes):
+        nwb.add_electrode(x=float(i), y=2. * i, z=0., imp=np.nan, filtering='none',
+                          group=group, location=['STG', 'MTG'][i % 7 == 0],
+                          label='e{}'.format(i), bad=i % 5 == 0)
+    return nwb.create_electrode_table_region(list(range(n_electrodes)), 'all electrodes')
+
+
+def loop_pairs(grid_size, grid_step):
+    # Order of the original nested loop
+    elec_layout = np.arange(np.prod(grid_size) - 1, -1, -1).reshape(grid_size).T
+    elec_layout = elec_layout[::grid_step, ::grid_step]
+    grid_size = elec_layout.T.shape
+    pairs = []
+    for i in range(grid_size[1]):
+        for j in range(grid_size[0]):
+            if j < grid_size[0] - 1:
+                pairs.append((elec_layout[i, j], elec_layout[i, j + 1]))
+            if i < grid_size[1] - 1:
+                pairs.append((elec_layout[i, j], elec_layout[i + 1, j]))
+    return pairs
+
+
+def test_bipolar_referencing():
+    electrodes = create_electrodes(24)
+    X = np.random.RandomState(0).randn(24, 50)
+    for grid_size, grid_step in [((4, 6), 1), ((6, 4), 1), ((4, 6), 2)]:
+        XX, table, region = get_bipolar_referenced_electrodes(
+            X, electrodes, 1000., grid_size=np.array(grid_size), grid_step=grid_step)
+        pairs = loop_pairs(np.array(grid_size), grid_step)
+        assert XX.shape == (len(pairs), 50) == (len(table), 50)
+        for k, (a, c) in enumerate(np.array(pairs).tolist()):
+            np.testing.assert_array_equal(XX[k], X[a] - X[c])
+            assert table['label'][k] == 'e{}-e{}'.format(a, c)
+            assert table['bad'][k] == (a % 5 == 0 or c % 5 == 0)
+            assert table['x'][k] == float(a)
+            assert set(table['location'][k].split('_')) == {
+                ['STG', 'MTG'][a % 7 == 0], ['STG', 'MTG'][c % 7 == 0]}
+        assert len(region.data) == len(pairs)
+
+    # Square grids by default
+    XX, table, _ = get_bipolar_referenced_electrodes(X[:16], electrodes, 1000.)
+    assert XX.shape == (2 * 16 - 8, 50)
+
+
+def test_bipolar_referencing_non_square_grid():
+    electrodes = create_electrodes(128)
+    X = np.random.RandomState(1).randn(128, 20)
+    XX, table, _ = get_bipolar_referenced_electrodes(X, electrodes, 1000.,
+                                                     grid_size=np.array([8, 16]))
+    pairs = np.array(loop_pairs(np.array([8, 16]), 1))
+    assert XX.shape == (len(pairs), 20) == (2 * 128 - 8 - 16, 20)
+    np.testing.assert_array_equal(XX, X[pairs[:, 0]] - X[pairs[:, 1]])
+    assert list(table['label'].data) == ['e{}-e{}'.format(a, c) for a, c in pairs]
+
+    # The grid is not guessed from a non-square number of electrodes
+    with pytest.raises(ValueError, match='grid_size'):
+        get_bipolar_referenced_electrodes(X, electrodes, 1000.)
+    with pytest.raises(ValueError, match='256 electrodes'):
+        get_bipolar_referenced_electrodes(X, electrodes, 1000., grid_size=np.array([16, 16]))
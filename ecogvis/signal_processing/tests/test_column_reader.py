@@ -0,0 +1,47 @@
+import h5py
+import numpy as np
+from ecogvis.signal_processing.column_reader import ColumnBatchReader
+
+
+def test_column_batch_reader(tmp_path):
+    X = np.random.RandomState(0).randn(1000, 10).astype('float32')
+    with h5py.File(str(tmp_path / 'data.h5'), 'w') as f:
+        data = f.create_dataset('data', data=X, chunks=(100, 4), compression='gzip')
+
+        # Batches of whole chunk columns within max_bytes
+        reader = ColumnBatchReader(data, max_bytes=40000)
+        assert reader.batch_size == 8
+        batches = [(channels, Xb) for channels, Xb in reader]
+        assert [list(channels) for channels, _ in batches] == [list(range(8)), [8, 9]]
+        np.testing.assert_array_equal(np.hstack([Xb for _, Xb in batches]), X)
+
+        # Chunks are decompressed once, instead of once per channel
+        assert reader.bytes_read == 10 * 3 * 100 * 4 * 4
+        assert reader.amplification_avoided == 10 * 4 / 12
+
+        reader = ColumnBatchReader(data)
+        for ch, Xch in reader.channels():
+            np.testing.assert_array_equal(Xch, X[:, ch])
+        assert ch == 9 and len(reader) == 1
+
+
+def test_column_batch_reader_max_bytes(tmp_path):
+    X = np.random.RandomState(0).randn(100000, 64).astype('float32')
+    with h5py.File(str(tmp_path / 'data.h5'), 'w') as f:
+        # Contiguous datasets and arrays, in batches of channels within max_bytes
+        for data in [f.create_dataset('contiguous', data=X), X]:
+            reader = ColumnBatchReader(data, max_bytes=1e6)
+            assert reader.batch_size == 2 and len(reader) == 32
+            for channels, Xb in reader:
+                assert Xb.nbytes <= 1e6
+                np.testing.assert_array_equal(Xb, X[:, channels])
+
+        # Chunk columns larger than max_bytes are split, each batch
+        # decompresses the chunks of all the channels
+        data = f.create_dataset('chunked', data=X, chunks=(1000, 64), compression='gzip')
+        reader = ColumnBatchReader(data, max_bytes=4e6)
+        assert reader.batch_size == 10 and len(reader) == 7
+        for channels, Xb in reader:
+            assert Xb.nbytes <= 4e6
+            np.testing.assert_array_equal(Xb, X[:, channels])
+        assert reader.bytes_read == 7 * X.nbytes
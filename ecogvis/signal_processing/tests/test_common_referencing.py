@@ -1,5 +1,6 @@
 import numpy as np
 from ecogvis.signal_processing.common_referencing import subtract_CAR,subtract_common_median_reference
+from ecogvis.signal_processing.common_referencing import subtract_block_reference
 
 def test_subtract_CAR():
     X = np.array([[ 1.25779548e+00,  2.78352267e+00,  9.18397280e-03,
@@ -78,3 +79,24 @@ def test_subtract_common_median_reference():
     
     
     np.testing.assert_almost_equal(Xscmr,Xscmr_expected)
+
+
+def test_subtract_block_reference():
+    rng = np.random.RandomState(0)
+    X = rng.randn(10, 1000)
+    X[3] = np.nan           # bad channel
+    X[7, 100:200] = np.nan  # missing samples
+    blocks = [slice(0, 4), slice(4, 8), slice(8, 10)]
+
+    for method, nanreduce in [('mean', np.nanmean), ('median', np.nanmedian)]:
+        Xp = X.copy()
+        out = subtract_block_reference(Xp, b_size=4, method=method, chunk_size=64)
+        assert out is Xp
+        Xp_expected = np.vstack([X[b] - nanreduce(X[b], axis=0) for b in blocks])
+        np.testing.assert_allclose(Xp, Xp_expected, atol=1e-12)
+
+    # Without NaN, the same as subtract_CAR, which does not modify X
+    X = rng.randn(10, 1000)
+    Xp = subtract_CAR(X, b_size=4)
+    assert not np.may_share_memory(X, Xp)
+    np.testing.assert_allclose(subtract_block_reference(X, b_size=4, chunk_size=100), Xp)
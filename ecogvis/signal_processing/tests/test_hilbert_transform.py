@@ -158,3 +158,13 @@ class HilbertTestCase(unittest.TestCase):
 
         np.testing.assert_almost_equal(Xh[0],Xh_expected[0])
         np.testing.assert_almost_equal(Xh[1],Xh_expected[1])
+
+    def test_hilbert_single_precision(self):
+        rng = np.random.RandomState(0)
+        X = rng.randn(2, 1000)
+        kernel = gaussian(1000, 400., 100., 10.)
+        Xh64, _ = hilbert_transform(X, 400., kernel)
+        Xh32, X_fft_h = hilbert_transform(X.astype('float32'), 400., kernel)
+        assert Xh64.dtype == np.complex128
+        assert Xh32.dtype == X_fft_h.dtype == np.complex64
+        np.testing.assert_allclose(Xh32, Xh64, atol=1e-5 * np.abs(Xh64).max())
@@ -0,0 +1,19 @@
+import numpy as np
+from ecogvis.signal_processing.parallel import map_channels
+from ecogvis.signal_processing.streaming import PreprocessedChunks
+from ecogvis.signal_processing.tests.test_streaming import stream
+
+
+def test_map_channels():
+    assert map_channels(lambda ch: ch ** 2, range(10), n_workers=4) == [ch ** 2 for ch in range(10)]
+    assert map_channels(lambda ch: ch ** 2, range(10), n_workers=None) == [ch ** 2 for ch in range(10)]
+
+
+def test_parallel_chunks_identical():
+    rate = 1000.
+    rng = np.random.RandomState(0)
+    X = 1e-6 * rng.randn(int(20 * rate), 10)
+    serial = stream(PreprocessedChunks(X, rate, new_rate=400., car_size=4, chunk_duration=6.))
+    parallel = stream(PreprocessedChunks(X, rate, new_rate=400., car_size=4, chunk_duration=6.,
+                                         n_workers=3))
+    np.testing.assert_array_equal(serial, parallel)
@@ -0,0 +1,82 @@
+import numpy as np
+from datetime import datetime
+from dateutil.tz import tzlocal
+from pynwb import NWBFile, NWBHDF5IO
+from pynwb.ecephys import ElectricalSeries
+from ndx_bipolar_scheme import BipolarSchemeTable, EcephysExt
+from ecogvis.signal_processing.common_referencing import subtract_CAR
+from ecogvis.signal_processing.processing_data import preprocess_raw_data
+from ecogvis.signal_processing.referencing import (
+    apply_reference, bipolar_scheme_matrix, common_average_matrix, difference_matrix,
+    laplacian_matrix)
+from ecogvis.signal_processing.streaming import PreprocessedChunks
+from ecogvis.signal_processing.tests.test_streaming import stream
+
+
+def create_nwb(n_electrodes, rate, duration):
+    """Raw signals of a 4-column grid and a bipolar scheme of its electrodes."""
+    nwb = NWBFile('grid', 'referencing', datetime.now(tzlocal()))
+    device = nwb.create_device(name='device')
+    group = nwb.create_electrode_group('grid', description='', location='ctx', device=device)
+    for i in range(n_electrodes):
+        nwb.add_electrode(x=4. * (i % 4), y=4. * (i // 4), z=0., imp=np.nan,
+                          filtering='none', group=group, location='ctx')
+    bipolar_table = BipolarSchemeTable(name='bipolar_scheme_table', description='desc')
+    bipolar_table.add_row(anodes=[0], cathodes=[1])
+    bipolar_table.add_row(anodes=[2, 3], cathodes=[6])
+    bipolar_table.add_row(anodes=[5], cathodes=[4, 7, 8])
+    bipolar_table.anodes.table = nwb.electrodes
+    bipolar_table.cathodes.table = nwb.electrodes
+    ecephys_ext = EcephysExt(name='ecephys_ext')
+    ecephys_ext.bipolar_scheme_table = bipolar_table
+    nwb.add_lab_meta_data(ecephys_ext)
+    region = nwb.create_electrode_table_region(list(range(n_electrodes)), 'all electrodes')
+    X = 1e-6 * np.random.RandomState(0).randn(int(duration * rate), n_electrodes)
+    nwb.add_acquisition(ElectricalSeries(name='raw', data=X, electrodes=region, rate=rate))
+    return nwb, X
+
+
+def test_referencing_matrices():
+    rng = np.random.RandomState(0)
+    X = rng.randn(37, 100)
+    np.testing.assert_allclose(apply_reference(common_average_matrix(37, 16), X),
+                               subtract_CAR(X, b_size=16), atol=1e-12)
+
+    M = difference_matrix([[0], [1, 2]], [[3], [4]], 5)
+    np.testing.assert_array_equal(M.toarray(), [[1, 0, 0, -1, 0], [0, .5, .5, 0, -1]])
+
+    # 3x3 grid: corner, edge and center neighbourhoods
+    L = laplacian_matrix(np.tile(np.arange(3.), 3), np.repeat(np.arange(3.), 3)).toarray()
+    np.testing.assert_allclose(L[0], [1, -1 / 2, 0, -1 / 2, 0, 0, 0, 0, 0])
+    np.testing.assert_allclose(L[1], [-1 / 3, 1, -1 / 3, 0, -1 / 3, 0, 0, 0, 0])
+    np.testing.assert_allclose(L[4], [0, -1 / 4, 0, -1 / 4, 1, -1 / 4, 0, -1 / 4, 0])
+    np.testing.assert_allclose(L.sum(axis=1), 0, atol=1e-12)
+
+    nwb, _ = create_nwb(12, 100., 1.)
+    M = bipolar_scheme_matrix(nwb.lab_meta_data['ecephys_ext'].bipolar_scheme_table)
+    assert M.shape == (3, 12)
+    np.testing.assert_allclose(M.toarray()[1, [2, 3, 6]], [.5, .5, -1])
+    np.testing.assert_allclose(M.toarray()[2, [4, 5, 7, 8]], [-1 / 3, 1, -1 / 3, -1 / 3])
+
+    # Sparse and dense matrices reference chunks the same
+    X = 1e-6 * rng.randn(2000, 12)
+    dense = stream(PreprocessedChunks(X, 100., reference=M.toarray(), notch=False,
+                                      chunk_duration=7.))
+    np.testing.assert_allclose(stream(PreprocessedChunks(X, 100., reference=M, notch=False,
+                                                         chunk_duration=7.)), dense)
+    np.testing.assert_allclose(dense, (X @ M.T).astype('float32'), rtol=1e-6)
+
+
+def test_preprocess_bipolar_scheme(tmp_path):
+    config = {'referencing': ('bipolar_scheme', None), 'Notch': None, 'Downsample': None}
+    for chunk_duration in [None, 1.]:
+        path = str(tmp_path / 'referencing_{}.nwb'.format(chunk_duration))
+        nwb, X = create_nwb(12, 400., 4.)
+        M = bipolar_scheme_matrix(nwb.lab_meta_data['ecephys_ext'].bipolar_scheme_table)
+        with NWBHDF5IO(path, 'w') as io:
+            io.write(nwb)
+        preprocess_raw_data(path, dict(config, chunk_duration=chunk_duration))
+        with NWBHDF5IO(path, 'r') as io:
+            lfp = io.read().processing['ecephys']['LFP']['preprocessed']
+            assert isinstance(lfp.electrodes.table, BipolarSchemeTable)
+            np.testing.assert_allclose(lfp.data[:], X @ M.T, rtol=1e-5, atol=1e-12)
@@ -0,0 +1,20 @@
+import numpy as np
+from ecogvis.signal_processing.storage import output_chunks, output_data_io
+from ecogvis.signal_processing.streaming import PreprocessedChunks
+
+
+def test_output_data_io():
+    # Chunks of all channels (and bands), about 1 MB
+    assert output_chunks((100000, 256), 'float32') == (1024, 256)
+    assert output_chunks((100000, 256, 8), 'float64') == (64, 256, 8)
+    assert output_chunks((10, 256), 'float32') == (10, 256)
+
+    X = np.zeros((100000, 64), dtype='float32')
+    assert output_data_io(X).io_settings == {'chunks': (4096, 64)}
+    settings = output_data_io(X, 'gzip').io_settings
+    assert settings['compression'] == 'gzip' and settings['shuffle']
+    settings = output_data_io(X, {'compression': 'lzf', 'chunks': (400, 64)}).io_settings
+    assert settings['compression'] == 'lzf' and settings['chunks'] == (400, 64)
+
+    chunks = PreprocessedChunks(X, 1000., new_rate=400.)
+    assert output_data_io(chunks).io_settings['chunks'] == (4096, 64)
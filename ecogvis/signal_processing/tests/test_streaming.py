@@ -0,0 +1,50 @@
+import numpy as np
+from process_nwb.resample import resample
+from process_nwb.linenoise_notch import apply_linenoise_notch
+from ecogvis.signal_processing.common_referencing import subtract_CAR, subtract_block_reference
+from ecogvis.signal_processing.streaming import PreprocessedChunks
+
+
+def stream(chunks):
+    X = np.zeros(chunks.maxshape, dtype=chunks.dtype)
+    for chunk in chunks:
+        X[chunk.selection] = chunk.data
+    return X
+
+
+def test_preprocessed_chunks():
+    rate = 1000.
+    t = np.arange(int(30 * rate)) / rate
+    rng = np.random.RandomState(0)
+    # Slow oscillations, line noise and a little white noise, in volts
+    X = 1e-6 * (20 * np.sin(2 * np.pi * 7 * t)[:, None] * rng.rand(8)
+                + 30 * np.sin(2 * np.pi * 60 * t)[:, None]
+                + rng.randn(len(t), 8))
+
+    # Referencing alone is exact
+    chunks = PreprocessedChunks(X, rate, car_size=4, notch=False, chunk_duration=7.)
+    np.testing.assert_allclose(stream(chunks), subtract_CAR(X.T, b_size=4).T, atol=1e-12)
+    chunks = PreprocessedChunks(X, rate, car_size=4, car_method='median', notch=False,
+                                chunk_duration=7.)
+    Y_expected = subtract_block_reference(X.T.copy(), b_size=4, method='median').T
+    np.testing.assert_allclose(stream(chunks), Y_expected, atol=1e-12)
+
+    # Filters see the neighbouring signal through the overlap
+    chunks = PreprocessedChunks(X, rate, new_rate=400., car_size=4, chunk_duration=7.)
+    Y = stream(chunks)
+    Y_expected = resample(X * 1e6, 400., rate)
+    Y_expected = apply_linenoise_notch(subtract_CAR(Y_expected.T, b_size=4).T, 400.) / 1e6
+    assert Y.shape == Y_expected.shape == (12000, 8)
+    assert np.abs(Y - Y_expected).max() < 1e-2 * np.abs(Y_expected).max()
+
+
+def test_preprocessed_chunks_precision():
+    rate = 1000.
+    X = 1e-6 * np.random.RandomState(0).randn(int(20 * rate), 6)
+    Y = {}
+    for precision in ['float64', 'float32']:
+        chunks = PreprocessedChunks(X, rate, new_rate=400., car_size=3, chunk_duration=6.,
+                                    precision=precision)
+        assert chunks.process(0, chunks.chunk_len).dtype == np.float32
+        Y[precision] = stream(chunks)
+    assert np.abs(Y['float32'] - Y['float64']).max() < 1e-5 * np.abs(Y['float64']).max()
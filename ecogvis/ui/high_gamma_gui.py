@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'high_gamma_gui.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.setEnabled(True)
+        Dialog.resize(588, 366)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.MinimumExpanding, QtWidgets.QSizePolicy.MinimumExpanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(Dialog.sizePolicy().hasHeightForWidth())
+        Dialog.setSizePolicy(sizePolicy)
+        Dialog.setSizeGripEnabled(False)
+        self.groupBox_1 = QtWidgets.QGroupBox(Dialog)
+        self.groupBox_1.setGeometry(QtCore.QRect(10, 100, 171, 91))
+        self.groupBox_1.setFlat(False)
+        self.groupBox_1.setCheckable(False)
+        self.groupBox_1.setObjectName("groupBox_1")
+        self.radioButton_1 = QtWidgets.QRadioButton(self.groupBox_1)
+        self.radioButton_1.setGeometry(QtCore.QRect(10, 30, 112, 23))
+        self.radioButton_1.setObjectName("radioButton_1")
+        self.radioButton_2 = QtWidgets.QRadioButton(self.groupBox_1)
+        self.radioButton_2.setGeometry(QtCore.QRect(10, 60, 112, 23))
+        self.radioButton_2.setObjectName("radioButton_2")
+        self.tableWidget = QtWidgets.QTableWidget(Dialog)
+        self.tableWidget.setGeometry(QtCore.QRect(320, 100, 256, 211))
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Fixed, QtWidgets.QSizePolicy.MinimumExpanding)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.tableWidget.sizePolicy().hasHeightForWidth())
+        self.tableWidget.setSizePolicy(sizePolicy)
+        self.tableWidget.setFrameShape(QtWidgets.QFrame.StyledPanel)
+        self.tableWidget.setFrameShadow(QtWidgets.QFrame.Sunken)
+        self.tableWidget.setSizeAdjustPolicy(QtWidgets.QAbstractScrollArea.AdjustIgnored)
+        self.tableWidget.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tableWidget.setTabKeyNavigation(False)
+        self.tableWidget.setProperty("showDropIndicator", False)
+        self.tableWidget.setShowGrid(True)
+        self.tableWidget.setCornerButtonEnabled(True)
+        self.tableWidget.setRowCount(1)
+        self.tableWidget.setColumnCount(3)
+        self.tableWidget.setObjectName("tableWidget")
+        item = QtWidgets.QTableWidgetItem()
+        self.tableWidget.setHorizontalHeaderItem(0, item)
+        item = QtWidgets.QTableWidgetItem()
+        item.setTextAlignment(QtCore.Qt.AlignCenter)
+        self.tableWidget.setHorizontalHeaderItem(1, item)
+        item = QtWidgets.QTableWidgetItem()
+        item.setTextAlignment(QtCore.Qt.AlignCenter)
+        self.tableWidget.setHorizontalHeaderItem(2, item)
+        self.tableWidget.horizontalHeader().setMinimumSectionSize(10)
+        self.tableWidget.verticalHeader().setHighlightSections(True)
+        self.label_1 = QtWidgets.QLabel(Dialog)
+        self.label_1.setGeometry(QtCore.QRect(10, 200, 301, 111))
+        self.label_1.setAlignment(QtCore.Qt.AlignLeading|QtCore.Qt.AlignLeft|QtCore.Qt.AlignTop)
+        self.label_1.setWordWrap(True)
+        self.label_1.setIndent(0)
+        self.label_1.setObjectName("label_1")
+        self.pushButton_1 = QtWidgets.QPushButton(Dialog)
+        self.pushButton_1.setEnabled(False)
+        self.pushButton_1.setGeometry(QtCore.QRect(320, 320, 89, 25))
+        self.pushButton_1.setObjectName("pushButton_1")
+        self.pushButton_2 = QtWidgets.QPushButton(Dialog)
+        self.pushButton_2.setEnabled(False)
+        self.pushButton_2.setGeometry(QtCore.QRect(420, 320, 89, 25))
+        self.pushButton_2.setObjectName("pushButton_2")
+        self.runButton = QtWidgets.QPushButton(Dialog)
+        self.runButton.setGeometry(QtCore.QRect(10, 330, 89, 25))
+        self.runButton.setObjectName("runButton")
+        self.cancelButton = QtWidgets.QPushButton(Dialog)
+        self.cancelButton.setGeometry(QtCore.QRect(110, 330, 89, 25))
+        self.cancelButton.setObjectName("cancelButton")
+        self.groupBox_2 = QtWidgets.QGroupBox(Dialog)
+        self.groupBox_2.setGeometry(QtCore.QRect(10, 20, 566, 61))
+        self.groupBox_2.setFlat(False)
+        self.groupBox_2.setCheckable(False)
+        self.groupBox_2.setObjectName("groupBox_2")
+        self.radioButton_3 = QtWidgets.QRadioButton(self.groupBox_2)
+        self.radioButton_3.setGeometry(QtCore.QRect(10, 30, 112, 23))
+        self.radioButton_3.setObjectName("radioButton_3")
+        self.radioButton_4 = QtWidgets.QRadioButton(self.groupBox_2)
+        self.radioButton_4.setGeometry(QtCore.QRect(120, 30, 112, 23))
+        self.radioButton_4.setObjectName("radioButton_4")
+        self.lineEdit = QtWidgets.QLineEdit(self.groupBox_2)
+        self.lineEdit.setGeometry(QtCore.QRect(190, 30, 366, 25))
+        self.lineEdit.setObjectName("lineEdit")
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Dialog"))
+        self.groupBox_1.setTitle(_translate("Dialog", "High Gamma bands:"))
+        self.radioButton_1.setText(_translate("Dialog", "Default"))
+        self.radioButton_2.setText(_translate("Dialog", "Custom"))
+        item = self.tableWidget.horizontalHeaderItem(1)
+        item.setText(_translate("Dialog", "mean [Hz]"))
+        item = self.tableWidget.horizontalHeaderItem(2)
+        item.setText(_translate("Dialog", "std [Hz]"))
+        self.label_1.setText(_translate("Dialog", "Choose the High Gamma bands."))
+        self.pushButton_1.setText(_translate("Dialog", "Add band"))
+        self.pushButton_2.setText(_translate("Dialog", "Del band"))
+        self.runButton.setText(_translate("Dialog", "Create"))
+        self.cancelButton.setText(_translate("Dialog", "Cancel"))
+        self.groupBox_2.setTitle(_translate("Dialog", "Save High Gamma data to NWB file:"))
+        self.radioButton_3.setText(_translate("Dialog", "Current"))
+        self.radioButton_4.setText(_translate("Dialog", "New:"))
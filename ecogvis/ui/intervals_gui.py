@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'intervals_gui.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(222, 188)
+        self.buttonBox = QtWidgets.QDialogButtonBox(Dialog)
+        self.buttonBox.setGeometry(QtCore.QRect(20, 140, 171, 32))
+        self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.Cancel|QtWidgets.QDialogButtonBox.Ok)
+        self.buttonBox.setObjectName("buttonBox")
+        self.lineEdit_1 = QtWidgets.QLineEdit(Dialog)
+        self.lineEdit_1.setGeometry(QtCore.QRect(80, 60, 111, 25))
+        self.lineEdit_1.setObjectName("lineEdit_1")
+        self.comboBox = QtWidgets.QComboBox(Dialog)
+        self.comboBox.setGeometry(QtCore.QRect(79, 90, 111, 25))
+        self.comboBox.setObjectName("comboBox")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.comboBox.addItem("")
+        self.label_1 = QtWidgets.QLabel(Dialog)
+        self.label_1.setGeometry(QtCore.QRect(20, 20, 231, 17))
+        self.label_1.setObjectName("label_1")
+        self.label_3 = QtWidgets.QLabel(Dialog)
+        self.label_3.setGeometry(QtCore.QRect(20, 90, 45, 17))
+        self.label_3.setObjectName("label_3")
+        self.label_2 = QtWidgets.QLabel(Dialog)
+        self.label_2.setGeometry(QtCore.QRect(20, 60, 45, 17))
+        self.label_2.setObjectName("label_2")
+
+        self.retranslateUi(Dialog)
+        self.buttonBox.accepted.connect(Dialog.accept) # type: ignore
+        self.buttonBox.rejected.connect(Dialog.reject) # type: ignore
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Dialog"))
+        self.comboBox.setItemText(0, _translate("Dialog", "red"))
+        self.comboBox.setItemText(1, _translate("Dialog", "green"))
+        self.comboBox.setItemText(2, _translate("Dialog", "blue"))
+        self.comboBox.setItemText(3, _translate("Dialog", "yellow"))
+        self.label_1.setText(_translate("Dialog", "Create new interval type."))
+        self.label_3.setText(_translate("Dialog", "Color:"))
+        self.label_2.setText(_translate("Dialog", "Type:"))
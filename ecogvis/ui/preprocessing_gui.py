@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'preprocessing_gui.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_Dialog(object):
+    def setupUi(self, Dialog):
+        Dialog.setObjectName("Dialog")
+        Dialog.resize(321, 263)
+        self.checkBox_1 = QtWidgets.QCheckBox(Dialog)
+        self.checkBox_1.setGeometry(QtCore.QRect(20, 50, 151, 23))
+        self.checkBox_1.setObjectName("checkBox_1")
+        self.checkBox_2 = QtWidgets.QCheckBox(Dialog)
+        self.checkBox_2.setGeometry(QtCore.QRect(20, 90, 141, 23))
+        self.checkBox_2.setObjectName("checkBox_2")
+        self.lineEdit_2 = QtWidgets.QLineEdit(Dialog)
+        self.lineEdit_2.setGeometry(QtCore.QRect(190, 90, 113, 25))
+        self.lineEdit_2.setObjectName("lineEdit_2")
+        self.lineEdit_3 = QtWidgets.QLineEdit(Dialog)
+        self.lineEdit_3.setGeometry(QtCore.QRect(190, 130, 113, 25))
+        self.lineEdit_3.setObjectName("lineEdit_3")
+        self.label_1 = QtWidgets.QLabel(Dialog)
+        self.label_1.setGeometry(QtCore.QRect(20, 20, 201, 17))
+        self.label_1.setObjectName("label_1")
+        self.pushButton_1 = QtWidgets.QPushButton(Dialog)
+        self.pushButton_1.setGeometry(QtCore.QRect(50, 220, 89, 25))
+        self.pushButton_1.setObjectName("pushButton_1")
+        self.pushButton_2 = QtWidgets.QPushButton(Dialog)
+        self.pushButton_2.setGeometry(QtCore.QRect(160, 220, 89, 25))
+        self.pushButton_2.setObjectName("pushButton_2")
+        self.label_2 = QtWidgets.QLabel(Dialog)
+        self.label_2.setGeometry(QtCore.QRect(20, 170, 281, 41))
+        self.label_2.setAlignment(QtCore.Qt.AlignLeading|QtCore.Qt.AlignLeft|QtCore.Qt.AlignTop)
+        self.label_2.setWordWrap(True)
+        self.label_2.setObjectName("label_2")
+        self.checkBox_3 = QtWidgets.QCheckBox(Dialog)
+        self.checkBox_3.setGeometry(QtCore.QRect(20, 130, 151, 23))
+        self.checkBox_3.setObjectName("checkBox_3")
+        self.lineEdit_1 = QtWidgets.QLineEdit(Dialog)
+        self.lineEdit_1.setGeometry(QtCore.QRect(190, 50, 113, 25))
+        self.lineEdit_1.setObjectName("lineEdit_1")
+
+        self.retranslateUi(Dialog)
+        QtCore.QMetaObject.connectSlotsByName(Dialog)
+
+    def retranslateUi(self, Dialog):
+        _translate = QtCore.QCoreApplication.translate
+        Dialog.setWindowTitle(_translate("Dialog", "Dialog"))
+        self.checkBox_1.setText(_translate("Dialog", "CAR (n° channels):"))
+        self.checkBox_2.setText(_translate("Dialog", "Notch filter (Hz):"))
+        self.label_1.setText(_translate("Dialog", "Preprocessing options:"))
+        self.pushButton_1.setText(_translate("Dialog", "Cancel"))
+        self.pushButton_2.setText(_translate("Dialog", "Ok"))
+        self.label_2.setText(_translate("Dialog", "Preprocessing might take a couple of minutes. Do you want to run it?"))
+        self.checkBox_3.setText(_translate("Dialog", "Downsample (Hz):"))